@@ -0,0 +1,145 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Hashable
+import metrics
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+FAIR_SCHEDULING = os.getenv("ADMISSION_FAIR", "true").lower() in ("1", "true", "yes")
+# Limits are per container: with several workers each one gets its share
+WORKERS = max(1, int(os.getenv("WORKERS", "1")))
+
+# Concurrent calls per tool; crawl tools are bounded well below what the container can render
+TOOL_CONCURRENCY = {
+    "web_search": int(os.getenv("WEB_SEARCH_CONCURRENCY", "32")),
+    "web_search_batch": int(os.getenv("WEB_SEARCH_BATCH_CONCURRENCY", "8")),
+    "crawl_url": int(os.getenv("CRAWL_URL_CONCURRENCY", "8")),
+    "read_page_chunk": int(os.getenv("READ_PAGE_CHUNK_CONCURRENCY", "32")),
+    "crawl_urls": int(os.getenv("CRAWL_URLS_CONCURRENCY", "2")),
+    "search_and_read": int(os.getenv("SEARCH_AND_READ_CONCURRENCY", "2")),
+}
+
+
+class AdmissionError(Exception):
+    """Raised when a call is rejected because its tool is saturated."""
+
+
+class AdmissionGate:
+    """
+    Bounds how many calls of one tool run at once.
+
+    Calls beyond `limit` wait in a queue of at most `max_queue` entries and are rejected
+    with AdmissionError when the queue is full or they have waited `queue_timeout` seconds.
+    With `fair=True` waiters are queued per client and freed slots go round-robin across
+    clients, so one busy session can't starve the others.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int = QUEUE_SIZE,
+                 queue_timeout: float = QUEUE_TIMEOUT, fair: bool = FAIR_SCHEDULING):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.fair = fair
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Client -> its waiters, in round-robin order
+        self._waiters: OrderedDict[Hashable, deque[asyncio.Future]] = OrderedDict()
+
+    @asynccontextmanager
+    async def admit(self, client: Hashable = None):
+        """Holds one of the tool's slots for the duration of the block."""
+        await self._acquire(client if self.fair else None)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, client: Hashable):
+        if self.limit <= 0 or (self.active < self.limit and not self.queued):
+            self.active += 1
+            self.admitted += 1
+            metrics.admission_wait_seconds.observe(0, tool=self.name)
+            return
+
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            metrics.admission_rejections.inc(tool=self.name, reason="queue_full")
+            raise AdmissionError(f"{self.name} is busy ({self.active} running, {self.queued} queued), try again later")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client, deque()).append(waiter)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up; pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                self._discard(client, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                metrics.admission_rejections.inc(tool=self.name, reason="queue_timeout")
+                raise AdmissionError(
+                    f"{self.name} is busy: waited {self.queue_timeout:g}s for a free slot, try again later"
+                ) from None
+            raise
+        finally:
+            metrics.admission_wait_seconds.observe(time.perf_counter() - start, tool=self.name)
+
+        self.admitted += 1
+
+    def _release(self):
+        # Hand the slot straight to the next waiter so newcomers can't jump the queue
+        while self._waiters:
+            client, waiters = next(iter(self._waiters.items()))
+            waiter = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._waiters.move_to_end(client)
+            else:
+                del self._waiters[client]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _discard(self, client: Hashable, waiter: asyncio.Future):
+        waiters = self._waiters.get(client)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self.queued -= 1
+        if not waiters:
+            del self._waiters[client]
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+gates = {tool: AdmissionGate(tool, math.ceil(limit / WORKERS)) for tool, limit in TOOL_CONCURRENCY.items()}
+
+
+def admission_stats() -> dict:
+    return {tool: gate.stats() for tool, gate in gates.items()}
@@ -0,0 +1,123 @@
+"""
+Event-loop lag and search latency under mixed search + crawl load, with HTML post-processing
+inline on the event loop vs. in the post-processing pool.
+
+Crawls go through the browser-less fast path against large local pages, so no browser is needed.
+
+    python web_search_mcp_server/benchmark/bench_event_loop_lag.py [--crawls 40] [--searches 400]
+        [--paragraphs 400] [--workers 2]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import crawl_service
+import fetch_client
+import politeness
+import search_service
+from crawl_cache import CrawlCache
+from postprocess import PostprocessPool
+from benchmark.stubs import searxng_app, serve, site_app
+
+TICK = 0.005
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def monitor(lags: list[float], stop: asyncio.Event):
+    """Records how late a TICK-second sleep wakes up; any delay is time the loop was blocked."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - start - TICK) * 1000)
+
+
+async def run(site_url: str, crawls: int, searches: int, concurrency: int) -> dict:
+    lags: list[float] = []
+    search_latencies: list[float] = []
+    stop = asyncio.Event()
+    monitor_task = asyncio.create_task(monitor(lags, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def crawl(i: int):
+        async with semaphore:
+            await crawl_service.perform_crawl(f"{site_url}/static/{i}")
+
+    async def search(i: int):
+        # Spread searches over the run like independent agent sessions would
+        await asyncio.sleep(i * 0.005)
+        start = time.perf_counter()
+        await search_service.perform_web_search(f"query {i}")
+        search_latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(crawl(i) for i in range(crawls)), *(search(i) for i in range(searches)))
+    duration = time.perf_counter() - start
+    stop.set()
+    await monitor_task
+
+    return {
+        "duration": duration,
+        "lag_p50": statistics.median(lags),
+        "lag_p99": percentile(lags, 99),
+        "lag_max": max(lags),
+        "search_p50": statistics.median(search_latencies),
+        "search_p99": percentile(search_latencies, 99),
+    }
+
+
+async def main(args):
+    logging.disable(logging.WARNING)
+    crawl_service.CRAWL_FETCH_MODE = "http"
+    crawl_service._crawl_cache = CrawlCache(path="", ttl=0)
+    search_service._search_cache.ttl = 0
+    # Every page is on the one stub host; don't measure the per-host politeness limits
+    politeness.scheduler.rate = 0
+    politeness.scheduler.concurrency = 1000
+    politeness.scheduler.robots_mode = "off"
+
+    async with serve(searxng_app()) as searxng_url, serve(site_app(paragraphs=args.paragraphs)) as site_url:
+        search_service.configure_backends([searxng_url])
+        await search_service.start_client()
+        await fetch_client.start_fetch_client()
+        results = {}
+        try:
+            for mode in ("inline", "process"):
+                pool = PostprocessPool(workers=args.workers, mode=mode, preload=("crawl_service",))
+                await pool.start()
+                crawl_service.postprocess_pool = pool
+                try:
+                    results[mode] = await run(site_url, args.crawls, args.searches, args.concurrency)
+                finally:
+                    await pool.close()
+        finally:
+            await fetch_client.close_fetch_client()
+            await search_service.close_client()
+
+    print(f"{args.crawls} crawls of {args.paragraphs}-section pages, {args.searches} searches")
+    print(f"{'mode':<10}{'total s':>9}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}{'search p50':>12}{'search p99':>12}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<10}{r['duration']:>9.2f}{r['lag_p50']:>10.1f}{r['lag_p99']:>10.1f}{r['lag_max']:>10.1f}"
+            f"{r['search_p50']:>12.1f}{r['search_p99']:>12.1f}"
+        )
+    print("(latencies in ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--crawls", type=int, default=40)
+    parser.add_argument("--searches", type=int, default=400)
+    parser.add_argument("--paragraphs", type=int, default=400, help="sections per test page")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent crawls")
+    parser.add_argument("--workers", type=int, default=2, help="post-processing workers")
+    asyncio.run(main(parser.parse_args()))
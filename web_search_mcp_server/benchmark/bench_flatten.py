@@ -0,0 +1,66 @@
+"""
+flatten_markdown_links scaling on link-dense and pathological inputs, vs. the previous
+fixed-point regex implementation.
+
+    python web_search_mcp_server/benchmark/bench_flatten.py [--sizes 1000 4000 16000]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import re
+import time
+from crawl_service import flatten_markdown_links
+
+
+def regex_flatten(text):
+    """The previous implementation: re.sub until nothing changes."""
+    if not text:
+        return ""
+    prev_text = None
+    while text != prev_text:
+        prev_text = text
+        text = re.sub(r'!?(?:\[((?:[^\[\]]|!\[[^\]]*\]\([^\)]+\))*)\])\([^\)]+\)', r'\1', text)
+    return text
+
+
+INPUTS = {
+    "many links": lambda n: " ".join(f"[link {i}](https://example.com/{i})" for i in range(n)),
+    "images in links": lambda n: " ".join(f"[![img {i}](i{i}.png)](https://example.com/{i})" for i in range(n)),
+    "deep nesting": lambda n: "[" * n + "x" + "](u)" * n,
+    "unclosed [": lambda n: "[word " * n,
+    "unclosed ](": lambda n: "[a](b " * n,
+}
+
+
+def timed(fn, text):
+    start = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - start
+
+
+def main(sizes, budget):
+    print(f"{'input':<18}{'n':>8}{'chars':>10}{'regex ms':>12}{'scanner ms':>12}")
+    for name, make in INPUTS.items():
+        regex_too_slow = False
+        for n in sizes:
+            text = make(n)
+            if regex_too_slow:
+                old_ms = "skipped"
+            else:
+                old = timed(regex_flatten, text)
+                old_ms = f"{old * 1000:.2f}"
+                # Larger inputs only get slower; don't wait on them
+                regex_too_slow = old > budget
+            new = timed(flatten_markdown_links, text)
+            print(f"{name:<18}{n:>8}{len(text):>10}{old_ms:>12}{new * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds after which larger regex runs are skipped")
+    args = parser.parse_args()
+    main(args.sizes, args.budget)
@@ -0,0 +1,56 @@
+"""
+Per-query overhead of a fresh httpx client per search vs. the shared pooled client.
+
+    python web_search_mcp_server/benchmark/bench_search_client.py [--queries 500]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import search_service
+from benchmark.stubs import searxng_app, serve
+
+
+async def run(queries: int) -> dict:
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        await search_service.perform_web_search(f"query {i}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean": statistics.mean(latencies),
+        "p50": statistics.median(latencies),
+        "p95": statistics.quantiles(latencies, n=20)[-1],
+    }
+
+
+async def main(queries: int):
+    logging.disable(logging.INFO)
+    # Both passes search the same queries; measure SearXNG round trips, not cache hits
+    search_service._search_cache.ttl = 0
+    async with serve(searxng_app()) as base_url:
+        search_service.configure_backends([base_url])
+
+        per_call = await run(queries)
+
+        await search_service.start_client()
+        try:
+            shared = await run(queries)
+        finally:
+            await search_service.close_client()
+
+    print(f"{'mode':<16}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stats in (("client per call", per_call), ("shared client", shared)):
+        print(f"{name:<16}{stats['mean']:>10.2f}{stats['p50']:>10.2f}{stats['p95']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=500)
+    asyncio.run(main(parser.parse_args().queries))
@@ -0,0 +1,85 @@
+"""
+Server startup cost: import time of the server module vs. the crawl stack it now loads lazily,
+and the time from launching `server.py` until /healthz answers and /readyz reports ready.
+
+    python web_search_mcp_server/benchmark/bench_startup.py [--runs 5] [--warm-up]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import time
+import httpx
+from benchmark.load_test import SERVER, free_port
+from benchmark.stubs import searxng_app, serve
+
+PACKAGE = os.path.dirname(SERVER)
+
+
+def import_seconds(module: str) -> float:
+    """Wall time of importing `module` in a fresh interpreter, minus the bare interpreter startup."""
+    def timed(code: str) -> float:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=PACKAGE, check=True, capture_output=True)
+        return time.perf_counter() - start
+
+    return timed(f"import {module}") - timed("pass")
+
+
+async def cold_start(searxng_url: str, warm_up: bool) -> dict:
+    """Launches the server and polls until it is live, then until it is ready."""
+    port = free_port()
+    env = {
+        **os.environ, "PORT": str(port), "SEARXNG_URL": searxng_url, "WARM_UP": str(warm_up).lower(),
+        "LOG_LEVEL": "WARNING", "FASTMCP_LOG_LEVEL": "WARNING",
+    }
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, SERVER], env=env)
+    timings = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            for route, key in (("/healthz", "live"), ("/readyz", "ready")):
+                while True:
+                    if process.poll() is not None:
+                        raise RuntimeError(f"Server exited with code {process.returncode}")
+                    try:
+                        if (await client.get(route)).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    await asyncio.sleep(0.02)
+                timings[key] = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+    return timings
+
+
+async def main(runs: int, warm_up: bool):
+    imports = {
+        module: statistics.median(import_seconds(module) for _ in range(runs))
+        for module in ("server", "crawl_service")
+    }
+    async with serve(searxng_app()) as searxng_url:
+        starts = [await cold_start(searxng_url, warm_up) for _ in range(runs)]
+
+    print(f"{'import':<24}{'median s':>10}")
+    for module, seconds in imports.items():
+        print(f"{module:<24}{seconds:>10.2f}")
+    print(f"\n{'cold start':<24}{'median s':>10}{'max s':>10}")
+    for key in ("live", "ready"):
+        values = [timings[key] for timings in starts]
+        print(f"{'until ' + key:<24}{statistics.median(values):>10.2f}{max(values):>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="start the server with WARM_UP=true")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.warm_up))
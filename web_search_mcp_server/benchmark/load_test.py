@@ -0,0 +1,166 @@
+"""
+Load test of the real MCP server over SSE, against local stand-ins for SearXNG and target sites.
+
+Starts the stubs, launches `server.py` as a subprocess pointed at them, and drives it with
+concurrent MCP client sessions. Reports p50/p95/p99 latency, throughput and errors per tool,
+plus the peak RSS of the server and its browsers.
+
+    python web_search_mcp_server/benchmark/load_test.py [--tools web_search crawl_url]
+        [--clients 8] [--requests 200] [--js-ratio 0.2] [--site-delay 0.0]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import itertools
+import socket
+import statistics
+import subprocess
+import time
+import httpx
+import psutil
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from benchmark.stubs import searxng_app, serve, site_app
+
+SERVER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server.py")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def start_server(port: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, SERVER],
+        env={**os.environ, "PORT": str(port), "LOG_LEVEL": "WARNING", "FASTMCP_LOG_LEVEL": "WARNING", **env},
+    )
+    async with httpx.AsyncClient() as client:
+        # The first browser launch can take a while
+        for _ in range(600):
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            try:
+                await client.get(f"http://127.0.0.1:{port}/stats")
+                return process
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+async def sample_rss(pid: int, peak: dict, interval: float = 0.1):
+    """Tracks the peak combined RSS of the server and its children (browsers) in MB."""
+    parent = psutil.Process(pid)
+    while True:
+        try:
+            processes = [parent, *parent.children(recursive=True)]
+            rss = 0
+            for process in processes:
+                try:
+                    rss += process.memory_info().rss
+                except psutil.NoSuchProcess:
+                    pass
+            peak["rss_mb"] = max(peak.get("rss_mb", 0), rss / 1024 / 1024)
+        except psutil.NoSuchProcess:
+            return
+        await asyncio.sleep(interval)
+
+
+def is_error(tool: str, text: str) -> bool:
+    if tool == "crawl_url":
+        return text.startswith("Crawl failed")
+    return text.startswith('{"error"')
+
+
+async def client(url: str, jobs, results: dict):
+    """One MCP session issuing calls back to back until the shared job list is exhausted."""
+    async with sse_client(url, sse_read_timeout=600) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for tool, arguments in jobs:
+                start = time.perf_counter()
+                try:
+                    result = await session.call_tool(tool, arguments)
+                    text = "".join(getattr(item, "text", "") for item in result.content)
+                    failed = result.isError or is_error(tool, text)
+                except Exception:
+                    failed = True
+                elapsed = time.perf_counter() - start
+                entry = results.setdefault(tool, {"latencies": [], "errors": 0})
+                entry["latencies"].append(elapsed)
+                entry["errors"] += failed
+
+
+def make_jobs(tools: list[str], requests: int, site_url: str, js_ratio: float):
+    js_every = round(1 / js_ratio) if js_ratio > 0 else 0
+    counter = itertools.count()
+    for i in range(requests):
+        tool = tools[i % len(tools)]
+        if tool == "web_search":
+            yield tool, {"query": f"load test query {i}"}
+        else:
+            n = next(counter)
+            kind = "js" if js_every and n % js_every == 0 else "static"
+            yield tool, {"url": f"{site_url}/{kind}/{n}"}
+
+
+async def main(args):
+    async with serve(searxng_app(delay=args.search_delay)) as searxng_url, \
+            serve(site_app(delay=args.site_delay)) as site_url:
+        port = free_port()
+        env = {
+            "SEARXNG_URL": searxng_url,
+            # Measure the crawl pipeline, not the caches, unless asked otherwise
+            "SEARCH_CACHE_TTL": "300" if args.cache else "0",
+            "CRAWL_CACHE_TTL": "3600" if args.cache else "0",
+            # Every page is on the one stub host; don't measure the per-host politeness limits
+            "CRAWL_HOST_RATE": "0",
+            "CRAWL_HOST_CONCURRENCY": "1000",
+            "CRAWL_ROBOTS": "off",
+        }
+        process = await start_server(port, env)
+        peak = {}
+        sampler = asyncio.create_task(sample_rss(process.pid, peak))
+        try:
+            jobs = iter(make_jobs(args.tools, args.requests, site_url, args.js_ratio))
+            results: dict = {}
+            start = time.perf_counter()
+            await asyncio.gather(*(client(f"http://127.0.0.1:{port}/sse", jobs, results) for _ in range(args.clients)))
+            duration = time.perf_counter() - start
+        finally:
+            sampler.cancel()
+            process.terminate()
+            process.wait(timeout=30)
+
+    print(f"{args.requests} requests, {args.clients} clients, {duration:.1f}s, peak RSS {peak.get('rss_mb', 0):.0f} MB")
+    print(f"{'tool':<14}{'calls':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for tool, entry in results.items():
+        latencies = [value * 1000 for value in entry["latencies"]]
+        print(
+            f"{tool:<14}{len(latencies):>7}{entry['errors']:>8}{len(latencies) / duration:>9.1f}"
+            f"{statistics.median(latencies):>10.1f}{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tools", nargs="+", default=["web_search", "crawl_url"], choices=["web_search", "crawl_url"])
+    parser.add_argument("--clients", type=int, default=8, help="concurrent MCP sessions")
+    parser.add_argument("--requests", type=int, default=200, help="total tool calls across all clients")
+    parser.add_argument("--js-ratio", type=float, default=0.2, help="share of crawl_url calls that hit the JS page")
+    parser.add_argument("--search-delay", type=float, default=0.0, help="simulated SearXNG latency in seconds")
+    parser.add_argument("--site-delay", type=float, default=0.0, help="simulated target site latency in seconds")
+    parser.add_argument("--cache", action="store_true", help="keep the search and crawl caches enabled")
+    asyncio.run(main(parser.parse_args()))
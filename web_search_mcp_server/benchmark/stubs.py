@@ -0,0 +1,93 @@
+import asyncio
+import socket
+from contextlib import asynccontextmanager
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse
+from starlette.routing import Route
+
+
+def searxng_app(results: int = 10, delay: float = 0.0) -> Starlette:
+    """
+    Minimal stand-in for the SearXNG JSON API (`/search?format=json&q=...`).
+    """
+    async def search(request: Request):
+        if delay:
+            await asyncio.sleep(delay)
+        query = request.query_params.get("q", "")
+        return JSONResponse({
+            "query": query,
+            "results": [
+                {
+                    "title": f"{query} result {i}",
+                    "url": f"https://example.com/{i}?q={query}",
+                    "content": f"Snippet {i} for {query}",
+                    "engines": ["stub"],
+                    "score": 1.0 / (i + 1),
+                }
+                for i in range(results)
+            ],
+        })
+
+    return Starlette(routes=[Route("/search", search)])
+
+
+def _article(n: int, paragraphs: int) -> str:
+    return "".join(
+        f"<h2>Section {i}</h2><p>Paragraph {i} of page {n} explains the topic in enough detail to survive "
+        f"content pruning, with a <a href='/static/{n + i}'>related page</a> and a "
+        f"<a href='https://example.com/ref/{i}'>reference</a> for further reading.</p>"
+        for i in range(paragraphs)
+    )
+
+
+def site_app(paragraphs: int = 20, delay: float = 0.0) -> Starlette:
+    """
+    Test website with a server-rendered article at `/static/{n}` and a client-rendered
+    single-page app at `/js/{n}`, which only has content once its script has run.
+    """
+    async def static_page(request: Request):
+        if delay:
+            await asyncio.sleep(delay)
+        n = int(request.path_params["n"])
+        return HTMLResponse(
+            f"<html><head><title>Static page {n}</title></head>"
+            f"<body><nav><a href='/'>Home</a></nav><main><h1>Static page {n}</h1>{_article(n, paragraphs)}</main>"
+            f"<footer>Footer</footer></body></html>"
+        )
+
+    async def js_page(request: Request):
+        if delay:
+            await asyncio.sleep(delay)
+        n = int(request.path_params["n"])
+        content = _article(n, paragraphs).replace('"', '\\"')
+        return HTMLResponse(
+            f"<html><head><title>App page {n}</title></head><body><div id=\"root\"></div>"
+            f"<script>document.getElementById('root').innerHTML = \"<h1>App page {n}</h1>{content}\";</script>"
+            f"</body></html>"
+        )
+
+    return Starlette(routes=[
+        Route("/static/{n:int}", static_page),
+        Route("/js/{n:int}", js_page),
+    ])
+
+
+@asynccontextmanager
+async def serve(app):
+    """
+    Runs an ASGI app on a free local port for the duration of the block and yields its base URL.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
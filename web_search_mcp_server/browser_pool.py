@@ -0,0 +1,237 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+import psutil
+from postprocess import postprocess_pool
+
+if TYPE_CHECKING:
+    from crawl4ai import AsyncWebCrawler
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+MAX_PAGES_PER_BROWSER = int(os.getenv("BROWSER_MAX_PAGES", "100"))
+MAX_MEMORY_MB = float(os.getenv("BROWSER_MAX_MEMORY_MB", "600"))
+ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", "30"))
+# Hosts each browser remembers having served, for host affinity
+AFFINITY_HOSTS = 64
+
+
+class BrowserUnavailable(TimeoutError):
+    """Raised when no pooled browser frees up in time; a local capacity problem, not the site's."""
+
+
+class PooledBrowser:
+    """A warm crawler plus the bookkeeping needed to decide when to recycle it."""
+
+    def __init__(self, crawler: "AsyncWebCrawler"):
+        self.crawler = crawler
+        self.pages = 0
+        self.hosts: OrderedDict[str, None] = OrderedDict()
+
+    def served(self, host: str):
+        self.hosts[host] = None
+        self.hosts.move_to_end(host)
+        while len(self.hosts) > AFFINITY_HOSTS:
+            self.hosts.popitem(last=False)
+
+
+class BrowserPool:
+    """
+    Server-lifetime pool of warm AsyncWebCrawler instances.
+
+    Browsers are checked out with `acquire()` and returned automatically. A browser is
+    replaced when it fails its health check, after `max_pages` crawls, or when the
+    average browser memory exceeds `max_memory_mb`. Given a host, `acquire()` prefers an
+    idle browser that served it recently, whose context still has the site's cookies,
+    cache and open connections.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, max_pages: int = MAX_PAGES_PER_BROWSER,
+                 max_memory_mb: float = MAX_MEMORY_MB, acquire_timeout: float = ACQUIRE_TIMEOUT):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.acquire_timeout = acquire_timeout
+        self.started = False
+        self.recycled = 0
+        self.affinity_hits = 0
+        self._idle: asyncio.Queue[PooledBrowser] = asyncio.Queue()
+        self._in_use = 0
+        self._missing = 0
+        self._start_lock = asyncio.Lock()
+        self._replacements: set[asyncio.Task] = set()
+
+    async def start(self):
+        """Launch `size` warm browsers at once. Safe to call more than once."""
+        async with self._start_lock:
+            if self.started or self.size <= 0:
+                return
+            logger.info(f"Starting browser pool with {self.size} browsers")
+            launched = await asyncio.gather(*(self._launch() for _ in range(self.size)), return_exceptions=True)
+            errors = [result for result in launched if isinstance(result, BaseException)]
+            if errors:
+                # Fall back to per-call browsers rather than failing the session
+                logger.error(f"Failed to start browser pool: {errors[0]}")
+                for result in launched:
+                    if isinstance(result, PooledBrowser):
+                        await self._shutdown(result)
+                return
+            for browser in launched:
+                self._idle.put_nowait(browser)
+            self.started = True
+
+    async def close(self):
+        """Close every browser in the pool."""
+        async with self._start_lock:
+            if not self.started:
+                return
+            self.started = False
+            for task in list(self._replacements):
+                task.cancel()
+            await asyncio.gather(*self._replacements, return_exceptions=True)
+            while not self._idle.empty():
+                await self._shutdown(self._idle.get_nowait())
+            logger.info("Browser pool closed")
+
+    @asynccontextmanager
+    async def acquire(self, host: str | None = None):
+        """Check out a healthy crawler, returning it to the pool on exit."""
+        if self._idle.empty() and self._missing > 0:
+            # A previous relaunch failed; try again now that someone needs a browser
+            self._missing -= 1
+            try:
+                self._idle.put_nowait(await self._launch())
+            except Exception:
+                self._missing += 1
+                raise
+
+        try:
+            browser = await asyncio.wait_for(self._idle.get(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise BrowserUnavailable(f"No browser available after {self.acquire_timeout}s")
+        if host is not None:
+            browser = self._prefer(browser, host)
+
+        if not self._is_healthy(browser):
+            logger.warning("Pooled browser failed health check, relaunching")
+            await self._shutdown(browser)
+            try:
+                browser = await self._launch()
+            except Exception:
+                self._missing += 1
+                raise
+
+        self._in_use += 1
+        try:
+            yield browser.crawler
+        finally:
+            browser.pages += 1
+            if host is not None:
+                browser.served(host)
+            self._in_use -= 1
+            self._release(browser)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "in_use": self._in_use,
+            "recycled": self.recycled,
+            "affinity_hits": self.affinity_hits,
+        }
+
+    def _prefer(self, browser: PooledBrowser, host: str) -> PooledBrowser:
+        """Swaps `browser` for an idle one that served `host` recently, if there is one."""
+        if host in browser.hosts:
+            self.affinity_hits += 1
+            return browser
+        for _ in range(self._idle.qsize()):
+            candidate = self._idle.get_nowait()
+            if host in candidate.hosts:
+                self.affinity_hits += 1
+                self._idle.put_nowait(browser)
+                return candidate
+            self._idle.put_nowait(candidate)
+        return browser
+
+    def _release(self, browser: PooledBrowser):
+        if not self.started:
+            self._spawn(self._shutdown(browser))
+        elif self._needs_recycle(browser):
+            self.recycled += 1
+            self._spawn(self._replace(browser))
+        else:
+            self._idle.put_nowait(browser)
+
+    def _needs_recycle(self, browser: PooledBrowser) -> bool:
+        if browser.pages >= self.max_pages:
+            logger.info(f"Recycling browser after {browser.pages} pages")
+            return True
+        memory_mb = self._memory_per_browser_mb()
+        if memory_mb > self.max_memory_mb:
+            logger.info(f"Recycling browser, average browser memory is {memory_mb:.0f} MB")
+            return True
+        return False
+
+    def _memory_per_browser_mb(self) -> float:
+        # Playwright does not expose browser PIDs, so attribute the RSS of all child
+        # processes (driver + Chromium) evenly across the pooled browsers, leaving out
+        # the post-processing workers.
+        rss = 0
+        workers = postprocess_pool.pids()
+        for child in psutil.Process().children(recursive=True):
+            if child.pid in workers:
+                continue
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / (1024 * 1024) / max(self.size, 1)
+
+    @staticmethod
+    def _is_healthy(browser: PooledBrowser) -> bool:
+        manager = getattr(browser.crawler.crawler_strategy, "browser_manager", None)
+        playwright_browser = getattr(manager, "browser", None)
+        if not browser.crawler.ready or playwright_browser is None:
+            return False
+        return playwright_browser.is_connected()
+
+    async def _replace(self, browser: PooledBrowser):
+        await self._shutdown(browser)
+        try:
+            self._idle.put_nowait(await self._launch())
+        except Exception as e:
+            logger.error(f"Failed to relaunch browser: {e}")
+            self._missing += 1
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._replacements.add(task)
+        task.add_done_callback(self._replacements.discard)
+
+    @staticmethod
+    async def _launch() -> PooledBrowser:
+        # Imported on first launch so servers that never render don't load Playwright
+        from crawl4ai import AsyncWebCrawler
+        from crawl_profile import install_hooks
+
+        crawler = AsyncWebCrawler()
+        install_hooks(crawler)
+        await crawler.start()
+        return PooledBrowser(crawler)
+
+    @staticmethod
+    async def _shutdown(browser: PooledBrowser):
+        try:
+            await browser.crawler.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser: {e}")
+
+
+browser_pool = BrowserPool()
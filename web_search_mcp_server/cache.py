@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL and single-flight loading.
+
+    Concurrent `get_or_load` calls for the same key share one in-flight load, so N
+    identical requests cause a single call to the loader. Loader errors are not cached. If the
+    caller that started a load is cancelled, the callers waiting on it start a new load.
+
+    With `stale_ttl`, an entry that expired less than `stale_ttl` seconds ago is still
+    returned by `get_or_load` while a background load refreshes it (stale-while-revalidate).
+    If the refresh fails, the stale value keeps being served until its grace period ends.
+
+    With a shared `backend`, local misses are looked up there before calling the loader and
+    loaded values are written back, so other workers can reuse them. Keys and values must
+    then be JSON-serializable.
+    """
+
+    def __init__(self, max_size: int, ttl: float, backend=None, namespace: str = "", stale_ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_hits = 0
+        self.stale_hits = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        # Background refreshes, referenced so they aren't garbage collected mid-flight
+        self._refreshes: dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def _lookup(self, key: Hashable) -> tuple[Any, bool] | None:
+        """Returns (value, stale), or None once the entry is past its grace period."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at + self.stale_ttl <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, expires_at <= now
+
+    def get(self, key: Hashable) -> Any | None:
+        found = self._lookup(key)
+        if found is None or found[1]:
+            return None
+        return found[0]
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        found = self._lookup(key)
+        if found is not None:
+            value, stale = found
+            if stale:
+                self.stale_hits += 1
+                self._refresh(key, loader)
+            else:
+                self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The caller that started the load went away; load again rather than fail with it
+                return await self.get_or_load(key, loader)
+
+        self.misses += 1
+        return await self._load_once(key, loader)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        if key in self._inflight or key in self._refreshes:
+            return
+
+        async def refresh():
+            try:
+                await self._load_once(key, loader)
+            except Exception as e:
+                logger.warning(f"Background refresh failed, serving stale entry: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._refreshes[key] = task
+        task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+
+    async def wait_for_refreshes(self):
+        """Waits for background refreshes that are currently running."""
+        await asyncio.gather(*self._refreshes.values(), return_exceptions=True)
+
+    async def _load_once(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark as retrieved so an unawaited failure doesn't warn
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        if self.backend is None or not self.enabled:
+            return await loader()
+        shared_key = self.namespace + json.dumps(key)
+        cached = await self.backend.get(shared_key)
+        if cached is not None:
+            self.shared_hits += 1
+            return json.loads(cached)
+        value = await loader()
+        await self.backend.set(shared_key, json.dumps(value), self.ttl)
+        return value
+
+    def stats(self) -> dict:
+        stats = {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+        if self.backend is not None:
+            stats["shared_hits"] = self.shared_hits
+        if self.stale_ttl > 0:
+            stats["stale_hits"] = self.stale_hits
+        return stats
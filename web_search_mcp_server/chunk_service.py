@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from dataclasses import asdict, dataclass
+from cache import TTLCache
+from crawl_profile import get_profile
+from crawl_service import CrawlError, fit_to_budget, load_page, output_budget
+from politeness import RobotsDisallowed
+from shared_backend import shared_backend
+from urls import canonicalize_url
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# How long a crawled page stays readable by its handle, and how many pages each worker keeps
+DOCUMENT_TTL = float(os.getenv("CRAWL_DOCUMENT_TTL", "3600"))
+DOCUMENT_CACHE_SIZE = int(os.getenv("CRAWL_DOCUMENT_CACHE_SIZE", "64"))
+# Headings listed in the outline returned with the first chunk
+MAX_OUTLINE_ENTRIES = int(os.getenv("CRAWL_MAX_OUTLINE_ENTRIES", "100"))
+
+_HEADING = re.compile(r"(#{1,6})[ \t]+(.+?)[ \t#]*$")
+_FENCE = re.compile(r"[ \t]*(```|~~~)")
+
+# Handle -> document; shared between workers when a shared backend is configured
+_documents = TTLCache(
+    max_size=DOCUMENT_CACHE_SIZE,
+    ttl=DOCUMENT_TTL,
+    backend=shared_backend,
+    namespace="document:",
+)
+
+
+class UnknownDocument(Exception):
+    """Raised for handles that were never issued or have expired."""
+
+
+@dataclass
+class Document:
+    """Full clean text of a crawled page plus its heading outline, addressable by character offset."""
+
+    handle: str
+    url: str
+    text: str
+    outline: list[dict]
+
+    def find_section(self, name: str) -> dict | None:
+        """Returns the heading whose title matches `name` exactly, else the first containing it."""
+        name = name.strip().lower()
+        for entry in self.outline:
+            if entry["title"].lower() == name:
+                return entry
+        for entry in self.outline:
+            if name in entry["title"].lower():
+                return entry
+        return None
+
+    def read(self, offset: int, budget: int) -> tuple[str, int | None]:
+        """
+        Returns up to `budget` characters starting at `offset`, cut on a block boundary like
+        crawl_url output, and the offset the next chunk starts at (None at the end).
+        """
+        chunk = fit_to_budget(self.text[offset:], budget)
+        end = offset + len(chunk)
+        # Skip the whitespace trimmed from the end of the chunk
+        while end < len(self.text) and self.text[end].isspace():
+            end += 1
+        return chunk, (end if end < len(self.text) else None)
+
+
+def build_outline(text: str) -> list[dict]:
+    """
+    Lists markdown headings with their level and character offset, skipping lines inside
+    fenced code blocks.
+    """
+    outline = []
+    offset = 0
+    in_code = False
+    for line in text.splitlines(keepends=True):
+        if _FENCE.match(line):
+            in_code = not in_code
+        elif not in_code:
+            match = _HEADING.match(line.rstrip("\r\n"))
+            if match:
+                outline.append({"level": len(match.group(1)), "title": match.group(2), "offset": offset})
+                if len(outline) >= MAX_OUTLINE_ENTRIES:
+                    break
+        offset += len(line)
+    return outline
+
+
+def _handle(url: str, text: str) -> str:
+    # Same page content, same handle, so repeated crawls don't pile up copies
+    digest = hashlib.sha256(f"{canonicalize_url(url)}\0{text}".encode())
+    return digest.hexdigest()[:16]
+
+
+async def _save(url: str, text: str) -> Document:
+    handle = _handle(url, text)
+    document = Document(handle=handle, url=url, text=text, outline=build_outline(text))
+
+    async def load() -> dict:
+        return asdict(document)
+
+    # Writes the document through to the shared backend, if any
+    await _documents.get_or_load(handle, load)
+    return document
+
+
+async def _load(handle: str) -> Document:
+    async def missing() -> dict:
+        raise UnknownDocument(f"Unknown or expired handle '{handle}', crawl the page again with chunked=true")
+
+    return Document(**await _documents.get_or_load(handle, missing))
+
+
+def _chunk(document: Document, offset: int, budget: int) -> dict:
+    content, next_offset = document.read(offset, budget)
+    return {
+        "url": document.url,
+        "handle": document.handle,
+        "total_chars": len(document.text),
+        "offset": offset,
+        "next_offset": next_offset,
+        "content": content,
+    }
+
+
+async def perform_crawl_chunked(url: str, max_chars: int | None = None, max_tokens: int | None = None,
+                                profile: str | None = None) -> str:
+    """
+    Crawls a page and returns JSON with its first chunk, a handle for `perform_read_page_chunk`
+    and the page's heading outline with character offsets.
+    """
+    logger.info(f"Starting chunked crawl for: {url}")
+    budget = output_budget(max_chars, max_tokens)
+    try:
+        text = await load_page(url, get_profile(profile))
+    except (ValueError, CrawlError, RobotsDisallowed, TimeoutError) as e:
+        return json.dumps({"error": f"Crawl failed: {e}"})
+
+    document = await _save(url, text)
+    result = _chunk(document, 0, budget)
+    result["outline"] = document.outline
+    logger.info(f"Returning chunk 0-{len(result['content'])} of {len(text)} chars, handle {document.handle}")
+    return json.dumps(result, indent=2)
+
+
+async def perform_read_page_chunk(handle: str, offset: int | None = None, section: str | None = None,
+                                  max_chars: int | None = None, max_tokens: int | None = None) -> str:
+    """
+    Returns JSON with the chunk of a previously crawled page that starts at `offset` or at the
+    heading matching `section`, served from the stored copy without crawling again.
+    """
+    if offset is not None and section is not None:
+        return json.dumps({"error": "Pass either offset or section, not both"})
+    try:
+        document = await _load(handle)
+    except UnknownDocument as e:
+        return json.dumps({"error": str(e)})
+
+    if section is not None:
+        entry = document.find_section(section)
+        if entry is None:
+            return json.dumps({"error": f"No section matching '{section}'"})
+        offset = entry["offset"]
+    offset = offset or 0
+    if not 0 <= offset < len(document.text):
+        return json.dumps({"error": f"Offset {offset} is outside the page (0-{len(document.text) - 1})"})
+
+    result = _chunk(document, offset, output_budget(max_chars, max_tokens))
+    if section is not None:
+        result["section"] = entry["title"]
+    return json.dumps(result, indent=2)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Expired and excess rows are purged from the sqlite store every this many writes
+PURGE_INTERVAL = 100
+
+
+@dataclass
+class CachedPage:
+    """Post-processed page content plus the validators needed to revalidate it."""
+
+    url: str
+    content: str
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = 0.0
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class CrawlCache:
+    """
+    In-memory LRU in front of a sqlite store, keyed by canonical URL.
+
+    Entries are kept past their TTL so that stale pages can be revalidated with a
+    conditional request instead of being rendered again. `path=""` keeps the cache
+    in memory only. With a shared `backend`, pages are also stored there for
+    `retention` seconds and looked up before the local sqlite file.
+
+    The sqlite store drops pages once they are older than `ttl + stale_ttl + retention`
+    and keeps at most `max_rows` of the most recently fetched ones. Its errors (for example
+    a database locked by another worker) are logged and treated as cache misses.
+    """
+
+    def __init__(self, path: str, ttl: float, memory_size: int = 256, backend=None, retention: float = 7 * 86400,
+                 stale_ttl: float = 0, max_rows: int = 2000):
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.backend = backend
+        self.retention = retention
+        self.stale_ttl = stale_ttl
+        self.max_rows = max_rows
+        self._memory: OrderedDict[str, CachedPage] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get(self, url: str) -> CachedPage | None:
+        if not self.enabled:
+            return None
+        page = self._memory.get(url)
+        if page is not None:
+            self._memory.move_to_end(url)
+            return page
+        page = None
+        if self.backend is not None:
+            cached = await self.backend.get(f"page:{url}")
+            page = CachedPage(**json.loads(cached)) if cached else None
+        if page is None and self.path:
+            try:
+                page = await asyncio.to_thread(self._load, url)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to read {url} from the crawl cache: {e}")
+        if page is not None:
+            self._remember(page)
+        return page
+
+    async def put(self, page: CachedPage):
+        if not self.enabled:
+            return
+        self._remember(page)
+        if self.backend is not None:
+            await self.backend.set(f"page:{page.url}", json.dumps(asdict(page)), self.retention)
+        if self.path:
+            try:
+                await asyncio.to_thread(self._store, page)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write {page.url} to the crawl cache: {e}")
+
+    async def touch(self, page: CachedPage):
+        """Marks a revalidated page as fresh again."""
+        page.fetched_at = time.time()
+        await self.put(page)
+
+    def clear(self):
+        self._memory.clear()
+        if self.path:
+            with self._db_lock:
+                self._connection().execute("DELETE FROM pages")
+                self._connection().commit()
+
+    def _remember(self, page: CachedPage):
+        self._memory[page.url] = page
+        self._memory.move_to_end(page.url)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, content TEXT NOT NULL, etag TEXT, "
+                "last_modified TEXT, fetched_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at)")
+            self._purge(self._db)
+        return self._db
+
+    def _purge(self, db: sqlite3.Connection):
+        """Deletes pages past their retention, then the oldest pages beyond `max_rows`."""
+        cutoff = time.time() - (self.ttl + self.stale_ttl + self.retention)
+        expired = db.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,)).rowcount
+        excess = db.execute(
+            "DELETE FROM pages WHERE url IN (SELECT url FROM pages ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        ).rowcount
+        db.commit()
+        if expired or excess:
+            logger.info(f"Purged {expired} expired and {excess} excess pages from the crawl cache")
+
+    def _load(self, url: str) -> CachedPage | None:
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT url, content, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        return CachedPage(*row) if row else None
+
+    def _store(self, page: CachedPage):
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO pages (url, content, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (page.url, page.content, page.etag, page.last_modified, page.fetched_at),
+            )
+            db.commit()
+            self._writes += 1
+            if self._writes % PURGE_INTERVAL == 0:
+                self._purge(db)
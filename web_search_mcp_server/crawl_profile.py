@@ -0,0 +1,137 @@
+import os
+import logging
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from crawl4ai.async_crawler_strategy import AsyncPlaywrightCrawlerStrategy
+import metrics
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# lean: block heavy assets and trackers, short wait; full: load the page like a normal browser
+DEFAULT_PROFILE = os.getenv("CRAWL_PROFILE", "lean").lower()
+LEAN_BLOCKED_RESOURCE_TYPES = frozenset(
+    resource_type.strip() for resource_type in
+    os.getenv("CRAWL_BLOCKED_RESOURCE_TYPES", "image,media,font,stylesheet").split(",")
+    if resource_type.strip()
+)
+# Extra domains (and their subdomains) whose subresources lean crawls never load
+BLOCKED_DOMAINS = tuple(
+    domain.strip().lower() for domain in os.getenv("CRAWL_BLOCKED_DOMAINS", "").split(",") if domain.strip()
+)
+# After DOMContentLoaded, wait at most this long for the network to go idle
+LEAN_NETWORK_IDLE_CAP = float(os.getenv("CRAWL_LEAN_NETWORK_IDLE_CAP", "2"))
+LEAN_PAGE_TIMEOUT = float(os.getenv("CRAWL_LEAN_PAGE_TIMEOUT", "15"))
+
+# Ad, analytics and tag-manager hosts that never carry page content
+AD_TRACKER_DOMAINS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "hotjar.com",
+    "facebook.net",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "newrelic.com",
+    "nr-data.net",
+    "clarity.ms",
+)
+
+
+@dataclass(frozen=True)
+class CrawlProfile:
+    """How the browser loads a page: what it may fetch, how long it waits, and its time budget."""
+
+    name: str
+    blocked_resource_types: frozenset[str] = frozenset()
+    blocked_domains: tuple[str, ...] = ()
+    network_idle_cap: float = 0.0
+    page_timeout: float | None = None
+
+    def blocks(self, url: str, resource_type: str) -> str | None:
+        """Returns why a subresource is blocked ("resource_type" or "domain"), or None."""
+        if resource_type in self.blocked_resource_types:
+            return "resource_type"
+        host = (urlsplit(url).hostname or "").lower()
+        for domain in self.blocked_domains:
+            if host == domain or host.endswith("." + domain):
+                return "domain"
+        return None
+
+
+PROFILES = {
+    "lean": CrawlProfile(
+        name="lean",
+        blocked_resource_types=LEAN_BLOCKED_RESOURCE_TYPES,
+        blocked_domains=AD_TRACKER_DOMAINS + BLOCKED_DOMAINS,
+        network_idle_cap=LEAN_NETWORK_IDLE_CAP,
+        page_timeout=LEAN_PAGE_TIMEOUT,
+    ),
+    # Same as a plain crawl4ai render, for pages that need their assets
+    "full": CrawlProfile(name="full", blocked_domains=BLOCKED_DOMAINS),
+}
+
+
+def get_profile(name: str | None = None) -> CrawlProfile:
+    """Returns the named profile, or CRAWL_PROFILE. Raises ValueError for unknown names."""
+    name = (name or DEFAULT_PROFILE).lower()
+    profile = PROFILES.get(name)
+    if profile is None:
+        raise ValueError(f"Unknown crawl profile '{name}', use one of: {', '.join(PROFILES)}")
+    return profile
+
+
+def _profile_of(config) -> CrawlProfile | None:
+    shared_data = getattr(config, "shared_data", None) or {}
+    return shared_data.get("crawl_profile")
+
+
+async def _on_page_context_created(page, context=None, config=None, **kwargs):
+    profile = _profile_of(config)
+    if profile is None or not (profile.blocked_resource_types or profile.blocked_domains):
+        return page
+
+    async def route_request(route):
+        request = route.request
+        # The page itself always loads, even when its own domain is on the blocklist
+        reason = None if request.is_navigation_request() else profile.blocks(request.url, request.resource_type)
+        if reason is None:
+            await route.fallback()
+        else:
+            metrics.blocked_requests.inc(reason=reason)
+            await route.abort("blockedbyclient")
+
+    await page.route("**/*", route_request)
+    return page
+
+
+async def _after_goto(page, context=None, url=None, response=None, config=None, **kwargs):
+    profile = _profile_of(config)
+    if profile is not None and profile.network_idle_cap > 0:
+        try:
+            await page.wait_for_load_state("networkidle", timeout=profile.network_idle_cap * 1000)
+        except Exception:
+            # Pages with long-polling or analytics beacons never go idle; use what has loaded
+            logger.debug(f"{url} was not network idle after {profile.network_idle_cap:g}s")
+    return page
+
+
+def install_hooks(crawler):
+    """Lets the crawler apply the profile passed in a run config's shared_data."""
+    strategy = crawler.crawler_strategy
+    if not isinstance(strategy, AsyncPlaywrightCrawlerStrategy):
+        return
+    strategy.set_hook("on_page_context_created", _on_page_context_created)
+    strategy.set_hook("after_goto", _after_goto)
@@ -1,30 +1,416 @@
+import os
 import re
+import json
+import time
+import hashlib
+import socket
+import asyncio
 import logging
+import tempfile
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Awaitable, Callable
+import metrics
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
 from crawl4ai.content_filter_strategy import PruningContentFilter
 from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+from browser_pool import BrowserUnavailable, browser_pool
+from cache import TTLCache
+from crawl_cache import CachedPage, CrawlCache
+from crawl_profile import DEFAULT_PROFILE, CrawlProfile, get_profile, install_hooks
+from fetch_client import fetch_client
+from politeness import RobotsDisallowed, host_key, scheduler
+from relevance import GAP_MARKER, PageIndex
+from postprocess import postprocess_pool
+from shared_backend import shared_backend
+from extractors import extract_document
+from static_fetch import DocumentTooLarge, PageNotFound, StaticDocument, StaticPage, fetch_html, needs_browser
+from urls import canonicalize_url
 
 # Configure logger
 logger = logging.getLogger(__name__)
-threshold = 10000
+
+# Output budget: per-call default, hard upper bound, and token estimate
+DEFAULT_MAX_CHARS = int(os.getenv("CRAWL_MAX_CHARS", "10000"))
+MAX_OUTPUT_CHARS = int(os.getenv("CRAWL_MAX_OUTPUT_CHARS", "50000"))
+CHARS_PER_TOKEN = 4
+# Clean text kept per page, so long pages can be read chunk by chunk from the cache
+MAX_DOCUMENT_CHARS = int(os.getenv("CRAWL_MAX_DOCUMENT_CHARS", "500000"))
+
+CRAWL_CACHE_TTL = float(os.getenv("CRAWL_CACHE_TTL", "3600"))
+CRAWL_CACHE_PATH = os.getenv("CRAWL_CACHE_PATH", os.path.join(tempfile.gettempdir(), "web-search-mcp", "crawl_cache.sqlite3"))
+CRAWL_CACHE_MEMORY_SIZE = int(os.getenv("CRAWL_CACHE_MEMORY_SIZE", "256"))
+# How long stale pages stay in the shared backend for revalidation
+CRAWL_CACHE_RETENTION = float(os.getenv("CRAWL_CACHE_RETENTION", str(7 * 86400)))
+# Pages kept in the sqlite file; the least recently fetched are dropped first
+CRAWL_CACHE_MAX_PAGES = int(os.getenv("CRAWL_CACHE_MAX_PAGES", "2000"))
+# Expired pages are still served this long while they are refreshed in the background
+CRAWL_STALE_TTL = float(os.getenv("CRAWL_STALE_TTL", "86400"))
+CRAWL_MAX_REFRESHES = int(os.getenv("CRAWL_MAX_REFRESHES", "4"))
+# Hard failures (page gone, unknown host, timeout) are answered from memory this long
+CRAWL_NEGATIVE_TTL = float(os.getenv("CRAWL_NEGATIVE_TTL", "120"))
+CRAWL_NEGATIVE_CACHE_SIZE = int(os.getenv("CRAWL_NEGATIVE_CACHE_SIZE", "1024"))
+# Pages whose blocks and BM25 term statistics are kept for query-focused crawls
+CRAWL_INDEX_CACHE_SIZE = int(os.getenv("CRAWL_INDEX_CACHE_SIZE", "64"))
+CRAWL_BATCH_CONCURRENCY = int(os.getenv("CRAWL_BATCH_CONCURRENCY", "4"))
+CRAWL_BATCH_MAX_URLS = int(os.getenv("CRAWL_BATCH_MAX_URLS", "10"))
+CRAWL_URL_TIMEOUT = float(os.getenv("CRAWL_URL_TIMEOUT", "30"))
+# auto: plain HTTP first, browser when the page needs JS; http: never launch a browser; browser: always render
+CRAWL_FETCH_MODE = os.getenv("CRAWL_FETCH_MODE", "auto").lower()
+# Static pages that produce less markdown than this are re-rendered in the browser
+MIN_STATIC_MARKDOWN_CHARS = int(os.getenv("STATIC_MIN_MARKDOWN_CHARS", "200"))
+
+_crawl_cache = CrawlCache(
+    path=CRAWL_CACHE_PATH,
+    ttl=CRAWL_CACHE_TTL,
+    memory_size=CRAWL_CACHE_MEMORY_SIZE,
+    backend=shared_backend,
+    retention=CRAWL_CACHE_RETENTION,
+    stale_ttl=CRAWL_STALE_TTL,
+    max_rows=CRAWL_CACHE_MAX_PAGES,
+)
+_failure_cache = TTLCache(max_size=CRAWL_NEGATIVE_CACHE_SIZE, ttl=CRAWL_NEGATIVE_TTL)
+# Content digest -> (blocks, PageIndex), so repeated queries against a page skip re-tokenizing it
+_index_cache = TTLCache(max_size=CRAWL_INDEX_CACHE_SIZE, ttl=CRAWL_CACHE_TTL)
+# Canonical URL -> background refresh of its stale cached page
+_refreshing: dict[str, asyncio.Task] = {}
+# Background start of the browser and post-processing pools, begun by the first crawl
+_warm_up: asyncio.Task | None = None
+
+# Browser errors that won't go away on an immediate retry
+_HARD_RENDER_ERROR = re.compile(r"ERR_NAME_NOT_RESOLVED|Timeout \d+ms exceeded")
+_RENDER_TIMEOUT = re.compile(r"Timeout \d+ms exceeded")
+
+# A whole bracket-free link (fast path), or a single opening/closing bracket
+_LINK_TOKEN = re.compile(r"!?\[([^\[\]]*)\]\([^()\s\[\]]+\)|!?\[|\]")
 
 def flatten_markdown_links(text):
     """
     Robustly removes markdown links/images while keeping the text/alt-text.
+
+    Single left-to-right pass: open brackets go on a stack, and a `]` followed by `(url)`
+    replaces its bracket with the inner text. Nested links and images collapse innermost
+    first; a bracket pair that isn't a link keeps its enclosing brackets literal too.
     """
     if not text:
         return ""
-    
-    prev_text = None
-    while text != prev_text:
-        prev_text = text
-        text = re.sub(r'!?(?:\[((?:[^\[\]]|!\[[^\]]*\]\([^\)]+\))*)\])\([^\)]+\)', r'\1', text)
-        
-    return text
-
-async def perform_crawl(url: str) -> str:
-    logger.info(f"Starting crawl for: {url}")
 
+    out = []
+    append = out.append
+    # Each frame is [index of the opening bracket in `out`, contains a literal bracket pair]
+    stack = []
+    next_close = -1
+    pos = 0
+    length = len(text)
+    search = _LINK_TOKEN.search
+
+    while True:
+        match = search(text, pos)
+        if match is None:
+            break
+
+        append(text[pos:match.start()])
+        pos = match.end()
+        token = match.group()
+        if token[-1] == ")":
+            append(match.group(1))
+            continue
+        if token != "]":
+            stack.append([len(out), False])
+            append(token)
+            continue
+        if not stack:
+            append("]")
+            continue
+
+        opening, literal = stack.pop()
+        if not literal and pos < length and text[pos] == "(":
+            # Find the closing paren once and reuse it for later targets, keeping the scan linear
+            if next_close <= pos:
+                next_close = text.find(")", pos + 1)
+                if next_close == -1:
+                    next_close = length
+            if pos + 1 < next_close < length:
+                out[opening] = ""
+                pos = next_close + 1
+                continue
+
+        append("]")
+        if stack:
+            stack[-1][1] = True
+
+    append(text[pos:])
+    return "".join(out)
+
+# Paragraph breaks and the line break before a heading
+_BLOCK_BREAK = re.compile(r"\n[ \t]*\n\s*|\n(?=#{1,6}\s)")
+
+def output_budget(max_chars: int | None = None, max_tokens: int | None = None) -> int:
+    """
+    Resolves a per-call output budget in characters. Tokens are approximated as CHARS_PER_TOKEN
+    characters; when both limits are given the smaller wins.
+    """
+    limits = []
+    if max_chars is not None:
+        limits.append(max_chars)
+    if max_tokens is not None:
+        limits.append(max_tokens * CHARS_PER_TOKEN)
+    budget = min(limits) if limits else DEFAULT_MAX_CHARS
+    return max(1, min(budget, MAX_OUTPUT_CHARS))
+
+def _iter_blocks(text: str):
+    """
+    Lazily splits markdown into paragraph/heading blocks, each keeping its trailing separator.
+    """
+    pos = 0
+    for match in _BLOCK_BREAK.finditer(text):
+        yield text[pos:match.end()]
+        pos = match.end()
+    if pos < len(text):
+        yield text[pos:]
+
+def _snap(text: str, limit: int) -> str:
+    """
+    Cuts a block to at most `limit` characters at the last line, sentence or word break
+    in the second half of the window; hard-cuts when there is none.
+    """
+    window = text[:limit]
+    for separator in ("\n", ". ", " "):
+        index = window.rfind(separator)
+        if index >= limit // 2:
+            return window[:index + len(separator)].rstrip()
+    return window
+
+def fit_to_budget(text: str, budget: int, flatten: bool = False) -> str:
+    """
+    Collects whole blocks of `text` until `budget` characters are used, optionally flattening
+    links block by block so the rest of the page is never processed. The cut lands on a block
+    boundary unless that would leave more than half the budget unused.
+    """
+    parts = []
+    size = 0
+    for block in _iter_blocks(text):
+        if flatten:
+            block = flatten_markdown_links(block)
+        if size + len(block) <= budget:
+            parts.append(block)
+            size += len(block)
+            continue
+
+        logger.info(f"Size of the page is too big, return only first {budget} characters")
+        remaining = budget - size
+        if size < budget // 2:
+            parts.append(_snap(block, remaining))
+        return "".join(parts).rstrip()
+
+    return "".join(parts)
+
+def _fit_output(content: str, budget: int) -> str:
+    """
+    Fits cached clean text to the caller's budget, counting pages that had to be cut.
+    """
+    clean_text = fit_to_budget(content, budget)
+    if len(clean_text) < len(content):
+        metrics.truncations.inc()
+    return clean_text
+
+def _build_index(content: str) -> tuple[list[str], PageIndex]:
+    blocks = list(_iter_blocks(content))
+    return blocks, PageIndex.build(blocks)
+
+async def _page_index(content: str) -> tuple[list[str], PageIndex]:
+    async def build():
+        # Tokenizing a long page takes tens of milliseconds; keep the event loop responsive
+        return await asyncio.to_thread(_build_index, content)
+
+    return await _index_cache.get_or_load(hashlib.sha1(content.encode()).hexdigest(), build)
+
+async def _relevant_output(content: str, query: str, budget: int) -> str:
+    """
+    Fits clean text to the budget with the passages most relevant to `query` (BM25 over
+    paragraph and heading blocks), in page order with "[...]" where text was left out.
+    Pages that fit, or that don't mention any query term, get the usual leading cut.
+    """
+    if len(content) <= budget:
+        return content
+    blocks, index = await _page_index(content)
+    chosen = index.select(query, budget)
+    if not chosen:
+        logger.info(f"No passages match '{query}', returning the start of the page")
+        return _fit_output(content, budget)
+
+    parts = []
+    previous = -1
+    for block in chosen:
+        if block != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(blocks[block])
+        previous = block
+    if previous != len(blocks) - 1:
+        parts.append(GAP_MARKER)
+    metrics.truncations.inc()
+    logger.info(f"Selected {len(chosen)} of {len(blocks)} blocks relevant to '{query}'")
+    return fit_to_budget("".join(parts), budget).rstrip()
+
+async def warm_up():
+    """
+    Starts the post-processing and browser pools concurrently, skipping those already running.
+    With CRAWL_FETCH_MODE=http no browser is ever used, so the browser pool stays down.
+    """
+    pools = (postprocess_pool,) if CRAWL_FETCH_MODE == "http" else (postprocess_pool, browser_pool)
+    await asyncio.gather(*(pool.start() for pool in pools if not pool.started))
+
+def start_warm_up() -> asyncio.Task:
+    """
+    Starts `warm_up` in the background once. Until the pools are up, pages are converted inline
+    and browser renders wait for the pool.
+    """
+    global _warm_up
+    if _warm_up is None:
+        _warm_up = asyncio.create_task(warm_up())
+    return _warm_up
+
+@asynccontextmanager
+async def _checkout_crawler(url: str | None = None):
+    """
+    Yields a crawler from the shared browser pool, preferring one that recently rendered the URL's
+    host, or a one-off crawler when the pool can't be started.
+    """
+    if not browser_pool.started:
+        # Waits for a start already in progress rather than launching a browser next to the pool
+        await browser_pool.start()
+    if browser_pool.started:
+        checkout = browser_pool.acquire(host_key(url) if url else None)
+    else:
+        logger.info("Launching crawler...")
+        checkout = AsyncWebCrawler()
+        install_hooks(checkout)
+    async with AsyncExitStack() as stack:
+        try:
+            with metrics.browser_acquire_seconds.time():
+                crawler = await stack.enter_async_context(checkout)
+        except Exception:
+            metrics.failures.inc(stage="browser_acquire")
+            raise
+        yield crawler
+
+def _header(headers: dict | None, name: str) -> str | None:
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+async def _revalidate(url: str, page: CachedPage) -> bool:
+    """
+    Sends a conditional GET for a stale cached page. Returns True if the server reports it unchanged.
+    """
+    headers = {}
+    if page.etag:
+        headers["If-None-Match"] = page.etag
+    if page.last_modified:
+        headers["If-Modified-Since"] = page.last_modified
+    try:
+        async with fetch_client() as client:
+            # Stream so an unexpected 200 doesn't download the body
+            async with client.stream("GET", url, headers=headers) as response:
+                return response.status_code == 304
+    except Exception as e:
+        logger.warning(f"Revalidation failed for {url}: {e}")
+        return False
+
+async def _polite_revalidate(url: str, page: CachedPage) -> bool:
+    try:
+        async with scheduler.slot(url):
+            return await _revalidate(url, page)
+    except RobotsDisallowed:
+        return False
+
+class CrawlError(Exception):
+    """Raised when a page could not be crawled."""
+
+class RecentFailure(CrawlError):
+    """Raised without crawling for URLs that hit a hard failure within CRAWL_NEGATIVE_TTL."""
+
+class PageUnavailable(CrawlError):
+    """Raised for hard failures that are briefly cached so repeated calls fail fast."""
+
+def _dns_failure(error: BaseException | None) -> bool:
+    while error is not None:
+        if isinstance(error, socket.gaierror):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _known_failure(url: str) -> str | None:
+    return _failure_cache.get(canonicalize_url(url))
+
+def _remember_failure(url: str, error: BaseException):
+    # A saturated browser pool says nothing about the site, so it must not block later calls
+    if isinstance(error, BrowserUnavailable):
+        return
+    if isinstance(error, (PageUnavailable, TimeoutError)):
+        _failure_cache.set(canonicalize_url(url), str(error) or f"Timed out reading {url}")
+
+async def _refresh(url: str, page: CachedPage):
+    try:
+        async with scheduler.slot(url):
+            if page.revalidatable and await _revalidate(url, page):
+                await _crawl_cache.touch(page)
+                return
+            if await _fetch_static(url) is not None:
+                return
+            _browser_allowed()
+            async with _checkout_crawler(url) as crawler:
+                await asyncio.wait_for(
+                    _render(crawler, url, page_timeout=CRAWL_URL_TIMEOUT, profile=get_profile()),
+                    timeout=CRAWL_URL_TIMEOUT,
+                )
+        logger.info(f"Refreshed {url} in the background")
+    except Exception as e:
+        logger.warning(f"Background refresh of {url} failed: {e}")
+        _remember_failure(url, e)
+
+def _schedule_refresh(url: str, page: CachedPage):
+    """
+    Refreshes a stale page in the background, at most once per URL and CRAWL_MAX_REFRESHES at
+    a time. Skipped refreshes are retried by the next call that serves the stale page.
+    """
+    if page.url in _refreshing or len(_refreshing) >= CRAWL_MAX_REFRESHES or _known_failure(url):
+        return
+    task = asyncio.create_task(_refresh(url, page))
+    _refreshing[page.url] = task
+    task.add_done_callback(lambda _: _refreshing.pop(page.url, None))
+
+async def cancel_refreshes():
+    for task in list(_refreshing.values()):
+        task.cancel()
+    await asyncio.gather(*_refreshing.values(), return_exceptions=True)
+
+async def _cached_content(url: str) -> str | None:
+    """
+    Returns cached clean text for the URL if it is fresh, within its stale period (a background
+    refresh is started), or the origin confirms it is unchanged.
+    """
+    cached = await _crawl_cache.get(canonicalize_url(url))
+    if cached is None:
+        return None
+    if cached.is_fresh(_crawl_cache.ttl):
+        logger.info(f"Serving {url} from crawl cache")
+        metrics.crawl_sources.inc(source="cache")
+        return cached.content
+    if cached.is_fresh(_crawl_cache.ttl + CRAWL_STALE_TTL):
+        logger.info(f"Serving stale {url} from crawl cache while refreshing it")
+        metrics.crawl_sources.inc(source="stale")
+        _schedule_refresh(url, cached)
+        return cached.content
+    if cached.revalidatable and await _polite_revalidate(url, cached):
+        logger.info(f"Cached copy of {url} is still valid")
+        metrics.crawl_sources.inc(source="revalidated")
+        await _crawl_cache.touch(cached)
+        return cached.content
+    return None
+
+def _run_config(page_timeout: float | None = None, prefetch: bool = False,
+                profile: CrawlProfile | None = None) -> CrawlerRunConfig:
     pruning_filter = PruningContentFilter(
         threshold=0.48,
         threshold_type="dynamic",
@@ -35,29 +421,341 @@ async def perform_crawl(url: str) -> str:
         content_filter=pruning_filter
     )
 
-    config = CrawlerRunConfig(
+    options = {}
+    if page_timeout is not None:
+        options["page_timeout"] = int(page_timeout * 1000)
+    if prefetch:
+        # Only return the rendered HTML; it is converted in the post-processing pool
+        options["prefetch"] = True
+    if profile is not None:
+        # Read by the crawl_profile hooks installed on every crawler
+        options["shared_data"] = {"crawl_profile": profile}
+
+    return CrawlerRunConfig(
+        # Results are cached by _crawl_cache after post-processing
+        cache_mode=CacheMode.BYPASS,
         word_count_threshold=200,
         only_text=True,
-        markdown_generator=md_generator
+        markdown_generator=md_generator,
+        **options
     )
 
-    logger.info("Launching crawler...")
-    async with AsyncWebCrawler() as crawler:
+def html_to_markdown(html: str, url: str) -> str:
+    """
+    Runs the same scraping, pruning and markdown generation as a browser crawl on HTML that
+    was fetched directly (mirrors AsyncWebCrawler.aprocess_html).
+    """
+    config = _run_config()
+    params = config.__dict__.copy()
+    params.pop("url", None)
+    scraped = config.scraping_strategy.scrap(url, html, **params)
+    markdown = config.markdown_generator.generate_markdown(input_html=scraped.cleaned_html, base_url=url)
+    return markdown.raw_markdown
+
+def html_to_clean_text(html: str, url: str) -> tuple[str, float, float]:
+    """
+    HTML to flattened clean text, up to MAX_DOCUMENT_CHARS. Runs in the post-processing pool, so
+    it also returns its markdown and flattening times for the caller to record.
+    """
+    start = time.perf_counter()
+    markdown = html_to_markdown(html, url)
+    converted = time.perf_counter()
+    clean_text = fit_to_budget(markdown, MAX_DOCUMENT_CHARS, flatten=True)
+    return clean_text, converted - start, time.perf_counter() - converted
+
+async def _process(html: str, url: str) -> str:
+    """
+    Converts HTML to clean text off the event loop when the post-processing pool is running.
+    """
+    try:
+        clean_text, markdown_seconds, flatten_seconds = await postprocess_pool.run(html_to_clean_text, html, url)
+    except Exception as e:
+        metrics.failures.inc(stage="postprocess")
+        raise CrawlError(f"Failed to process {url}: {e}") from e
+    metrics.markdown_seconds.observe(markdown_seconds)
+    metrics.flatten_seconds.observe(flatten_seconds)
+    return clean_text
+
+async def _store(url: str, clean_text: str, headers: dict | None) -> str:
+    """
+    Caches clean text, kept up to MAX_DOCUMENT_CHARS so the cached copy can serve any per-call budget
+    and later chunks of long pages.
+    """
+    if clean_text:
+        await _crawl_cache.put(CachedPage(
+            url=canonicalize_url(url),
+            content=clean_text,
+            etag=_header(headers, "etag"),
+            last_modified=_header(headers, "last-modified"),
+            fetched_at=time.time(),
+        ))
+
+    return clean_text
+
+async def _fetch_static(url: str) -> str | None:
+    """
+    Tries to read the page with a plain HTTP GET. Returns clean text, or None when the page
+    has to be rendered in the browser.
+    """
+    if CRAWL_FETCH_MODE == "browser":
+        return None
+    try:
+        with metrics.static_fetch_seconds.time():
+            page = await fetch_html(url)
+        if page is None:
+            return None
+        if isinstance(page, StaticPage):
+            reason = needs_browser(page.html)
+            if reason:
+                logger.info(f"{url} needs a browser: {reason}")
+                return None
+            clean_text = await _process(page.html, url)
+    except PageNotFound as e:
+        metrics.failures.inc(stage="static_fetch")
+        raise PageUnavailable(str(e)) from e
+    except DocumentTooLarge as e:
+        metrics.failures.inc(stage="static_fetch")
+        raise CrawlError(str(e)) from e
+    except Exception as e:
+        if _dns_failure(e):
+            metrics.failures.inc(stage="static_fetch")
+            raise PageUnavailable(f"Could not resolve the host of {url}") from e
+        logger.info(f"Static fetch of {url} failed: {e}")
+        metrics.failures.inc(stage="static_fetch")
+        return None
+
+    if isinstance(page, StaticDocument):
+        return await _read_document(url, page)
+    if len(clean_text.strip()) < MIN_STATIC_MARKDOWN_CHARS:
+        logger.info(f"{url} needs a browser: only {len(clean_text.strip())} chars of static markdown")
+        return None
+
+    logger.info(f"Fetched {url} without a browser")
+    metrics.crawl_sources.inc(source="static")
+    return await _store(url, clean_text, page.headers)
+
+async def _read_document(url: str, document: StaticDocument) -> str:
+    """
+    Extracts text from a PDF, plain text, JSON or feed response in the post-processing pool.
+    A browser can't do better on these, so failures raise CrawlError instead of falling back.
+    """
+    try:
+        with metrics.extract_seconds.time(kind=document.kind):
+            text = await postprocess_pool.run(
+                extract_document, document.kind, document.body, document.encoding, url, MAX_DOCUMENT_CHARS
+            )
+    except Exception as e:
+        metrics.failures.inc(stage="extract")
+        raise CrawlError(f"Failed to read {document.kind} document {url}: {e}") from e
+
+    clean_text = fit_to_budget(text, MAX_DOCUMENT_CHARS)
+    if not clean_text.strip():
+        raise CrawlError(f"No text found in {document.kind} document {url}")
+    logger.info(f"Read {document.kind} document {url} without a browser")
+    metrics.crawl_sources.inc(source=document.kind)
+    return await _store(url, clean_text, document.headers)
+
+async def _render(crawler, url: str, page_timeout: float | None = None, profile: CrawlProfile | None = None) -> str:
+    """
+    Renders the URL with the given crawler and profile and returns clean text. The page gets the
+    smaller of `page_timeout` and the profile's time budget. Raises CrawlError on failure.
+    """
+    # A page that runs out of the profile's own, shorter budget may still load with another profile
+    budgeted = profile is not None and profile.page_timeout is not None and (
+        page_timeout is None or profile.page_timeout <= page_timeout
+    )
+    if profile is not None and profile.page_timeout is not None:
+        page_timeout = profile.page_timeout if page_timeout is None else min(page_timeout, profile.page_timeout)
+    # With the pool running, crawl4ai only renders and the conversion happens off the event loop
+    offload = postprocess_pool.started
+    with metrics.render_seconds.time():
         result = await crawler.arun(
             url=url,
-            config=config
+            config=_run_config(page_timeout, prefetch=offload, profile=profile)
         )
 
-        if result.success:
-            logger.info("Crawl success! Processing markdown...")
-            raw_markdown = result.markdown
-            if len(raw_markdown) > 10000:
-                logger.info(f"Size of the page is too big, return only first {threshold} characters")
-                raw_markdown = raw_markdown[:threshold]
-            clean_text = flatten_markdown_links(raw_markdown)
+    if not result.success:
+        metrics.failures.inc(stage="render")
+        message = result.error_message or ""
+        if _HARD_RENDER_ERROR.search(message) and not (budgeted and _RENDER_TIMEOUT.search(message)):
+            raise PageUnavailable(result.error_message)
+        raise CrawlError(result.error_message)
+    if result.status_code in (404, 410):
+        metrics.failures.inc(stage="render")
+        raise PageUnavailable(f"{url} returned {result.status_code}")
 
-            logger.info(f"Returning {len(clean_text)} chars of text")
-            return clean_text
+    logger.info("Crawl success! Processing markdown...")
+    metrics.crawl_sources.inc(source="browser")
+    if offload:
+        clean_text = await _process(result.html or "", url)
+    else:
+        with metrics.flatten_seconds.time():
+            clean_text = fit_to_budget(result.markdown or "", MAX_DOCUMENT_CHARS, flatten=True)
+    return await _store(url, clean_text, result.response_headers)
+
+def _uses_cache(profile: CrawlProfile) -> bool:
+    # Cached pages and failures come from default-profile crawls; another profile is asked for
+    # because that result wasn't good enough
+    return profile.name == DEFAULT_PROFILE
+
+def _browser_allowed():
+    if CRAWL_FETCH_MODE == "http":
+        raise CrawlError("Page could not be read without a browser and CRAWL_FETCH_MODE is 'http'")
+
+class _SharedCrawler:
+    """
+    Checks out one crawler on first use and shares it between the tasks of a batch.
+    """
+
+    def __init__(self, stack: AsyncExitStack):
+        self._stack = stack
+        self._lock = asyncio.Lock()
+        self._crawler = None
+
+    async def get(self, url: str):
+        async with self._lock:
+            if self._crawler is None:
+                self._crawler = await self._stack.enter_async_context(_checkout_crawler(url))
+            return self._crawler
+
+async def load_page(url: str, profile: CrawlProfile) -> str:
+    """
+    Returns the page's full clean text from the cache, the HTTP fast path or the browser.
+    Raises CrawlError, RobotsDisallowed or TimeoutError when the page can't be read.
+    """
+    start_warm_up()
+    if _uses_cache(profile):
+        content = await _cached_content(url)
+        if content is not None:
+            return content
+        failure = _known_failure(url)
+        if failure is not None:
+            logger.info(f"Not crawling {url}, it failed recently: {failure}")
+            metrics.crawl_sources.inc(source="failure_cache")
+            raise RecentFailure(failure)
+    try:
+        async with scheduler.slot(url):
+            content = await _fetch_static(url)
+            if content is None:
+                _browser_allowed()
+                async with _checkout_crawler(url) as crawler:
+                    content = await _render(crawler, url, profile=profile)
+    except (CrawlError, RobotsDisallowed, TimeoutError) as e:
+        logger.error(f"Crawl failed: {e}")
+        metrics.failures.inc(stage="crawl")
+        _remember_failure(url, e)
+        raise
+    return content
+
+async def perform_crawl(url: str, max_chars: int | None = None, max_tokens: int | None = None,
+                        profile: str | None = None, query: str | None = None) -> str:
+    logger.info(f"Starting crawl for: {url}")
+    budget = output_budget(max_chars, max_tokens)
+    try:
+        content = await load_page(url, get_profile(profile))
+    except (ValueError, CrawlError, RobotsDisallowed, TimeoutError) as e:
+        return f"Crawl failed: {e}"
+
+    if query and query.strip():
+        clean_text = await _relevant_output(content, query, budget)
+    else:
+        clean_text = _fit_output(content, budget)
+    logger.info(f"Returning {len(clean_text)} chars of text")
+    return clean_text
+
+async def crawl_pages(urls: list[str], on_page: Callable[[dict], Awaitable[None]] | None = None,
+                      max_chars: int | None = None, max_tokens: int | None = None,
+                      profile: str | None = None) -> list[dict]:
+    """
+    Crawls several URLs with bounded concurrency. Pages that need a browser share one checkout
+    and are rendered with the named crawl profile (ValueError if it doesn't exist).
+
+    Returns one `{"url", "content"}` or `{"url", "error"}` entry per input URL, in input order,
+    with each page's content fitted to the output budget. `on_page` is awaited with each entry
+    as soon as that page finishes.
+    """
+    budget = output_budget(max_chars, max_tokens)
+    crawl_profile = get_profile(profile)
+    start_warm_up()
+    # Identical URLs are crawled once
+    unique_urls = list(dict.fromkeys(urls))
+    pages: dict[str, dict] = {}
+
+    async def finish(url: str, content: str | None = None, error: str | None = None):
+        if error is None:
+            pages[url] = {"url": url, "content": _fit_output(content, budget)}
         else:
-            logger.error(f"Crawl failed: {result.error_message}")
-            return f"Crawl failed: {result.error_message}"
+            logger.error(f"Crawl failed for {url}: {error}")
+            metrics.failures.inc(stage="crawl")
+            pages[url] = {"url": url, "error": f"Crawl failed: {error}"}
+        if on_page is not None:
+            await on_page(pages[url])
+
+    use_cache = _uses_cache(crawl_profile)
+    semaphore = asyncio.Semaphore(CRAWL_BATCH_CONCURRENCY)
+
+    async def crawl_one(shared: _SharedCrawler, url: str):
+        if use_cache:
+            # Looked up per task, so revalidations of expired pages overlap like the crawls do
+            cached = await _cached_content(url)
+            if cached is not None:
+                await finish(url, content=cached)
+                return
+            failure = _known_failure(url)
+            if failure is not None:
+                metrics.crawl_sources.inc(source="failure_cache")
+                await finish(url, error=failure)
+                return
+
+        waiting_for_browser = False
+
+        async def crawl() -> str:
+            nonlocal waiting_for_browser
+            content = await _fetch_static(url)
+            if content is not None:
+                return content
+            _browser_allowed()
+            waiting_for_browser = True
+            crawler = await shared.get(url)
+            waiting_for_browser = False
+            return await _render(crawler, url, page_timeout=CRAWL_URL_TIMEOUT, profile=crawl_profile)
+
+        # Waiting for the host's turn doesn't count against the page's time budget
+        try:
+            async with scheduler.slot(url), semaphore:
+                content = await asyncio.wait_for(crawl(), timeout=CRAWL_URL_TIMEOUT)
+        except asyncio.TimeoutError:
+            if waiting_for_browser:
+                # The deadline ran out in the browser pool's queue, not at the site
+                error = BrowserUnavailable(f"No browser available within {CRAWL_URL_TIMEOUT:g}s")
+            else:
+                error = TimeoutError(f"Timed out after {CRAWL_URL_TIMEOUT:g}s")
+            _remember_failure(url, error)
+            await finish(url, error=str(error))
+        except Exception as e:
+            _remember_failure(url, e)
+            await finish(url, error=str(e))
+        else:
+            await finish(url, content=content)
+
+    # The browser is only checked out once a page needs it
+    async with AsyncExitStack() as stack:
+        shared = _SharedCrawler(stack)
+        await asyncio.gather(*(crawl_one(shared, url) for url in unique_urls))
+
+    return [pages[url] for url in urls]
+
+async def perform_crawl_many(urls: list[str], max_chars: int | None = None, max_tokens: int | None = None,
+                             profile: str | None = None) -> str:
+    """
+    Crawls several URLs and returns JSON results in input order, with failures reported inline.
+    """
+    logger.info(f"Starting batch crawl for {len(urls)} URLs")
+    if len(urls) > CRAWL_BATCH_MAX_URLS:
+        return json.dumps({"error": f"At most {CRAWL_BATCH_MAX_URLS} URLs can be crawled per call"})
+
+    try:
+        pages = await crawl_pages(urls, max_chars=max_chars, max_tokens=max_tokens, profile=profile)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    return json.dumps({"results": pages}, indent=2)
@@ -0,0 +1,133 @@
+import io
+import re
+import json
+import logging
+from xml.etree import ElementTree
+from pypdf import PdfReader
+from static_fetch import visible_text
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+_EXTRA_BLANK_LINES = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)+")
+
+
+def _decode(body: bytes, encoding: str | None) -> str:
+    return body.decode(encoding or "utf-8-sig", errors="replace")
+
+
+def pdf_to_text(body: bytes, encoding: str | None, url: str, limit: int) -> str:
+    """
+    Extracts text page by page, stopping once `limit` characters have been collected, so
+    only the pages that fit the budget are ever parsed.
+    """
+    reader = PdfReader(io.BytesIO(body))
+    if reader.is_encrypted:
+        # Many PDFs are encrypted with an empty user password just to set permissions
+        reader.decrypt("")
+
+    parts = []
+    title = (reader.metadata.title if reader.metadata else None) or ""
+    if title.strip():
+        parts.append(f"# {title.strip()}")
+    size = 0
+    page_count = len(reader.pages)
+    for number, page in enumerate(reader.pages, 1):
+        text = _EXTRA_BLANK_LINES.sub("\n\n", page.extract_text() or "").strip()
+        if not text:
+            continue
+        parts.append(f"## Page {number}\n\n{text}" if page_count > 1 else text)
+        size += len(text)
+        if size >= limit:
+            logger.info(f"Stopped reading {url} after page {number} of {page_count}")
+            break
+    return "\n\n".join(parts)
+
+
+def plain_text(body: bytes, encoding: str | None, url: str, limit: int) -> str:
+    return _decode(body, encoding)[:limit]
+
+
+def json_to_text(body: bytes, encoding: str | None, url: str, limit: int) -> str:
+    """Pretty-prints JSON in a code block; truncated or invalid JSON is shown as it is."""
+    text = _decode(body, encoding)
+    try:
+        text = json.dumps(json.loads(text), indent=2, ensure_ascii=False)
+    except ValueError:
+        pass
+    return f"```json\n{text[:limit]}\n```"
+
+
+def _local(tag) -> str:
+    # Namespaces differ between RSS 1.0, RSS 2.0 and Atom; only the local name matters
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _child_text(element, *names: str) -> str:
+    for name in names:
+        for child in element:
+            if _local(child.tag) == name and (child.text or "").strip():
+                return child.text.strip()
+    return ""
+
+
+def _entry_link(entry) -> str:
+    for child in entry:
+        if _local(child.tag) != "link":
+            continue
+        # Atom puts the URL in href, RSS in the element text
+        href = child.get("href")
+        if href and child.get("rel", "alternate") == "alternate":
+            return href
+        if (child.text or "").strip():
+            return child.text.strip()
+    return ""
+
+
+def feed_to_text(body: bytes, encoding: str | None, url: str, limit: int) -> str:
+    """Lists an RSS or Atom feed's entries with their link, date and summary, newest first as served."""
+    root = ElementTree.fromstring(body)
+    channel = next((child for child in root if _local(child.tag) == "channel"), root)
+
+    parts = []
+    title = _child_text(channel, "title")
+    if title:
+        parts.append(f"# {title}")
+    description = visible_text(_child_text(channel, "description", "subtitle"))
+    if description:
+        parts.append(description)
+
+    size = 0
+    for entry in root.iter():
+        if _local(entry.tag) not in ("item", "entry"):
+            continue
+        lines = [f"## {_child_text(entry, 'title') or 'Untitled'}"]
+        link = _entry_link(entry)
+        if link:
+            lines.append(link)
+        published = _child_text(entry, "pubDate", "published", "updated", "date")
+        if published:
+            lines.append(published)
+        summary = visible_text(_child_text(entry, "description", "summary", "content", "encoded"))
+        block = "\n".join(lines) + (f"\n\n{summary}" if summary else "")
+        parts.append(block)
+        size += len(block)
+        if size >= limit:
+            break
+    return "\n\n".join(parts)
+
+
+EXTRACTORS = {
+    "pdf": pdf_to_text,
+    "text": plain_text,
+    "json": json_to_text,
+    "feed": feed_to_text,
+}
+
+
+def extract_document(kind: str, body: bytes, encoding: str | None, url: str, limit: int) -> str:
+    """
+    Converts a non-HTML document to markdown-ish text of roughly `limit` characters at most.
+    Runs in the post-processing pool.
+    """
+    return EXTRACTORS[kind](body, encoding, url, limit)
@@ -0,0 +1,51 @@
+import httpx
+import os
+import logging
+from contextlib import asynccontextmanager
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", "5"))
+FETCH_READ_TIMEOUT = float(os.getenv("FETCH_READ_TIMEOUT", "15"))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "50"))
+FETCH_USER_AGENT = os.getenv(
+    "FETCH_USER_AGENT",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+)
+
+# Shared client for direct (browser-less) requests to crawled sites
+_client: httpx.AsyncClient | None = None
+
+def _client_options() -> dict:
+    return {
+        "timeout": httpx.Timeout(FETCH_READ_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(max_connections=FETCH_MAX_CONNECTIONS),
+        "headers": {"User-Agent": FETCH_USER_AGENT},
+        "follow_redirects": True,
+    }
+
+async def start_fetch_client():
+    """
+    Creates the long-lived client used for direct requests to crawled sites. Safe to call more than once.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(**_client_options())
+
+async def close_fetch_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+@asynccontextmanager
+async def fetch_client():
+    """
+    Yields the shared client, or a short-lived one when the server hasn't started it.
+    """
+    if _client is not None:
+        yield _client
+    else:
+        async with httpx.AsyncClient(**_client_options()) as client:
+            yield client
@@ -0,0 +1,246 @@
+import os
+import json
+import bisect
+import atexit
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cache hit to a slow page render
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Output size buckets in characters
+SIZE_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# With several worker processes, each writes its values here and /metrics adds them up
+MULTIPROCESS_DIR = os.getenv("METRICS_MULTIPROCESS_DIR", "")
+# Seconds between writes of this worker's values to MULTIPROCESS_DIR
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+_registry: list["_Metric"] = []
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(key), json.loads(json.dumps(value))] for key, value in self._values.items()]
+
+    def render(self, values: dict | None = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.extend(self._samples(key, value))
+        return lines
+
+    @abstractmethod
+    def _samples(self, key: tuple, value) -> list[str]:
+        """Exposition lines for one label set."""
+
+    @staticmethod
+    @abstractmethod
+    def _merge(total, value):
+        """Adds `value` from one worker to the running `total` (None for the first one)."""
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+    @staticmethod
+    def _merge(total, value):
+        return value if total is None else total + value
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution with a running sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [per-bucket counts (last one is +Inf), sum]
+            state = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the wall-clock duration of the block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def _samples(self, key: tuple, value) -> list[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            bucket_labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    @staticmethod
+    def _merge(total, value):
+        if total is None:
+            return value
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+
+def write_snapshot(directory: str = MULTIPROCESS_DIR):
+    """Writes this process's values to `directory`, replacing its previous snapshot."""
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    snapshot = {metric.name: metric.snapshot() for metric in _registry}
+    with open(path + ".tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(path + ".tmp", path)
+
+
+def _collect(directory: str) -> dict[str, dict]:
+    """Adds up the snapshots of every worker, including ones that have exited, so counters never go back."""
+    write_snapshot(directory)
+    merged: dict[str, dict] = {metric.name: {} for metric in _registry}
+    types = {metric.name: type(metric) for metric in _registry}
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable metrics snapshot {name}: {e}")
+            continue
+        for metric_name, samples in snapshot.items():
+            if metric_name not in merged:
+                continue
+            values = merged[metric_name]
+            for key, value in samples:
+                key = tuple(key)
+                values[key] = types[metric_name]._merge(values.get(key), value)
+    return merged
+
+
+def render() -> str:
+    """
+    Renders every registered metric in the Prometheus text exposition format, summed over all
+    worker processes when MULTIPROCESS_DIR is set.
+    """
+    merged = _collect(MULTIPROCESS_DIR) if MULTIPROCESS_DIR else {}
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render(merged.get(metric.name)))
+    return "\n".join(lines) + "\n"
+
+
+def start_flusher(interval: float = FLUSH_INTERVAL):
+    """
+    Writes this worker's values to MULTIPROCESS_DIR every `interval` seconds and at exit, so
+    whichever worker answers /metrics sees the others' recent values.
+    """
+    if not MULTIPROCESS_DIR:
+        return
+
+    def flush():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot()
+            except OSError as e:
+                logger.warning(f"Failed to write metrics snapshot: {e}")
+
+    threading.Thread(target=flush, name="metrics-flusher", daemon=True).start()
+    atexit.register(write_snapshot)
+
+
+def reset():
+    """Clears all recorded values (used by tests)."""
+    for metric in _registry:
+        metric.clear()
+
+
+search_seconds = Histogram("web_search_mcp_search_seconds", "SearXNG request latency (cache misses only).")
+browser_acquire_seconds = Histogram("web_search_mcp_browser_acquire_seconds", "Time spent waiting for a browser.")
+render_seconds = Histogram("web_search_mcp_render_seconds", "Browser page render time (includes markdown generation when the post-processing pool is off).")
+static_fetch_seconds = Histogram("web_search_mcp_static_fetch_seconds", "Plain HTTP fetch time of the browser-less fast path.")
+markdown_seconds = Histogram("web_search_mcp_markdown_seconds", "HTML to markdown conversion time in the post-processing pool or on the fast path.")
+extract_seconds = Histogram("web_search_mcp_extract_seconds", "Text extraction time of non-HTML documents.", labelnames=("kind",))
+flatten_seconds = Histogram("web_search_mcp_flatten_seconds", "Link flattening and output fitting time per crawled page.")
+politeness_wait_seconds = Histogram("web_search_mcp_politeness_wait_seconds", "Time a crawl waited for its host's concurrency slot and rate limit.")
+tool_seconds = Histogram("web_search_mcp_tool_seconds", "Total tool latency.", labelnames=("tool",))
+output_chars = Histogram("web_search_mcp_output_chars", "Characters returned per tool call.", labelnames=("tool",), buckets=SIZE_BUCKETS)
+searxng_events = Counter("web_search_mcp_searxng_events", "SearXNG retries, hedged requests and opened circuits.", labelnames=("event",))
+failures = Counter("web_search_mcp_failures", "Failures by pipeline stage.", labelnames=("stage",))
+truncations = Counter("web_search_mcp_truncations", "Pages cut down to the caller's output budget.")
+blocked_requests = Counter("web_search_mcp_blocked_requests", "Browser subresource requests blocked by the crawl profile.", labelnames=("reason",))
+crawl_sources = Counter("web_search_mcp_crawl_pages", "Crawled pages by where the content came from.", labelnames=("source",))
+admission_wait_seconds = Histogram("web_search_mcp_admission_wait_seconds", "Time a tool call waited for a concurrency slot.", labelnames=("tool",))
+admission_rejections = Counter("web_search_mcp_admission_rejections", "Tool calls rejected by admission control.", labelnames=("tool", "reason"))
@@ -0,0 +1,175 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import metrics
+from cache import TTLCache
+from fetch_client import fetch_client
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Requests to one host that may be in flight at once, and its sustained rate and burst
+HOST_CONCURRENCY = int(os.getenv("CRAWL_HOST_CONCURRENCY", "2"))
+HOST_RATE = float(os.getenv("CRAWL_HOST_RATE", "2"))
+HOST_BURST = int(os.getenv("CRAWL_HOST_BURST", "5"))
+# off: ignore robots.txt; delay: honour Crawl-delay; obey: also refuse disallowed pages
+ROBOTS_MODE = os.getenv("CRAWL_ROBOTS", "delay").lower()
+ROBOTS_USER_AGENT = os.getenv("CRAWL_ROBOTS_USER_AGENT", "*")
+ROBOTS_CACHE_TTL = float(os.getenv("CRAWL_ROBOTS_CACHE_TTL", "3600"))
+ROBOTS_TIMEOUT = float(os.getenv("CRAWL_ROBOTS_TIMEOUT", "5"))
+# Upper bound for a site's Crawl-delay, so one robots.txt can't stall a tool call
+MAX_CRAWL_DELAY = float(os.getenv("CRAWL_MAX_CRAWL_DELAY", "10"))
+MAX_HOSTS = 4096
+
+
+class RobotsDisallowed(Exception):
+    """Raised in "obey" mode for pages robots.txt disallows."""
+
+
+def host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class HostThrottle:
+    """Concurrency cap plus token bucket for one host."""
+
+    def __init__(self, concurrency: int, rate: float, burst: int):
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.active = 0
+        self.waiting = 0
+
+    def slow_down(self, crawl_delay: float):
+        """Applies a robots.txt Crawl-delay: one request per delay, no bursts."""
+        rate = 1 / crawl_delay
+        if self.rate <= 0 or rate < self.rate:
+            self.rate = rate
+            self.burst = 1
+            self.tokens = min(self.tokens, 1.0)
+
+    async def _take_token(self):
+        while self.rate > 0:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    @asynccontextmanager
+    async def hold(self):
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            await self._take_token()
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+
+class PolitenessScheduler:
+    """
+    Paces requests to crawled sites per host.
+
+    `slot(url)` waits until the host has a free concurrency slot and a rate-limit token.
+    A robots.txt Crawl-delay (capped at `max_crawl_delay`) lowers the host's rate. robots.txt
+    is fetched once per host and cached for `robots_ttl` seconds; when it can't be read the
+    host gets the default limits. State is per process, and idle hosts are dropped LRU-first.
+    """
+
+    def __init__(self, concurrency: int = HOST_CONCURRENCY, rate: float = HOST_RATE, burst: int = HOST_BURST,
+                 robots_mode: str = ROBOTS_MODE, robots_ttl: float = ROBOTS_CACHE_TTL,
+                 max_crawl_delay: float = MAX_CRAWL_DELAY, max_hosts: int = MAX_HOSTS):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.robots_mode = robots_mode
+        self.max_crawl_delay = max_crawl_delay
+        self.max_hosts = max_hosts
+        self._robots = TTLCache(max_size=max_hosts, ttl=robots_ttl)
+        self._hosts: OrderedDict[str, HostThrottle] = OrderedDict()
+
+    def reset(self):
+        self._robots.clear()
+        self._hosts.clear()
+
+    async def _fetch_robots(self, host: str) -> RobotFileParser:
+        parser = RobotFileParser(f"{host}/robots.txt")
+        try:
+            async with fetch_client() as client:
+                response = await client.get(f"{host}/robots.txt", timeout=ROBOTS_TIMEOUT)
+            if response.is_success:
+                parser.parse(response.text.splitlines())
+            else:
+                # No robots.txt (or an unreadable one) means no restrictions
+                parser.allow_all = True
+        except Exception as e:
+            logger.info(f"Could not read robots.txt of {host}: {e}")
+            parser.allow_all = True
+        return parser
+
+    async def _robots_for(self, host: str) -> RobotFileParser | None:
+        if self.robots_mode == "off":
+            return None
+        return await self._robots.get_or_load(host, lambda: self._fetch_robots(host))
+
+    def _throttle(self, host: str) -> HostThrottle:
+        throttle = self._hosts.get(host)
+        if throttle is None:
+            throttle = HostThrottle(self.concurrency, self.rate, self.burst)
+            self._hosts[host] = throttle
+            self._evict()
+        self._hosts.move_to_end(host)
+        return throttle
+
+    def _evict(self):
+        for host in list(self._hosts):
+            if len(self._hosts) <= self.max_hosts:
+                return
+            throttle = self._hosts[host]
+            if not throttle.active and not throttle.waiting:
+                del self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Holds one of the URL's host slots for the duration of the block."""
+        host = host_key(url)
+        robots = await self._robots_for(host)
+        throttle = self._throttle(host)
+        if robots is not None:
+            if self.robots_mode == "obey" and not robots.can_fetch(ROBOTS_USER_AGENT, url):
+                raise RobotsDisallowed(f"robots.txt of {host} disallows {url}")
+            crawl_delay = robots.crawl_delay(ROBOTS_USER_AGENT)
+            if crawl_delay and self.max_crawl_delay > 0:
+                throttle.slow_down(min(float(crawl_delay), self.max_crawl_delay))
+
+        start = time.perf_counter()
+        async with throttle.hold():
+            metrics.politeness_wait_seconds.observe(time.perf_counter() - start)
+            yield
+
+    def stats(self) -> dict:
+        return {
+            "hosts": len(self._hosts),
+            "active": sum(throttle.active for throttle in self._hosts.values()),
+            "waiting": sum(throttle.waiting for throttle in self._hosts.values()),
+            "robots_cached": self._robots.stats()["size"],
+        }
+
+
+scheduler = PolitenessScheduler()
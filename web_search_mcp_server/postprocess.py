@@ -0,0 +1,152 @@
+import os
+import sys
+import asyncio
+import logging
+import importlib
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may use: the container's cgroup CPU quota when there is one, else the
+    CPUs it is allowed to run on. `os.cpu_count()` reports the host's CPUs even under a limit.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means no limit
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return cpus
+
+
+POSTPROCESS_WORKERS = int(os.getenv("POSTPROCESS_WORKERS", str(min(4, available_cpus()))))
+# auto: processes, or threads on free-threaded builds; process; thread; inline: on the event loop
+POSTPROCESS_MODE = os.getenv("POSTPROCESS_MODE", "auto").lower()
+
+
+def _free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _preload(modules: tuple[str, ...]):
+    """Imports the modules tasks will need so the first real task doesn't pay for it."""
+    for module in modules:
+        importlib.import_module(module)
+
+
+class PostprocessPool:
+    """
+    Runs CPU-heavy, picklable functions off the event loop.
+
+    Started with the server; until then (and with mode "inline") tasks run directly on the
+    calling thread. Process workers are spawned rather than forked, since the server has
+    threads running by the time the pool starts.
+    """
+
+    def __init__(self, workers: int = POSTPROCESS_WORKERS, mode: str = POSTPROCESS_MODE,
+                 preload: tuple[str, ...] = ()):
+        self.workers = workers
+        self.mode = ("thread" if _free_threaded() else "process") if mode == "auto" else mode
+        self.preload = preload
+        self.tasks = 0
+        self.pending = 0
+        self.restarts = 0
+        self._executor: Executor | None = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def _create_executor(self) -> Executor:
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="postprocess")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def start(self):
+        """Starts and warms up the workers. Safe to call more than once."""
+        async with self._start_lock:
+            if self.started or self.mode == "inline" or self.workers <= 0:
+                return
+            logger.info(f"Starting post-processing pool with {self.workers} {self.mode} workers")
+            executor = self._create_executor()
+            loop = asyncio.get_running_loop()
+            try:
+                await asyncio.gather(*(
+                    loop.run_in_executor(executor, _preload, self.preload) for _ in range(self.workers)
+                ))
+            except Exception as e:
+                # Fall back to inline processing rather than failing the session
+                logger.error(f"Failed to start post-processing pool: {e}")
+                executor.shutdown(wait=False, cancel_futures=True)
+                return
+            self._executor = executor
+
+    async def close(self):
+        async with self._start_lock:
+            if self._executor is None:
+                return
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            logger.info("Post-processing pool closed")
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Runs `fn(*args)` in the pool, or inline when the pool isn't running."""
+        self.tasks += 1
+        executor = self._executor
+        if executor is None:
+            return fn(*args)
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); replace the pool for the next task
+            if self._executor is executor:
+                logger.error("Post-processing worker died, restarting the pool")
+                self.restarts += 1
+                self._executor = self._create_executor()
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self.pending -= 1
+
+    def pids(self) -> set[int]:
+        """PIDs of the worker processes, so their memory isn't attributed to the browsers."""
+        processes = getattr(self._executor, "_processes", None) or {}
+        return set(processes)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode if self.started else "inline",
+            "workers": self.workers if self.started else 0,
+            "pending": self.pending,
+            "tasks": self.tasks,
+            "restarts": self.restarts,
+        }
+
+
+postprocess_pool = PostprocessPool(preload=("crawl_service",))
@@ -0,0 +1,47 @@
+import json
+import logging
+from typing import Awaitable, Callable
+from crawl_profile import get_profile
+from crawl_service import crawl_pages
+from search_service import search
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+async def perform_search_and_read(query: str, on_page: Callable[[int, int, dict], Awaitable[None]] | None = None,
+                                  max_chars: int | None = None, max_tokens: int | None = None,
+                                  profile: str | None = None) -> str:
+    """
+    Searches and crawls every result concurrently.
+
+    `on_page(done, total, page)` is awaited as each page finishes so callers can stream
+    pages out before the slowest one completes. Returns JSON with pages in search rank order.
+    """
+    try:
+        get_profile(profile)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
+    try:
+        results = await search(query)
+    except Exception as e:
+        logger.error(f"Search failed: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+    results = [result for result in results if result["url"]]
+    titles = {result["url"]: result["title"] for result in results}
+    done = 0
+
+    async def report(page: dict):
+        nonlocal done
+        done += 1
+        if on_page is not None:
+            await on_page(done, len(results), {"title": titles[page["url"]], **page})
+
+    logger.info(f"Reading {len(results)} results for '{query}'")
+    pages = await crawl_pages(
+        [result["url"] for result in results], on_page=report, max_chars=max_chars, max_tokens=max_tokens,
+        profile=profile,
+    )
+
+    return json.dumps({"results": [{"title": titles[page["url"]], **page} for page in pages]}, indent=2)
@@ -0,0 +1,120 @@
+import re
+import math
+from collections import Counter
+from dataclasses import dataclass
+
+# Standard BM25 parameters: term frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[^\W_]+")
+_HEADING = re.compile(r"#{1,6}\s")
+# Markers cost this much of the budget where passages aren't adjacent
+GAP_MARKER = "[...]\n\n"
+
+_STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in into is it its not of on or
+so than that the their then there these this to was what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words without stopwords, with a trailing plural "s" dropped."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if len(token) < 2 or token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class PageIndex:
+    """
+    BM25 term statistics of a page's blocks. Each block is indexed together with the heading
+    of its section, so a query matching a heading ranks the paragraphs under it.
+    """
+
+    lengths: list[int]
+    term_counts: list[Counter]
+    document_frequency: Counter
+    average_length: float
+    # Index of the heading block each block belongs to, or None before the first heading
+    headings: list[int | None]
+    block_chars: list[int]
+
+    @classmethod
+    def build(cls, blocks: list[str]) -> "PageIndex":
+        term_counts = []
+        headings = []
+        heading = None
+        heading_terms: list[str] = []
+        for index, block in enumerate(blocks):
+            if _HEADING.match(block):
+                heading = index
+                heading_terms = tokenize(block)
+                terms = heading_terms
+            else:
+                terms = tokenize(block) + heading_terms
+            term_counts.append(Counter(terms))
+            headings.append(heading)
+
+        lengths = [sum(counts.values()) for counts in term_counts]
+        document_frequency = Counter()
+        for counts in term_counts:
+            document_frequency.update(counts.keys())
+        return cls(
+            lengths=lengths,
+            term_counts=term_counts,
+            document_frequency=document_frequency,
+            average_length=(sum(lengths) / len(lengths)) if lengths else 0.0,
+            headings=headings,
+            block_chars=[len(block) for block in blocks],
+        )
+
+    def scores(self, query: str) -> list[float]:
+        """BM25 score of every block against the query."""
+        blocks = len(self.term_counts)
+        weights = {}
+        for term in set(tokenize(query)):
+            frequency = self.document_frequency.get(term, 0)
+            if frequency:
+                weights[term] = math.log(1 + (blocks - frequency + 0.5) / (frequency + 0.5))
+
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self.average_length or 1))
+            for term, weight in weights.items():
+                count = counts.get(term)
+                if count:
+                    score += weight * count * (BM25_K1 + 1) / (count + norm)
+            scores.append(score)
+        return scores
+
+    def select(self, query: str, budget: int) -> list[int]:
+        """
+        Picks the best-scoring blocks, each with its section heading, that fit in `budget`
+        characters, and returns their indexes in page order. Empty when nothing matches.
+        The single best block is always included, even when it alone exceeds the budget.
+        """
+        scores = self.scores(query)
+        ranked = sorted((index for index, score in enumerate(scores) if score > 0), key=lambda index: -scores[index])
+        chosen: set[int] = set()
+        size = 0
+        for index in ranked:
+            passage = [index]
+            heading = self.headings[index]
+            if heading is not None and heading != index:
+                passage.insert(0, heading)
+            cost = sum(self.block_chars[block] for block in passage if block not in chosen) + len(GAP_MARKER)
+            if chosen and size + cost > budget:
+                # A shorter passage further down may still fit
+                continue
+            chosen.update(passage)
+            size += cost
+            if size >= budget:
+                break
+        return sorted(chosen)
@@ -1,46 +1,289 @@
 import httpx
 import os
 import json
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+import metrics
+from cache import TTLCache
+from searxng_client import SearxngBackends
+from shared_backend import shared_backend
+from urls import canonicalize_url
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
 SEARXNG_URL = os.getenv("SEARXNG_URL", "http://localhost:8080")
+# Comma-separated instances to spread searches over; defaults to SEARXNG_URL alone
+SEARXNG_URLS = [url.strip() for url in os.getenv("SEARXNG_URLS", SEARXNG_URL).split(",") if url.strip()]
+CONNECT_TIMEOUT = float(os.getenv("SEARXNG_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("SEARXNG_READ_TIMEOUT", "30"))
+MAX_CONNECTIONS = int(os.getenv("SEARXNG_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SEARXNG_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("SEARXNG_KEEPALIVE_EXPIRY", "30"))
+HTTP2 = os.getenv("SEARXNG_HTTP2", "false").lower() in ("1", "true", "yes")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+# Expired results are still served this long while they are refreshed in the background
+SEARCH_CACHE_STALE_TTL = float(os.getenv("SEARCH_CACHE_STALE_TTL", "900"))
+DEFAULT_RESULTS = int(os.getenv("SEARCH_DEFAULT_RESULTS", "3"))
+# Upper bound for max_results; also how many results are cached per query
+MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "20"))
+TIME_RANGES = ("day", "week", "month", "year")
+BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "5"))
+BATCH_DEFAULT_RESULTS = int(os.getenv("SEARCH_BATCH_DEFAULT_RESULTS", "5"))
+# Reciprocal-rank fusion constant; larger values flatten the advantage of top ranks
+RRF_K = 60
+# Readiness checks give up on an instance after this many seconds
+SEARXNG_PROBE_TIMEOUT = float(os.getenv("SEARXNG_PROBE_TIMEOUT", "2"))
 
-async def perform_web_search(query: str) -> str:
-    logger.info(f"Searching SearXNG for '{query}'")
-    
-    url = f"{SEARXNG_URL}/search"
+_search_cache = TTLCache(
+    max_size=SEARCH_CACHE_SIZE,
+    ttl=SEARCH_CACHE_TTL,
+    backend=shared_backend,
+    namespace="search:",
+    stale_ttl=SEARCH_CACHE_STALE_TTL,
+)
+_backends = SearxngBackends(SEARXNG_URLS)
+
+# Shared client, created at server startup by start_client()
+_client: httpx.AsyncClient | None = None
+
+def _client_options() -> dict:
+    return {
+        "timeout": httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        "http2": HTTP2,
+    }
+
+async def start_client():
+    """
+    Creates the long-lived SearXNG client. Safe to call more than once.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(**_client_options())
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+@asynccontextmanager
+async def _get_client():
+    """
+    Yields the shared client, or a short-lived one when the server hasn't started it.
+    """
+    if _client is not None:
+        yield _client
+    else:
+        async with httpx.AsyncClient(**_client_options()) as client:
+            yield client
+
+def search_cache_stats() -> dict:
+    return _search_cache.stats()
+
+def searxng_stats() -> list[dict]:
+    return _backends.stats()
+
+async def check_searxng() -> list[dict]:
+    """
+    Reports whether each SearXNG instance is reachable, for readiness checks.
+    """
+    async with _get_client() as client:
+        return await _backends.probe(client, SEARXNG_PROBE_TIMEOUT)
+
+def configure_backends(urls: list[str]):
+    """
+    Points searches at different SearXNG instances, keeping the retry and breaker settings.
+    """
+    _backends.configure(urls)
+
+def _cache_key(query: str, page: int = 1, categories: tuple = (), language: str | None = None,
+               time_range: str | None = None) -> tuple:
+    # Normalize case and whitespace so trivially different queries share an entry
+    return (" ".join(query.lower().split()), page, categories, language, time_range)
+
+def _normalize(item: dict) -> dict:
+    """
+    Keeps the fields agents can use to judge a result without crawling it.
+    """
+    return {
+        "title": item.get("title", "No Title"),
+        "url": item.get("url", ""),
+        "snippet": item.get("content") or "",
+        "engines": item.get("engines") or [],
+        "score": item.get("score"),
+        "published_date": item.get("publishedDate"),
+    }
+
+def _format(item: dict, snippets: bool) -> dict:
+    result = {"title": item["title"], "url": item["url"]}
+    if snippets:
+        result["snippet"] = item["snippet"]
+        result["engines"] = item["engines"]
+        if item["score"] is not None:
+            result["score"] = item["score"]
+        if item["published_date"]:
+            result["published_date"] = item["published_date"]
+    return result
+
+async def _search(query: str, page: int = 1, categories: tuple = (), language: str | None = None,
+                  time_range: str | None = None) -> list[dict]:
     params = {
         "format": "json",
         "q": query
     }
+    if page > 1:
+        params["pageno"] = page
+    if categories:
+        params["categories"] = ",".join(categories)
+    if language:
+        params["language"] = language
+    if time_range:
+        params["time_range"] = time_range
+
+    try:
+        with metrics.search_seconds.time():
+            async with _get_client() as client:
+                data = await _backends.search(client, params)
+    except Exception:
+        metrics.failures.inc(stage="search")
+        raise
+
+    items = data.get("results", [])
+    if not items:
+        logger.info(f"No results for '{query}'")
+        return []
+
+    # Keep every field callers may ask for, so result count and snippets don't fragment the cache
+    results = []
+    for item in items[:MAX_RESULTS]:
+        result = _normalize(item)
+        results.append(result)
+        logger.info(f"Found result for '{query}': {result['title']}, {result['url']}")
+
+    return results
+
+async def search(query: str, max_results: int | None = None, page: int = 1, categories: list[str] | None = None,
+                 language: str | None = None, time_range: str | None = None, snippets: bool = False) -> list[dict]:
+    """
+    Returns search results as dicts, served from the cache when possible. Raises ValueError
+    for invalid options and other exceptions when SearXNG fails.
+    """
+    max_results = DEFAULT_RESULTS if max_results is None else max_results
+    if not 1 <= max_results <= MAX_RESULTS:
+        raise ValueError(f"max_results must be between 1 and {MAX_RESULTS}")
+    if page < 1:
+        raise ValueError("page must be 1 or greater")
+    if time_range is not None and time_range not in TIME_RANGES:
+        raise ValueError(f"time_range must be one of: {', '.join(TIME_RANGES)}")
+    categories = tuple(sorted({category.strip().lower() for category in categories or () if category.strip()}))
+    language = language.strip() or None if language else None
+
+    logger.info(f"Searching SearXNG for '{query}'")
+    key = _cache_key(query, page, categories, language, time_range)
+    items = await _search_cache.get_or_load(key, lambda: _search(query, page, categories, language, time_range))
+    return [_format(item, snippets) for item in items[:max_results]]
+
+async def perform_web_search(query: str, max_results: int | None = None, page: int = 1,
+                             categories: list[str] | None = None, language: str | None = None,
+                             time_range: str | None = None, include_snippets: bool = False) -> str:
+    try:
+        results = await search(
+            query,
+            max_results=max_results,
+            page=page,
+            categories=categories,
+            language=language,
+            time_range=time_range,
+            snippets=include_snippets,
+        )
+    except Exception as e:
+        logger.error(f"Search failed: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+    return json.dumps({"results": results}, indent=2)
+
+def fuse_results(result_lists: list[list[dict]], k: int = RRF_K) -> list[dict]:
+    """
+    Merges ranked result lists with reciprocal-rank fusion. Results are deduplicated by
+    canonical URL, keeping the best-ranked copy, and each one lists the indexes of the
+    lists it appeared in.
+    """
+    fused: dict[str, dict] = {}
+    scores: dict[str, float] = {}
+    best_rank: dict[str, int] = {}
+    for index, results in enumerate(result_lists):
+        seen = set()
+        for rank, result in enumerate(results, start=1):
+            if not result["url"]:
+                continue
+            key = canonicalize_url(result["url"])
+            if key in seen:
+                continue
+            seen.add(key)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            if key not in fused or rank < best_rank[key]:
+                fused[key] = {**result, "queries": fused.get(key, {}).get("queries", [])}
+                best_rank[key] = rank
+            fused[key]["queries"].append(index)
+
+    ranked = sorted(fused, key=lambda key: (-scores[key], best_rank[key]))
+    return [fused[key] for key in ranked]
+
+async def perform_web_search_batch(queries: list[str], max_results: int | None = None,
+                                   categories: list[str] | None = None, language: str | None = None,
+                                   time_range: str | None = None, include_snippets: bool = False) -> str:
+    """
+    Runs several queries concurrently and returns one deduplicated list ranked by
+    reciprocal-rank fusion. Queries that fail are reported inline.
+    """
+    # Phrasings that differ only in case or spacing would be searched and fused twice
+    unique = {}
+    for query in queries:
+        if query.strip():
+            unique.setdefault(_cache_key(query), query)
+    queries = list(unique.values())
+    if not queries:
+        return json.dumps({"error": "At least one query is required"})
+    if len(queries) > BATCH_MAX_QUERIES:
+        return json.dumps({"error": f"At most {BATCH_MAX_QUERIES} queries can be searched per call"})
+    max_results = BATCH_DEFAULT_RESULTS if max_results is None else max_results
+    if not 1 <= max_results <= MAX_RESULTS:
+        return json.dumps({"error": f"max_results must be between 1 and {MAX_RESULTS}"})
+
+    logger.info(f"Searching SearXNG for {len(queries)} queries")
+    # Fuse over every cached result, not just the top few, so agreement lower down still counts
+    outcomes = await asyncio.gather(*(
+        search(query, max_results=MAX_RESULTS, categories=categories, language=language,
+               time_range=time_range, snippets=include_snippets)
+        for query in queries
+    ), return_exceptions=True)
+
+    result_lists = []
+    errors = []
+    for query, outcome in zip(queries, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Search failed for '{query}': {outcome}")
+            errors.append({"query": query, "error": str(outcome)})
+            result_lists.append([])
+        else:
+            result_lists.append(outcome)
+    if len(errors) == len(queries):
+        return json.dumps({"error": errors[0]["error"]})
+
+    results = []
+    for result in fuse_results(result_lists)[:max_results]:
+        result["queries"] = [queries[index] for index in result["queries"]]
+        results.append(result)
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            items = data.get("results", [])
-            if not items:
-                logger.info(f"No results for '{query}'")
-                return json.dumps({"results": []})
-
-            # Format as JSON
-            results = []
-            for item in items[:3]:
-                title = item.get("title", "No Title")
-                url = item.get("url", "")
-                results.append({
-                    "title": title,
-                    "url": url
-                })
-                logger.info(f"Found result for '{query}': {title}, {url}")
-            
-            return json.dumps({"results": results}, indent=2)
-
-        except Exception as e:
-            logger.error(f"Search failed: {str(e)}")
-            return json.dumps({"error": str(e)})
+    response = {"results": results}
+    if errors:
+        response["errors"] = errors
+    return json.dumps(response, indent=2)
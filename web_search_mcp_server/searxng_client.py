@@ -0,0 +1,272 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+import httpx
+import metrics
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+SEARXNG_RETRIES = int(os.getenv("SEARXNG_RETRIES", "2"))
+SEARXNG_BACKOFF = float(os.getenv("SEARXNG_RETRY_BACKOFF", "0.2"))
+# Overall time budget of one search, retries and hedges included
+SEARXNG_DEADLINE = float(os.getenv("SEARXNG_SEARCH_DEADLINE", "30"))
+# Consecutive failures that open a backend's circuit, and how long it stays open
+BREAKER_THRESHOLD = int(os.getenv("SEARXNG_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("SEARXNG_BREAKER_COOLDOWN", "30"))
+HEDGE = os.getenv("SEARXNG_HEDGE", "false").lower() in ("1", "true", "yes")
+# Hedge delay until a backend has enough latency samples for its own p95
+HEDGE_DELAY = float(os.getenv("SEARXNG_HEDGE_DELAY", "1.0"))
+HEDGE_MIN_DELAY = float(os.getenv("SEARXNG_HEDGE_MIN_DELAY", "0.05"))
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+class SearchUnavailable(Exception):
+    """Raised when every SearXNG backend has an open circuit, or a search runs past its deadline."""
+
+
+def _status(error: Exception) -> int | None:
+    if isinstance(error, httpx.HTTPStatusError):
+        status = getattr(error.response, "status_code", None)
+        return status if isinstance(status, int) else None
+    return None
+
+
+def is_transient(error: Exception) -> bool:
+    """Connection problems, timeouts, 429 and 5xx are worth retrying; anything else isn't."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    status = _status(error)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _counts_against_backend(error: Exception) -> bool:
+    # A 4xx (other than 429) means our request was bad, not that the backend is unhealthy
+    status = _status(error)
+    return status is None or status == 429 or status >= 500
+
+
+class Backend:
+    """One SearXNG instance with its circuit breaker and recent latencies."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def state(self, cooldown: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= cooldown else "open"
+
+    def p95(self) -> float | None:
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        if self.opened_at is not None:
+            logger.info(f"SearXNG backend {self.url} recovered")
+        self.opened_at = None
+
+    def record_abandoned(self, latency: float):
+        """
+        Keeps the time an abandoned (e.g. hedged-away) request had been running as a lower bound
+        of its latency. Without it the p95 would only see requests fast enough to win, drift down
+        and trigger ever more hedges.
+        """
+        self.latencies.append(latency)
+
+    def record_failure(self, threshold: int):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= threshold:
+            if self.opened_at is None:
+                logger.warning(f"Opening circuit for SearXNG backend {self.url}")
+                metrics.searxng_events.inc(event="breaker_open")
+            # A failed half-open trial keeps the circuit open for another cooldown
+            self.opened_at = time.monotonic()
+
+    def stats(self, cooldown: float) -> dict:
+        p95 = self.p95()
+        return {
+            "url": self.url,
+            "state": self.state(cooldown),
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class SearxngBackends:
+    """
+    Spreads SearXNG requests over several instances.
+
+    Healthy backends are used round-robin. Transient failures are retried with jittered
+    exponential backoff, preferring a backend that hasn't been tried yet. A backend with
+    `breaker_threshold` consecutive failures is skipped for `breaker_cooldown` seconds, then
+    gets a single trial request. With `hedge`, a request that is slower than the backend's
+    recent p95 is duplicated to another backend and the first answer wins. A search gives up
+    after `deadline` seconds, and a read timeout is only retried on a backend not tried yet.
+    """
+
+    def __init__(self, urls: list[str], retries: int = SEARXNG_RETRIES, backoff: float = SEARXNG_BACKOFF,
+                 breaker_threshold: int = BREAKER_THRESHOLD, breaker_cooldown: float = BREAKER_COOLDOWN,
+                 hedge: bool = HEDGE, hedge_delay: float = HEDGE_DELAY, hedge_min_delay: float = HEDGE_MIN_DELAY,
+                 deadline: float = SEARXNG_DEADLINE):
+        self.configure(urls)
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+
+    def configure(self, urls: list[str]):
+        """Replaces the backends, starting them all with closed circuits."""
+        self.backends = [Backend(url) for url in urls]
+        self._next = 0
+
+    def reset(self):
+        self.configure([backend.url for backend in self.backends])
+
+    def _pick(self, exclude: set, strict: bool = False) -> Backend | None:
+        """
+        Next backend round-robin, healthy ones first. Backends in `exclude` are only reused
+        when nothing else is available and `strict` is off. Strict picks are for hedges, which
+        may never be sent, so they don't move the rotation on.
+        """
+        count = len(self.backends)
+        rotated = [self.backends[(self._next + i) % count] for i in range(count)]
+        closed = [backend for backend in rotated if backend.state(self.breaker_cooldown) == "closed"]
+        trials = [
+            backend for backend in rotated
+            if backend.state(self.breaker_cooldown) == "half-open" and not backend.trial_in_flight
+        ]
+        for candidates in ([b for b in closed + trials if b not in exclude], [] if strict else closed + trials):
+            if candidates:
+                backend = candidates[0]
+                if not strict:
+                    self._next = (self.backends.index(backend) + 1) % count
+                return backend
+        return None
+
+    def _hedge_after(self, backend: Backend) -> float:
+        p95 = backend.p95()
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.hedge_delay)
+
+    async def _request(self, client: httpx.AsyncClient, backend: Backend, params: dict) -> dict:
+        trial = backend.state(self.breaker_cooldown) == "half-open"
+        if trial:
+            backend.trial_in_flight = True
+        backend.requests += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(f"{backend.url}/search", params=params)
+            response.raise_for_status()
+            data = response.json()
+        except asyncio.CancelledError:
+            backend.record_abandoned(time.perf_counter() - start)
+            raise
+        except Exception as e:
+            logger.warning(f"SearXNG backend {backend.url} failed: {e!r}")
+            if _counts_against_backend(e):
+                backend.record_failure(self.breaker_threshold)
+            raise
+        finally:
+            if trial:
+                backend.trial_in_flight = False
+        backend.record_success(time.perf_counter() - start)
+        return data
+
+    async def _attempt(self, client: httpx.AsyncClient, params: dict, tried: set) -> dict:
+        primary = self._pick(tried)
+        if primary is None:
+            raise SearchUnavailable("All SearXNG backends are unavailable, try again later")
+        tried.add(primary)
+        secondary = self._pick(tried, strict=True) if self.hedge else None
+        if secondary is None:
+            return await self._request(client, primary, params)
+
+        first = asyncio.create_task(self._request(client, primary, params))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self._hedge_after(primary))
+            if done:
+                return first.result()
+            metrics.searxng_events.inc(event="hedge")
+            tried.add(secondary)
+            hedged = asyncio.create_task(self._request(client, secondary, params))
+            pending.add(hedged)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            metrics.searxng_events.inc(event="hedge_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The slower request is abandoned once either one has answered
+            for task in pending:
+                task.cancel()
+
+    async def search(self, client: httpx.AsyncClient, params: dict) -> dict:
+        """Returns SearXNG's JSON response. Raises the last error once retries are exhausted."""
+        tried: set = set()
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Full jitter keeps retries from many callers from arriving in lockstep
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+                metrics.searxng_events.inc(event="retry")
+            try:
+                return await asyncio.wait_for(self._attempt(client, params, tried), deadline - time.monotonic())
+            except TimeoutError:
+                # httpx timeouts aren't TimeoutErrors, so this is the overall deadline
+                raise SearchUnavailable(f"SearXNG did not answer within {self.deadline:g}s") from None
+            except Exception as e:
+                if attempt == self.retries or not self._retryable(e, tried):
+                    raise
+
+    def _retryable(self, error: Exception, tried: set) -> bool:
+        if not is_transient(error):
+            return False
+        # A hung instance would just hang again; only another instance is worth a second read timeout
+        return not isinstance(error, httpx.ReadTimeout) or self._pick(tried, strict=True) is not None
+
+    async def probe(self, client: httpx.AsyncClient, timeout: float) -> list[dict]:
+        """
+        Checks that each instance answers at all, via SearXNG's /healthz rather than a search.
+        Doesn't count towards the circuit breakers.
+        """
+        async def check(backend: Backend) -> dict:
+            try:
+                response = await client.get(f"{backend.url}/healthz", timeout=timeout)
+                # Older instances without /healthz still answer with a 404
+                reachable = response.status_code < 500
+            except httpx.HTTPError as e:
+                logger.info(f"SearXNG backend {backend.url} is unreachable: {e!r}")
+                reachable = False
+            return {"url": backend.url, "reachable": reachable, "state": backend.state(self.breaker_cooldown)}
+
+        return list(await asyncio.gather(*(check(backend) for backend in self.backends)))
+
+    def stats(self) -> list[dict]:
+        return [backend.stats(self.breaker_cooldown) for backend in self.backends]
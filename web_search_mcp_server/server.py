@@ -1,38 +1,404 @@
 import os
+import sys
+import json
+import time
+import asyncio
 import logging
-from mcp.server.fastmcp import FastMCP
-from crawl_service import perform_crawl
-from search_service import perform_web_search
+import tempfile
+import importlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Hashable
+import uvicorn
+from mcp.server.fastmcp import Context, FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+import metrics
+from admission import AdmissionError, admission_stats, gates
+from browser_pool import browser_pool
+from fetch_client import start_fetch_client, close_fetch_client
+from politeness import scheduler
+from postprocess import postprocess_pool
+from search_service import (
+    check_searxng, perform_web_search, perform_web_search_batch, search_cache_stats, searxng_stats, start_client,
+    close_client
+)
+from shared_backend import shared_backend
 
 # Basic logging config
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s %(levelname)s %(name)s: %(message)s",
 )
+logger = logging.getLogger(__name__)
 
 port = int(os.getenv("PORT", "8000"))
-mcp = FastMCP("web-search-mcp", host="0.0.0.0", port=port)
+# sse, or streamable-http for stateless requests that any worker or replica can serve
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse").lower()
+WORKERS = int(os.getenv("WORKERS", "1"))
+# Load the crawl stack and start the browser and post-processing pools in the background at
+# startup; by default that happens on the first crawl
+WARM_UP = os.getenv("WARM_UP", "false").lower() in ("1", "true", "yes")
+
+_started_at = time.monotonic()
+_warm_up: asyncio.Task | None = None
+
+def _lazy(module: str, name: str) -> Callable[..., Awaitable]:
+    """
+    Stands in for `module.name`, importing the module on first call. Keeps crawl4ai and
+    Playwright out of server startup, so instances that only search start fast.
+    """
+    async def call(*args, **kwargs):
+        return await getattr(importlib.import_module(module), name)(*args, **kwargs)
+
+    call.__name__ = name
+    return call
+
+perform_crawl = _lazy("crawl_service", "perform_crawl")
+perform_crawl_many = _lazy("crawl_service", "perform_crawl_many")
+perform_crawl_chunked = _lazy("chunk_service", "perform_crawl_chunked")
+perform_read_page_chunk = _lazy("chunk_service", "perform_read_page_chunk")
+perform_search_and_read = _lazy("read_service", "perform_search_and_read")
+
+async def warm_up():
+    """
+    Imports the crawl stack off the event loop, then starts the browser and post-processing pools.
+    """
+    start = time.perf_counter()
+    crawl_service = await asyncio.to_thread(importlib.import_module, "crawl_service")
+    await crawl_service.start_warm_up()
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.1f}s")
+
+def _warm_up_state() -> str:
+    if _warm_up is None:
+        return "lazy"
+    if not _warm_up.done():
+        return "running"
+    return "failed" if _warm_up.cancelled() or _warm_up.exception() else "done"
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """
+    FastMCP enters the lifespan once per client session, so shared resources are started
+    idempotently here and only shut down when the server process exits (see `create_app`).
+    The browser and post-processing pools start with the first crawl, or at startup with WARM_UP.
+    """
+    await start_client()
+    await start_fetch_client()
+    yield
+
+mcp = FastMCP(
+    "web-search-mcp",
+    host="0.0.0.0",
+    port=port,
+    lifespan=lifespan,
+    # No per-session state is kept between tool calls, so any worker can handle any request
+    stateless_http=True,
+)
+
+# How each tool reports an error, matching its normal output
+_ERROR_FORMATS = {
+    "web_search": lambda e: json.dumps({"error": str(e)}),
+    "web_search_batch": lambda e: json.dumps({"error": str(e)}),
+    "crawl_url": lambda e: f"Crawl failed: {e}",
+    "read_page_chunk": lambda e: json.dumps({"error": str(e)}),
+    "crawl_urls": lambda e: json.dumps({"error": str(e)}),
+    "search_and_read": lambda e: json.dumps({"error": str(e)}),
+}
+
+def _client_key(ctx: Context | None) -> Hashable:
+    """
+    Identifies the calling client for fair scheduling: the client id or X-Client-Id header
+    when the client sends one, otherwise its SSE session. Streamable HTTP is stateless, with
+    a new session per request, so there clients without an id are told apart by address.
+    """
+    if ctx is None:
+        return None
+    try:
+        client_id = ctx.client_id
+        request = ctx.request_context.request
+    except ValueError:
+        # Called outside of a request
+        return None
+    if client_id:
+        return client_id
+    if request is not None:
+        if client_id := request.headers.get("x-client-id"):
+            return client_id
+        if MCP_TRANSPORT == "streamable-http":
+            return request.client.host if request.client else None
+    return id(ctx.session)
+
+async def _run_tool(tool: str, ctx: Context | None, call: Callable[[], Awaitable[str]]) -> str:
+    """
+    Runs a tool call under its admission gate, recording total latency and output size.
+    """
+    with metrics.tool_seconds.time(tool=tool):
+        try:
+            async with gates[tool].admit(_client_key(ctx)):
+                result = await call()
+        except AdmissionError as e:
+            logger.warning(str(e))
+            result = _ERROR_FORMATS[tool](e)
+    metrics.output_chars.observe(len(result), tool=tool)
+    return result
 
 @mcp.tool()
-async def web_search(query: str) -> str:
+async def web_search(query: str, max_results: int | None = None, page: int = 1, categories: list[str] | None = None,
+                     language: str | None = None, time_range: str | None = None, include_snippets: bool = False,
+                     ctx: Context | None = None) -> str:
     """
-    Searches the web via SearXNG for current information. Returns top 3 results with titles and URLs.
+    Searches the web via SearXNG for current information. Returns results with titles and URLs,
+    and optionally a snippet of each page so you can skip crawling irrelevant results.
 
     Args: 
         query: The search query
+        max_results: Number of results to return (default 3, at most 20)
+        page: Result page, starting at 1
+        categories: Optional SearXNG categories, e.g. ["news"], ["science"], ["it"]
+        language: Optional language code, e.g. "en" or "de-DE"
+        time_range: Optional recency filter: "day", "week", "month" or "year"
+        include_snippets: Also return each result's snippet, engines, score and published date
+    """
+    return await _run_tool("web_search", ctx, lambda: perform_web_search(
+        query,
+        max_results=max_results,
+        page=page,
+        categories=categories,
+        language=language,
+        time_range=time_range,
+        include_snippets=include_snippets,
+    ))
+
+@mcp.tool()
+async def web_search_batch(queries: list[str], max_results: int | None = None, categories: list[str] | None = None,
+                           language: str | None = None, time_range: str | None = None,
+                           include_snippets: bool = False, ctx: Context | None = None) -> str:
+    """
+    Runs several phrasings of a search at once and returns one merged, deduplicated list ranked
+    across all of them. Prefer this over repeated web_search calls for the same question.
+
+    Args:
+        queries: Up to 5 search queries
+        max_results: Number of merged results to return (default 5, at most 20)
+        categories: Optional SearXNG categories, e.g. ["news"], ["science"], ["it"]
+        language: Optional language code, e.g. "en" or "de-DE"
+        time_range: Optional recency filter: "day", "week", "month" or "year"
+        include_snippets: Also return each result's snippet, engines, score and published date
     """
-    return await perform_web_search(query)
+    return await _run_tool("web_search_batch", ctx, lambda: perform_web_search_batch(
+        queries,
+        max_results=max_results,
+        categories=categories,
+        language=language,
+        time_range=time_range,
+        include_snippets=include_snippets,
+    ))
 
 @mcp.tool()
-async def crawl_url(url: str) -> str:
+async def crawl_url(url: str, max_chars: int | None = None, max_tokens: int | None = None,
+                    profile: str | None = None, chunked: bool = False, query: str | None = None,
+                    ctx: Context | None = None) -> str:
     """
     Crawls a website and returns cleaned, text-only markdown. Use this tool when you need to read 
     the content of a specific URL found in search results.
 
     Args: 
         url: The URL to crawl (must be http or https)
+        max_chars: Optional output budget in characters (default 10000)
+        max_tokens: Optional output budget in approximate tokens
+        profile: "lean" (default) skips images, fonts, media, stylesheets and trackers and waits briefly;
+            "full" loads the page like a normal browser, for pages that render badly without their assets
+        chunked: Return JSON with the first chunk, a handle and an outline of the page's headings with
+            offsets, so the rest of a long page can be read with read_page_chunk
+        query: What you are looking for on the page. Long pages then return the passages most relevant
+            to it instead of just the beginning (ignored with chunked)
+    """
+    if chunked:
+        crawl = lambda: perform_crawl_chunked(url, max_chars=max_chars, max_tokens=max_tokens, profile=profile)
+    else:
+        crawl = lambda: perform_crawl(url, max_chars=max_chars, max_tokens=max_tokens, profile=profile, query=query)
+    return await _run_tool("crawl_url", ctx, crawl)
+
+@mcp.tool()
+async def read_page_chunk(handle: str, offset: int | None = None, section: str | None = None,
+                          max_chars: int | None = None, max_tokens: int | None = None,
+                          ctx: Context | None = None) -> str:
+    """
+    Reads more of a page crawled with crawl_url(chunked=true), without crawling it again. Returns JSON
+    with the chunk's content and the offset of the next chunk (null at the end of the page).
+
+    Args:
+        handle: The handle returned by crawl_url
+        offset: Character offset to start at, e.g. the previous chunk's next_offset (default 0)
+        section: Start at the heading with this title instead, as listed in the outline
+        max_chars: Optional chunk size in characters (default 10000)
+        max_tokens: Optional chunk size in approximate tokens
     """
-    return await perform_crawl(url)
+    return await _run_tool("read_page_chunk", ctx, lambda: perform_read_page_chunk(
+        handle, offset=offset, section=section, max_chars=max_chars, max_tokens=max_tokens
+    ))
+
+@mcp.tool()
+async def crawl_urls(urls: list[str], max_chars: int | None = None, max_tokens: int | None = None,
+                     profile: str | None = None, ctx: Context | None = None) -> str:
+    """
+    Crawls several websites concurrently and returns cleaned, text-only markdown for each. Prefer this
+    over repeated crawl_url calls when reading multiple search results.
+
+    Args:
+        urls: The URLs to crawl (must be http or https)
+        max_chars: Optional per-page output budget in characters (default 10000)
+        max_tokens: Optional per-page output budget in approximate tokens
+        profile: "lean" (default) or "full" page loading, as for crawl_url
+    """
+    return await _run_tool(
+        "crawl_urls",
+        ctx,
+        lambda: perform_crawl_many(urls, max_chars=max_chars, max_tokens=max_tokens, profile=profile),
+    )
+
+@mcp.tool()
+async def search_and_read(query: str, ctx: Context, max_chars: int | None = None,
+                          max_tokens: int | None = None, profile: str | None = None) -> str:
+    """
+    Searches the web and reads the top results in one step. Returns each result's title, URL and
+    cleaned page content. Pages are streamed as progress notifications as soon as each one is read.
+
+    Args:
+        query: The search query
+        max_chars: Optional per-page output budget in characters (default 10000)
+        max_tokens: Optional per-page output budget in approximate tokens
+        profile: "lean" (default) or "full" page loading, as for crawl_url
+    """
+    async def report(done: int, total: int, page: dict):
+        await ctx.report_progress(done, total, message=json.dumps(page))
+
+    return await _run_tool(
+        "search_and_read",
+        ctx,
+        lambda: perform_search_and_read(
+            query, on_page=report, max_chars=max_chars, max_tokens=max_tokens, profile=profile
+        ),
+    )
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def stats(request: Request) -> JSONResponse:
+    """
+    Cache, browser pool, post-processing pool and admission queue counters.
+    """
+    return JSONResponse({
+        "search_cache": search_cache_stats(),
+        "searxng": searxng_stats(),
+        "browser_pool": browser_pool.stats(),
+        "politeness": scheduler.stats(),
+        "postprocess_pool": postprocess_pool.stats(),
+        "admission": admission_stats(),
+    })
+
+@mcp.custom_route("/healthz", methods=["GET"])
+async def healthz(request: Request) -> JSONResponse:
+    """
+    Liveness: answers as long as the event loop does. Reports SearXNG circuit states, the browser
+    pool and the warm-up without making any outgoing requests.
+    """
+    return JSONResponse({
+        "status": "ok",
+        "uptime_seconds": round(time.monotonic() - _started_at, 1),
+        "warm_up": _warm_up_state(),
+        "searxng": [{"url": backend["url"], "state": backend["state"]} for backend in searxng_stats()],
+        "browser_pool": browser_pool.stats(),
+    })
+
+@mcp.custom_route("/readyz", methods=["GET"])
+async def readyz(request: Request) -> JSONResponse:
+    """
+    Readiness: 200 once a SearXNG instance is reachable and a startup warm-up (WARM_UP) has
+    finished, 503 until then.
+    """
+    searxng = await check_searxng()
+    warm_up = _warm_up_state()
+    ready = any(backend["reachable"] for backend in searxng) and warm_up != "running"
+    return JSONResponse({
+        "ready": ready,
+        "warm_up": warm_up,
+        "searxng": searxng,
+        "browser_pool": browser_pool.stats(),
+    }, status_code=200 if ready else 503)
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> Response:
+    """
+    Per-stage latency histograms and failure/truncation counters in the Prometheus text format,
+    summed over all workers.
+    """
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+async def close_resources():
+    if _warm_up is not None:
+        _warm_up.cancel()
+        await asyncio.gather(_warm_up, return_exceptions=True)
+    # Nothing to cancel if no crawl ever loaded the crawl stack
+    crawl_service = sys.modules.get("crawl_service")
+    if crawl_service is not None:
+        await crawl_service.cancel_refreshes()
+    await browser_pool.close()
+    await postprocess_pool.close()
+    await close_fetch_client()
+    await close_client()
+    if shared_backend is not None:
+        await shared_backend.close()
+
+def create_app():
+    """
+    Builds the ASGI app for MCP_TRANSPORT. Shared resources are closed when the app shuts down.
+    """
+    app = mcp.streamable_http_app() if MCP_TRANSPORT == "streamable-http" else mcp.sse_app()
+    transport_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def app_lifespan(app):
+        global _warm_up
+        async with transport_lifespan(app):
+            metrics.start_flusher()
+            if WARM_UP:
+                _warm_up = asyncio.create_task(warm_up())
+            try:
+                yield
+            finally:
+                await close_resources()
+
+    app.router.lifespan_context = app_lifespan
+    return app
+
+def main():
+    workers = WORKERS
+    if workers > 1 and MCP_TRANSPORT != "streamable-http":
+        # An SSE session's stream and its POSTed messages must reach the same process
+        logger.warning("WORKERS > 1 needs MCP_TRANSPORT=streamable-http; running a single worker")
+        workers = 1
+
+    options = {
+        "host": mcp.settings.host,
+        "port": mcp.settings.port,
+        "log_level": mcp.settings.log_level.lower(),
+    }
+    if workers > 1:
+        # Workers share their metrics through files in this directory; start from empty counters
+        directory = os.getenv("METRICS_MULTIPROCESS_DIR") or tempfile.mkdtemp(prefix="web-search-mcp-metrics-")
+        os.makedirs(directory, exist_ok=True)
+        os.environ["METRICS_MULTIPROCESS_DIR"] = directory
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(directory, name))
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            workers=workers,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            **options,
+        )
+    else:
+        uvicorn.run(create_app(), **options)
 
 if __name__ == "__main__":
-    mcp.run(transport="sse")
+    main()
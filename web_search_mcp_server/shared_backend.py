@@ -0,0 +1,94 @@
+import os
+import time
+import logging
+from abc import ABC, abstractmethod
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Empty keeps all caches in process; redis://host:port/db shares them between workers and replicas
+SHARED_BACKEND_URL = os.getenv("SHARED_BACKEND_URL", "")
+SHARED_BACKEND_PREFIX = os.getenv("SHARED_BACKEND_PREFIX", "web-search-mcp:")
+
+
+class SharedBackend(ABC):
+    """
+    String key/value store with per-key expiry that caches can use as a second tier shared
+    between processes. Backend errors are logged and treated as misses so an outage only
+    costs cache hits.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float):
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(SharedBackend):
+    """In-process backend, mainly useful for tests and single-worker setups."""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[float, str]] = {}
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+
+class RedisBackend(SharedBackend):
+    """Redis backend; needs the optional `redis` package."""
+
+    def __init__(self, url: str, prefix: str = SHARED_BACKEND_PREFIX):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_BACKEND_URL points to Redis but the 'redis' package is not installed") from e
+        self.prefix = prefix
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> str | None:
+        try:
+            return await self._redis.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Shared backend read failed: {e}")
+            return None
+
+    async def set(self, key: str, value: str, ttl: float):
+        try:
+            await self._redis.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            logger.warning(f"Shared backend write failed: {e}")
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_backend(url: str = SHARED_BACKEND_URL) -> SharedBackend | None:
+    """
+    Returns the backend for SHARED_BACKEND_URL, or None to keep caches in process.
+    """
+    if not url:
+        return None
+    if url == "memory://":
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SHARED_BACKEND_URL: {url}")
+
+
+shared_backend = create_backend()
@@ -0,0 +1,151 @@
+import os
+import re
+import logging
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from fetch_client import fetch_client
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+# A cut-off PDF can't be parsed, so PDFs get a larger limit and are refused beyond it
+FETCH_MAX_PDF_BYTES = int(os.getenv("FETCH_MAX_PDF_BYTES", str(25 * 1024 * 1024)))
+# Pages with less visible text than this are assumed to be rendered by JavaScript
+MIN_TEXT_CHARS = int(os.getenv("STATIC_MIN_TEXT_CHARS", "200"))
+NOSCRIPT_SHELL_TEXT_CHARS = 1000
+
+_HIDDEN_BLOCKS = re.compile(r"<(script|style|noscript|template|svg)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r"<[^>]*>")
+_BODY = re.compile(r"<body\b[^>]*>(.*)", re.IGNORECASE | re.DOTALL)
+_NOSCRIPT_JS = re.compile(
+    r"<noscript\b[^>]*>(?:(?!</noscript).){0,500}?\b(?:enable|requires?|turn on|activate)\b[^<]{0,40}javascript",
+    re.IGNORECASE | re.DOTALL,
+)
+# Empty mount points of client-rendered apps (React, Vue, Next, Nuxt, Svelte, Angular)
+_SPA_ROOT = re.compile(
+    r"<div\s+id=[\"'](?:root|app|__next|__nuxt|svelte)[\"'][^>]*>\s*</div>|<app-root\b[^>]*>\s*</app-root>",
+    re.IGNORECASE,
+)
+_BOT_CHALLENGE = re.compile(r"cf-browser-verification|challenge-platform|<title>\s*Just a moment", re.IGNORECASE)
+_FEED_ROOT = re.compile(rb"<(?:rss|feed|rdf:RDF)\b")
+_FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/rdf+xml", "application/feed+json")
+_BINARY_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+
+
+class PageNotFound(Exception):
+    """Raised when the origin says the page doesn't exist (404 or 410)."""
+
+
+class DocumentTooLarge(Exception):
+    """Raised for PDFs over FETCH_MAX_PDF_BYTES, which can't be read from a truncated body."""
+
+
+@dataclass
+class StaticPage:
+    """HTML fetched without a browser, plus the response headers."""
+
+    html: str
+    headers: dict
+
+
+@dataclass
+class StaticDocument:
+    """A PDF, plain text, JSON or feed response, for the extractor of its `kind`."""
+
+    kind: str
+    body: bytes
+    encoding: str | None
+    headers: dict
+
+
+def sniff_kind(content_type: str, url: str, head: bytes) -> str | None:
+    """
+    Classifies a response as "html", "pdf", "feed", "json" or "text" from its content type and
+    first bytes, or returns None for anything else (images, archives, ...).
+    """
+    mime = content_type.split(";")[0].strip().lower()
+    if "html" in mime:
+        return "html"
+    if mime == "application/pdf" or head.lstrip().startswith(b"%PDF-"):
+        return "pdf"
+    if mime == "application/feed+json":
+        return "json"
+    if mime in _FEED_TYPES or ("xml" in mime and _FEED_ROOT.search(head[:2048])):
+        return "feed"
+    if mime == "application/json" or mime.endswith("+json"):
+        return "json"
+    if mime.startswith("text/"):
+        return "text"
+    if mime in _BINARY_TYPES and urlsplit(url).path.lower().endswith(".pdf"):
+        return "pdf"
+    return None
+
+
+def visible_text(html: str) -> str:
+    """
+    Rough visible text of an HTML document: body only, without scripts, styles or tags.
+    """
+    body = _BODY.search(html)
+    text = _HIDDEN_BLOCKS.sub(" ", body.group(1) if body else html)
+    return " ".join(_TAGS.sub(" ", text).split())
+
+
+def needs_browser(html: str) -> str | None:
+    """
+    Returns why the page looks like it needs JavaScript to render, or None if the static HTML will do.
+    """
+    if _BOT_CHALLENGE.search(html):
+        return "bot challenge"
+    if _SPA_ROOT.search(html):
+        return "empty SPA root"
+    text_length = len(visible_text(html))
+    if text_length < MIN_TEXT_CHARS:
+        return "empty body"
+    if text_length < NOSCRIPT_SHELL_TEXT_CHARS and _NOSCRIPT_JS.search(html):
+        return "noscript shell"
+    return None
+
+
+async def fetch_html(url: str) -> StaticPage | StaticDocument | None:
+    """
+    GETs the URL without a browser. Returns a StaticPage for 2xx HTML, a StaticDocument for
+    the types `sniff_kind` recognizes, and None for anything else. Raises PageNotFound for a
+    404 or 410, which a browser wouldn't fix either. Bodies larger than FETCH_MAX_BYTES are
+    truncated; PDFs larger than FETCH_MAX_PDF_BYTES raise DocumentTooLarge.
+    """
+    async with fetch_client() as client:
+        async with client.stream("GET", url) as response:
+            if response.status_code in (404, 410):
+                raise PageNotFound(f"{url} returned {response.status_code}")
+            content_type = response.headers.get("content-type", "")
+            if not response.is_success:
+                logger.info(f"Static fetch of {url} returned {response.status_code} {content_type or 'no content type'}")
+                return None
+
+            # The content type and first bytes decide, so unsupported bodies are never downloaded
+            chunks = response.aiter_bytes()
+            body = bytearray(await anext(chunks, b""))
+            kind = sniff_kind(content_type, url, bytes(body))
+            if kind is None:
+                logger.info(f"Static fetch of {url} returned unsupported {content_type or 'content'}")
+                return None
+
+            limit = FETCH_MAX_PDF_BYTES if kind == "pdf" else FETCH_MAX_BYTES
+            if kind == "pdf" and int(response.headers.get("content-length") or 0) > limit:
+                raise DocumentTooLarge(f"{url} is a PDF larger than {limit} bytes")
+            async for chunk in chunks:
+                if len(body) >= limit:
+                    break
+                body += chunk
+            if len(body) >= limit:
+                if kind == "pdf":
+                    raise DocumentTooLarge(f"{url} is a PDF larger than {limit} bytes")
+                logger.info(f"Static fetch of {url} truncated at {limit} bytes")
+
+            headers = dict(response.headers)
+            if kind != "html":
+                return StaticDocument(kind=kind, body=bytes(body[:limit]), encoding=response.charset_encoding,
+                                      headers=headers)
+            html = body[:limit].decode(response.charset_encoding or "utf-8", errors="replace")
+            return StaticPage(html=html, headers=headers)
@@ -0,0 +1,76 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolate_services(tmp_path, monkeypatch):
+    """Start every test with empty caches and metrics and browser-only crawling so results don't leak between tests"""
+    import metrics
+    import search_service
+    import crawl_service
+    import chunk_service
+    import politeness
+    from crawl_cache import CrawlCache
+
+    metrics.reset()
+    search_service._search_cache.clear()
+    search_service._backends.reset()
+    # Tests mock one SearXNG response per call; retries are opted into explicitly
+    monkeypatch.setattr(search_service._backends, "retries", 0)
+    # Tests mock the browser; the HTTP fast path is opted into explicitly
+    monkeypatch.setattr(crawl_service, "CRAWL_FETCH_MODE", "browser")
+    monkeypatch.setattr(crawl_service, "_crawl_cache", CrawlCache(path=str(tmp_path / "crawl_cache.sqlite3"), ttl=3600))
+    # Stale pages are revalidated inline unless a test opts into background refreshes
+    monkeypatch.setattr(crawl_service, "CRAWL_STALE_TTL", 0)
+    crawl_service._failure_cache.clear()
+    crawl_service._index_cache.clear()
+    chunk_service._documents.clear()
+    # Crawls don't start real browser or worker pools; tests that need one start their own
+    monkeypatch.setattr(crawl_service.browser_pool, "size", 0)
+    monkeypatch.setattr(crawl_service.postprocess_pool, "mode", "inline")
+    monkeypatch.setattr(crawl_service, "_warm_up", None)
+    # No robots.txt requests to real sites; per-host state starts empty
+    monkeypatch.setattr(politeness.scheduler, "robots_mode", "off")
+    politeness.scheduler.reset()
+    yield
+
+
+def _make_pdf(pages: list[str], title: str | None = None) -> bytes:
+    """Builds a minimal PDF with one line of Helvetica text per page."""
+    count = len(pages)
+    fonts = 3 + 2 * count
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(" ".join(f"{3 + 2 * i} 0 R" for i in range(count)), count),
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 {fonts} 0 R >> >> /Contents {4 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    trailer = "/Root 1 0 R"
+    if title:
+        objects.append(f"<< /Title ({title}) >>")
+        trailer += f" /Info {len(objects)} 0 R"
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} {trailer} >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+
+@pytest.fixture
+def make_pdf():
+    """Builds small text PDFs for extractor tests"""
+    return _make_pdf
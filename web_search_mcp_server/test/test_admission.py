@@ -0,0 +1,140 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+from admission import AdmissionError, AdmissionGate
+
+
+async def hold(gate, client, started, release, order=None, name=None):
+    async with gate.admit(client):
+        if order is not None:
+            order.append(name)
+        started.set()
+        await release.wait()
+
+
+class TestAdmissionGate:
+    """Test suite for AdmissionGate"""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self):
+        """Test that no more than `limit` calls run at once"""
+        gate = AdmissionGate("tool", limit=2, max_queue=10, queue_timeout=5)
+        running = 0
+        peak = 0
+
+        async def call():
+            nonlocal running, peak
+            async with gate.admit():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+
+        assert peak == 2
+        assert gate.stats() == {"limit": 2, "active": 0, "queued": 0, "admitted": 6, "rejected": 0, "timed_out": 0}
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        """Test that calls beyond the queue size are rejected immediately"""
+        gate = AdmissionGate("tool", limit=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        started = asyncio.Event()
+        running = asyncio.create_task(hold(gate, None, started, release))
+        await started.wait()
+        queued = asyncio.create_task(hold(gate, None, asyncio.Event(), release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionError, match="busy"):
+            async with gate.admit():
+                pass
+
+        assert gate.stats()["queued"] == 1
+        assert gate.stats()["rejected"] == 1
+        release.set()
+        await asyncio.gather(running, queued)
+        assert gate.active == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Test that a call waiting longer than the queue timeout is rejected and dequeued"""
+        gate = AdmissionGate("tool", limit=1, max_queue=5, queue_timeout=0.05)
+        release = asyncio.Event()
+        started = asyncio.Event()
+        running = asyncio.create_task(hold(gate, None, started, release))
+        await started.wait()
+
+        with pytest.raises(AdmissionError, match="waited"):
+            async with gate.admit():
+                pass
+
+        assert gate.queued == 0
+        assert gate.timed_out == 1
+        release.set()
+        await running
+        assert gate.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_its_place(self):
+        """Test that a cancelled waiter doesn't hold on to a slot"""
+        gate = AdmissionGate("tool", limit=1, max_queue=5, queue_timeout=5)
+        release = asyncio.Event()
+        started = asyncio.Event()
+        running = asyncio.create_task(hold(gate, None, started, release))
+        await started.wait()
+        waiting = asyncio.create_task(hold(gate, None, asyncio.Event(), release))
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        await running
+
+        assert gate.active == 0
+        assert gate.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_fair_scheduling_round_robins_clients(self):
+        """Test that a client with many queued calls doesn't starve another client"""
+        gate = AdmissionGate("tool", limit=1, max_queue=10, queue_timeout=5, fair=True)
+        order = []
+        release = asyncio.Event()
+        started = asyncio.Event()
+        first = asyncio.create_task(hold(gate, "busy", started, release))
+        await started.wait()
+
+        waiting = [asyncio.create_task(hold(gate, "busy", asyncio.Event(), release, order, f"busy{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(hold(gate, "quiet", asyncio.Event(), release, order, "quiet")))
+        await asyncio.sleep(0)
+
+        release.set()
+        await asyncio.gather(first, *waiting)
+
+        assert order == ["busy0", "quiet", "busy1", "busy2"]
+
+    @pytest.mark.asyncio
+    async def test_fifo_without_fair_scheduling(self):
+        """Test that waiters are served in arrival order when fair scheduling is off"""
+        gate = AdmissionGate("tool", limit=1, max_queue=10, queue_timeout=5, fair=False)
+        order = []
+        release = asyncio.Event()
+        started = asyncio.Event()
+        first = asyncio.create_task(hold(gate, "busy", started, release))
+        await started.wait()
+
+        waiting = [asyncio.create_task(hold(gate, "busy", asyncio.Event(), release, order, f"busy{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(hold(gate, "quiet", asyncio.Event(), release, order, "quiet")))
+        await asyncio.sleep(0)
+
+        release.set()
+        await asyncio.gather(first, *waiting)
+
+        assert order == ["busy0", "busy1", "busy2", "quiet"]
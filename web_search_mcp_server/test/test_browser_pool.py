@@ -0,0 +1,178 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+from browser_pool import BrowserPool, BrowserUnavailable
+
+
+def make_crawler():
+    crawler = MagicMock()
+    crawler.start = AsyncMock(return_value=crawler)
+    crawler.close = AsyncMock()
+    crawler.ready = True
+    crawler.crawler_strategy.browser_manager.browser.is_connected.return_value = True
+    return crawler
+
+
+class TestBrowserPool:
+    """Test suite for BrowserPool"""
+
+    @pytest.mark.asyncio
+    async def test_start_launches_warm_browsers(self):
+        """Test that start launches the configured number of browsers once"""
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=lambda: make_crawler()) as mock_cls:
+            pool = BrowserPool(size=2)
+            await pool.start()
+            await pool.start()
+
+            assert pool.started
+            assert mock_cls.call_count == 2
+            assert pool.stats()["idle"] == 2
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_acquire_returns_browser_to_pool(self):
+        """Test checkout/return semantics"""
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=lambda: make_crawler()):
+            pool = BrowserPool(size=1, max_memory_mb=float("inf"))
+            await pool.start()
+
+            async with pool.acquire() as crawler:
+                assert pool.stats()["in_use"] == 1
+                assert pool.stats()["idle"] == 0
+            async with pool.acquire() as second:
+                assert second is crawler
+
+            assert pool.stats()["idle"] == 1
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_acquire_prefers_browser_that_served_host(self):
+        """Test that a browser that rendered the host before is handed out for it again"""
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=lambda: make_crawler()):
+            pool = BrowserPool(size=2, max_memory_mb=float("inf"))
+            await pool.start()
+
+            async with pool.acquire("https://a.example") as first:
+                async with pool.acquire("https://b.example") as second:
+                    pass
+            # Idle order is now [first, second]; b.example should still get its browser
+            async with pool.acquire("https://b.example") as again:
+                assert again is second
+            async with pool.acquire("https://c.example") as other:
+                assert other is first
+
+            assert pool.stats()["affinity_hits"] == 1
+            assert pool.stats()["idle"] == 2
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_recycles_after_max_pages(self):
+        """Test that a browser is replaced after max_pages crawls"""
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=lambda: make_crawler()):
+            pool = BrowserPool(size=1, max_pages=2, max_memory_mb=float("inf"))
+            await pool.start()
+
+            async with pool.acquire() as first:
+                pass
+            async with pool.acquire() as again:
+                assert again is first
+            async with pool.acquire() as replacement:
+                assert replacement is not first
+
+            first.close.assert_awaited_once()
+            assert pool.recycled == 1
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_recycles_when_memory_limit_exceeded(self):
+        """Test that a browser is replaced when memory exceeds the limit"""
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=lambda: make_crawler()):
+            pool = BrowserPool(size=1, max_memory_mb=100)
+            await pool.start()
+
+            with patch.object(pool, '_memory_per_browser_mb', return_value=500):
+                async with pool.acquire() as first:
+                    pass
+            async with pool.acquire() as replacement:
+                assert replacement is not first
+
+            assert pool.recycled == 1
+            await pool.close()
+
+    def test_memory_estimate_skips_postprocess_workers(self):
+        """Test that post-processing workers aren't counted as browser memory"""
+        def child(pid, mb):
+            process = MagicMock()
+            process.pid = pid
+            process.memory_info.return_value.rss = mb * 1024 * 1024
+            return process
+
+        pool = BrowserPool(size=2)
+        children = [child(10, 300), child(11, 100), child(20, 120), child(21, 120)]
+        with patch('browser_pool.psutil.Process') as mock_process, \
+                patch('browser_pool.postprocess_pool.pids', return_value={20, 21}):
+            mock_process.return_value.children.return_value = children
+            assert pool._memory_per_browser_mb() == 200
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_browser_is_relaunched(self):
+        """Test that a disconnected browser is replaced on checkout"""
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=lambda: make_crawler()):
+            pool = BrowserPool(size=1, max_memory_mb=float("inf"))
+            await pool.start()
+
+            async with pool.acquire() as first:
+                pass
+            first.crawler_strategy.browser_manager.browser.is_connected.return_value = False
+
+            async with pool.acquire() as replacement:
+                assert replacement is not first
+            first.close.assert_awaited_once()
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout(self):
+        """Test that acquire raises BrowserUnavailable, a TimeoutError, when every browser is checked out"""
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=lambda: make_crawler()):
+            pool = BrowserPool(size=1, acquire_timeout=0.01, max_memory_mb=float("inf"))
+            await pool.start()
+
+            async with pool.acquire():
+                with pytest.raises(BrowserUnavailable):
+                    async with pool.acquire():
+                        pass
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_start_leaves_pool_stopped(self):
+        """Test that a browser launch failure falls back to an unstarted pool"""
+        crawler = make_crawler()
+        crawler.start.side_effect = RuntimeError("no chromium")
+
+        with patch('crawl4ai.AsyncWebCrawler', return_value=crawler):
+            pool = BrowserPool(size=1)
+            await pool.start()
+
+            assert not pool.started
+
+    @pytest.mark.asyncio
+    async def test_close_shuts_down_browsers(self):
+        """Test that close closes idle browsers"""
+        crawlers = []
+
+        def factory():
+            crawlers.append(make_crawler())
+            return crawlers[-1]
+
+        with patch('crawl4ai.AsyncWebCrawler', side_effect=factory):
+            pool = BrowserPool(size=2)
+            await pool.start()
+            await pool.close()
+
+            assert not pool.started
+            for crawler in crawlers:
+                crawler.close.assert_awaited_once()
@@ -0,0 +1,204 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from cache import TTLCache
+
+
+class TestTTLCache:
+    """Test suite for TTLCache"""
+
+    def test_get_and_set(self):
+        """Test basic get/set"""
+        cache = TTLCache(max_size=10, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("missing") is None
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries are dropped once their TTL passes"""
+        cache = TTLCache(max_size=10, ttl=60)
+        with patch('cache.time.monotonic', return_value=1000.0):
+            cache.set("a", 1)
+        with patch('cache.time.monotonic', return_value=1059.0):
+            assert cache.get("a") == 1
+        with patch('cache.time.monotonic', return_value=1061.0):
+            assert cache.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_refreshing(self):
+        """Test that an expired entry within its grace period is returned and reloaded in the background"""
+        cache = TTLCache(max_size=10, ttl=60, stale_ttl=30)
+        loader = AsyncMock(side_effect=["old", "new"])
+        with patch('cache.time.monotonic', return_value=1000.0):
+            await cache.get_or_load("k", loader)
+
+        with patch('cache.time.monotonic', return_value=1070.0):
+            assert cache.get("k") is None
+            assert await cache.get_or_load("k", loader) == "old"
+            assert await cache.get_or_load("k", loader) == "old"
+            await cache.wait_for_refreshes()
+            assert await cache.get_or_load("k", loader) == "new"
+
+        assert loader.await_count == 2
+        assert cache.stats()["stale_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_stale_entry(self):
+        """Test that a refresh error keeps serving the stale value until the grace period ends"""
+        cache = TTLCache(max_size=10, ttl=60, stale_ttl=30)
+        with patch('cache.time.monotonic', return_value=1000.0):
+            await cache.get_or_load("k", AsyncMock(return_value="old"))
+
+        failing = AsyncMock(side_effect=RuntimeError("down"))
+        with patch('cache.time.monotonic', return_value=1070.0):
+            assert await cache.get_or_load("k", failing) == "old"
+            await cache.wait_for_refreshes()
+            assert await cache.get_or_load("k", failing) == "old"
+            await cache.wait_for_refreshes()
+        with patch('cache.time.monotonic', return_value=1091.0):
+            with pytest.raises(RuntimeError):
+                await cache.get_or_load("k", failing)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_disabled_cache_stores_nothing(self):
+        """Test that a zero TTL disables caching"""
+        cache = TTLCache(max_size=10, ttl=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_get_or_load_counts_hits_and_misses(self):
+        """Test that loads are cached and counted"""
+        cache = TTLCache(max_size=10, ttl=60)
+        loader = AsyncMock(return_value="value")
+
+        assert await cache.get_or_load("k", loader) == "value"
+        assert await cache.get_or_load("k", loader) == "value"
+
+        loader.assert_awaited_once()
+        assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "coalesced": 0}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_are_coalesced(self):
+        """Test that concurrent identical loads call the loader once"""
+        cache = TTLCache(max_size=10, ttl=60)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+        assert results == ["value"] * 5
+        assert calls == 1
+        assert cache.coalesced == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared_but_not_cached(self):
+        """Test that a failed load propagates to waiters and is retried next time"""
+        cache = TTLCache(max_size=10, ttl=60)
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            cache.get_or_load("k", failing),
+            cache.get_or_load("k", failing),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+        assert await cache.get_or_load("k", AsyncMock(return_value="ok")) == "ok"
+
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        """Test that waiting callers load again when the caller that started the load is cancelled"""
+        cache = TTLCache(max_size=10, ttl=60)
+        started = asyncio.Event()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                started.set()
+                await asyncio.sleep(60)
+            return "value"
+
+        leader = asyncio.create_task(cache.get_or_load("k", loader))
+        await started.wait()
+        follower = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "value"
+        assert leader.cancelled()
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_follower_leaves_load_running(self):
+        """Test that cancelling a waiting caller doesn't affect the shared load"""
+        cache = TTLCache(max_size=10, ttl=60)
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await leader == "value"
+        assert follower.cancelled()
+
+
+class TestSharedBackendTier:
+    """Test suite for TTLCache with a shared backend"""
+
+    @pytest.mark.asyncio
+    async def test_values_shared_between_caches(self):
+        """Test that a value loaded by one worker's cache is reused by another's"""
+        from shared_backend import MemoryBackend
+
+        backend = MemoryBackend()
+        first = TTLCache(max_size=10, ttl=60, backend=backend, namespace="search:")
+        second = TTLCache(max_size=10, ttl=60, backend=backend, namespace="search:")
+        loader = AsyncMock(return_value=[{"title": "A", "url": "https://a.com"}])
+
+        assert await first.get_or_load(("query",), loader) == [{"title": "A", "url": "https://a.com"}]
+        assert await second.get_or_load(("query",), loader) == [{"title": "A", "url": "https://a.com"}]
+
+        loader.assert_awaited_once()
+        assert second.stats()["shared_hits"] == 1
+        assert await backend.get('search:["query"]') is not None
+
+    @pytest.mark.asyncio
+    async def test_stats_without_backend_unchanged(self):
+        """Test that local-only caches don't report shared hits"""
+        assert "shared_hits" not in TTLCache(max_size=10, ttl=60).stats()
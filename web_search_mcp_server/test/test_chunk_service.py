@@ -0,0 +1,118 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from chunk_service import build_outline, perform_crawl_chunked, perform_read_page_chunk
+from crawl_service import PageUnavailable
+
+PAGE = (
+    "# Guide\n\nIntro paragraph.\n\n"
+    "## Install\n\n" + "Install step. " * 40 + "\n\n"
+    "```bash\n# not a heading\npip install thing\n```\n\n"
+    "## Usage\n\n" + "Usage detail. " * 40 + "\n\n"
+    "### Advanced usage\n\nThe end."
+)
+
+
+class TestBuildOutline:
+    """Test suite for build_outline"""
+
+    def test_lists_headings_with_offsets(self):
+        """Test that headings are listed with level and the offset of their line"""
+        outline = build_outline(PAGE)
+
+        assert [(entry["level"], entry["title"]) for entry in outline] == [
+            (1, "Guide"), (2, "Install"), (2, "Usage"), (3, "Advanced usage"),
+        ]
+        for entry in outline:
+            assert PAGE[entry["offset"]:].startswith("#" * entry["level"] + " " + entry["title"])
+
+    def test_caps_entries(self):
+        """Test that the outline is bounded"""
+        text = "".join(f"## Heading {i}\n\ntext\n\n" for i in range(10))
+        with patch('chunk_service.MAX_OUTLINE_ENTRIES', 3):
+            assert len(build_outline(text)) == 3
+
+
+class TestChunkedCrawl:
+    """Test suite for perform_crawl_chunked and perform_read_page_chunk"""
+
+    @pytest.mark.asyncio
+    async def test_reads_whole_page_chunk_by_chunk(self):
+        """Test that following next_offset returns the full page with a single crawl"""
+        with patch('chunk_service.load_page', new_callable=AsyncMock, return_value=PAGE) as mock_load:
+            first = json.loads(await perform_crawl_chunked("https://example.com/docs", max_chars=300))
+
+            assert first["offset"] == 0
+            assert first["total_chars"] == len(PAGE)
+            assert len(first["content"]) <= 300
+            assert [entry["title"] for entry in first["outline"]][:2] == ["Guide", "Install"]
+
+            chunks = [first]
+            while chunks[-1]["next_offset"] is not None:
+                chunk = json.loads(await perform_read_page_chunk(
+                    first["handle"], offset=chunks[-1]["next_offset"], max_chars=300
+                ))
+                assert "outline" not in chunk
+                chunks.append(chunk)
+
+            mock_load.assert_awaited_once()
+            assert len(chunks) > 2
+            # Only whitespace between chunks is dropped
+            assert " ".join(chunk["content"] for chunk in chunks).split() == PAGE.split()
+
+    @pytest.mark.asyncio
+    async def test_reads_section(self):
+        """Test that a section is found by title, exact match first"""
+        with patch('chunk_service.load_page', new_callable=AsyncMock, return_value=PAGE):
+            handle = json.loads(await perform_crawl_chunked("https://example.com/docs"))["handle"]
+
+        chunk = json.loads(await perform_read_page_chunk(handle, section="usage"))
+        assert chunk["section"] == "Usage"
+        assert chunk["content"].startswith("## Usage")
+
+        chunk = json.loads(await perform_read_page_chunk(handle, section="advanced"))
+        assert chunk["content"] == "### Advanced usage\n\nThe end."
+        assert chunk["next_offset"] is None
+
+    @pytest.mark.asyncio
+    async def test_invalid_requests(self):
+        """Test errors for unknown handles, sections and offsets"""
+        with patch('chunk_service.load_page', new_callable=AsyncMock, return_value=PAGE):
+            handle = json.loads(await perform_crawl_chunked("https://example.com/docs"))["handle"]
+
+        assert "Unknown or expired handle" in json.loads(await perform_read_page_chunk("nope"))["error"]
+        assert "No section" in json.loads(await perform_read_page_chunk(handle, section="Missing"))["error"]
+        assert "outside the page" in json.loads(await perform_read_page_chunk(handle, offset=len(PAGE)))["error"]
+        assert "either" in json.loads(await perform_read_page_chunk(handle, offset=0, section="Usage"))["error"]
+
+    @pytest.mark.asyncio
+    async def test_same_content_same_handle(self):
+        """Test that crawling an unchanged page again reuses its handle"""
+        with patch('chunk_service.load_page', new_callable=AsyncMock, return_value=PAGE):
+            first = json.loads(await perform_crawl_chunked("https://example.com/docs"))
+            second = json.loads(await perform_crawl_chunked("https://example.com/docs#install"))
+
+        assert first["handle"] == second["handle"]
+
+    @pytest.mark.asyncio
+    async def test_crawl_failure(self):
+        """Test that crawl errors are returned as JSON"""
+        with patch('chunk_service.load_page', new_callable=AsyncMock,
+                   side_effect=PageUnavailable("https://example.com/gone returned 404")):
+            result = json.loads(await perform_crawl_chunked("https://example.com/gone"))
+
+        assert result == {"error": "Crawl failed: https://example.com/gone returned 404"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_profile(self):
+        """Test that an unknown profile is rejected before crawling"""
+        with patch('chunk_service.load_page', new_callable=AsyncMock) as mock_load:
+            result = json.loads(await perform_crawl_chunked("https://example.com", profile="turbo"))
+
+        assert "Unknown crawl profile" in result["error"]
+        mock_load.assert_not_called()
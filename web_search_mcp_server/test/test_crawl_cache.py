@@ -0,0 +1,136 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import pytest
+from crawl_cache import CachedPage, CrawlCache
+
+
+class TestCrawlCache:
+    """Test suite for CrawlCache"""
+
+    @pytest.mark.asyncio
+    async def test_put_and_get(self, tmp_path):
+        """Test that stored pages are returned from memory"""
+        cache = CrawlCache(path=str(tmp_path / "cache.db"), ttl=60)
+        page = CachedPage(url="https://example.com/", content="text", fetched_at=time.time())
+
+        await cache.put(page)
+
+        assert await cache.get("https://example.com/") is page
+        assert await cache.get("https://other.com/") is None
+
+    @pytest.mark.asyncio
+    async def test_pages_persist_on_disk(self, tmp_path):
+        """Test that a new cache instance reads pages from the sqlite store"""
+        path = str(tmp_path / "cache.db")
+        fetched_at = time.time()
+        await CrawlCache(path=path, ttl=60).put(
+            CachedPage(url="https://example.com/", content="text", etag='"abc"', fetched_at=fetched_at)
+        )
+
+        page = await CrawlCache(path=path, ttl=60).get("https://example.com/")
+
+        assert page == CachedPage(url="https://example.com/", content="text", etag='"abc"', fetched_at=fetched_at)
+
+    @pytest.mark.asyncio
+    async def test_memory_lru_is_bounded(self):
+        """Test that the memory layer evicts least recently used pages"""
+        cache = CrawlCache(path="", ttl=60, memory_size=1)
+        await cache.put(CachedPage(url="a", content="1"))
+        await cache.put(CachedPage(url="b", content="2"))
+
+        assert await cache.get("a") is None
+        assert (await cache.get("b")).content == "2"
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_kept_for_revalidation(self, tmp_path):
+        """Test that expired pages are still returned but not fresh"""
+        cache = CrawlCache(path=str(tmp_path / "cache.db"), ttl=60)
+        await cache.put(CachedPage(url="a", content="1", etag='"v1"', fetched_at=time.time() - 120))
+
+        page = await cache.get("a")
+
+        assert not page.is_fresh(cache.ttl)
+        assert page.revalidatable
+        await cache.touch(page)
+        assert page.is_fresh(cache.ttl)
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache(self, tmp_path):
+        """Test that a zero TTL disables the cache"""
+        cache = CrawlCache(path=str(tmp_path / "cache.db"), ttl=0)
+        await cache.put(CachedPage(url="a", content="1"))
+
+        assert await cache.get("a") is None
+
+
+class TestCrawlCacheRetention:
+    """Test suite for bounding the sqlite store"""
+
+    @pytest.mark.asyncio
+    async def test_expired_pages_purged_on_open(self, tmp_path):
+        """Test that pages past TTL, stale period and retention are deleted when the store is opened"""
+        path = str(tmp_path / "cache.db")
+        now = time.time()
+        writer = CrawlCache(path=path, ttl=60, stale_ttl=60, retention=60)
+        await writer.put(CachedPage(url="old", content="1", fetched_at=now - 200))
+        await writer.put(CachedPage(url="kept", content="2", fetched_at=now - 100))
+
+        reader = CrawlCache(path=path, ttl=60, stale_ttl=60, retention=60)
+
+        assert await reader.get("old") is None
+        assert (await reader.get("kept")).content == "2"
+
+    @pytest.mark.asyncio
+    async def test_store_keeps_most_recent_pages(self, tmp_path, monkeypatch):
+        """Test that the oldest pages beyond max_rows are deleted as pages are written"""
+        import crawl_cache
+
+        monkeypatch.setattr(crawl_cache, "PURGE_INTERVAL", 2)
+        path = str(tmp_path / "cache.db")
+        now = time.time()
+        cache = CrawlCache(path=path, ttl=60, max_rows=2)
+        for i in range(4):
+            await cache.put(CachedPage(url=f"page{i}", content=str(i), fetched_at=now + i))
+
+        reader = CrawlCache(path=path, ttl=60, max_rows=2)
+        assert [await reader.get(f"page{i}") is not None for i in range(4)] == [False, False, True, True]
+
+    @pytest.mark.asyncio
+    async def test_sqlite_errors_are_cache_misses(self, tmp_path, monkeypatch):
+        """Test that a locked or broken database doesn't fail the crawl"""
+        import sqlite3
+
+        cache = CrawlCache(path=str(tmp_path / "cache.db"), ttl=60)
+
+        def locked(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(cache, "_store", locked)
+        monkeypatch.setattr(cache, "_load", locked)
+        await cache.put(CachedPage(url="a", content="1", fetched_at=time.time()))
+        cache._memory.clear()
+
+        assert await cache.get("a") is None
+
+
+class TestCrawlCacheSharedBackend:
+    """Test suite for CrawlCache with a shared backend"""
+
+    @pytest.mark.asyncio
+    async def test_pages_shared_between_workers(self, tmp_path):
+        """Test that a page stored by one worker is served to another from the backend"""
+        from shared_backend import MemoryBackend
+
+        backend = MemoryBackend()
+        first = CrawlCache(path="", ttl=60, backend=backend)
+        second = CrawlCache(path=str(tmp_path / "other.sqlite3"), ttl=60, backend=backend)
+        await first.put(CachedPage(url="https://example.com/", content="hello", etag='"v1"', fetched_at=time.time()))
+
+        page = await second.get("https://example.com/")
+
+        assert page.content == "hello"
+        assert page.etag == '"v1"'
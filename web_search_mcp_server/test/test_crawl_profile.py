@@ -0,0 +1,126 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+import metrics
+from crawl4ai import CrawlerRunConfig
+from crawl_profile import PROFILES, CrawlProfile, _after_goto, _on_page_context_created, get_profile, install_hooks
+
+
+def _route(url: str, resource_type: str, navigation: bool = False) -> MagicMock:
+    route = MagicMock()
+    route.request.url = url
+    route.request.resource_type = resource_type
+    route.request.is_navigation_request.return_value = navigation
+    route.abort = AsyncMock()
+    route.fallback = AsyncMock()
+    return route
+
+
+def _config(profile: CrawlProfile) -> CrawlerRunConfig:
+    return CrawlerRunConfig(shared_data={"crawl_profile": profile})
+
+
+class TestCrawlProfile:
+    """Test suite for profile lookup and blocking rules"""
+
+    def test_get_profile(self):
+        """Test that profiles are looked up by name with lean as the default"""
+        assert get_profile() is PROFILES["lean"]
+        assert get_profile("FULL") is PROFILES["full"]
+        with pytest.raises(ValueError, match="lean, full"):
+            get_profile("fast")
+
+    def test_blocks_resource_types_and_domains(self):
+        """Test that heavy resource types and blocklisted domains and their subdomains are blocked"""
+        profile = CrawlProfile(name="test", blocked_resource_types=frozenset({"image"}), blocked_domains=("ads.com",))
+
+        assert profile.blocks("https://example.com/a.png", "image") == "resource_type"
+        assert profile.blocks("https://cdn.ads.com/t.js", "script") == "domain"
+        assert profile.blocks("https://ads.com/t.js", "script") == "domain"
+        assert profile.blocks("https://badads.com/t.js", "script") is None
+        assert profile.blocks("https://example.com/app.js", "script") is None
+
+    def test_full_profile_loads_everything(self):
+        """Test that the full profile keeps crawl4ai's own page loading"""
+        full = PROFILES["full"]
+        assert full.blocks("https://example.com/a.png", "image") is None
+        assert full.network_idle_cap == 0
+        assert full.page_timeout is None
+
+
+class TestHooks:
+    """Test suite for the crawler hooks"""
+
+    @pytest.mark.asyncio
+    async def test_requests_are_filtered(self):
+        """Test that blocked subresources are aborted and everything else continues"""
+        page = MagicMock()
+        page.route = AsyncMock()
+        await _on_page_context_created(page, context=None, config=_config(PROFILES["lean"]))
+        pattern, handler = page.route.call_args[0]
+        assert pattern == "**/*"
+
+        image = _route("https://example.com/hero.jpg", "image")
+        tracker = _route("https://www.google-analytics.com/collect", "xhr")
+        script = _route("https://example.com/app.js", "script")
+        for route in (image, tracker, script):
+            await handler(route)
+
+        image.abort.assert_awaited_once()
+        tracker.abort.assert_awaited_once()
+        script.fallback.assert_awaited_once()
+        assert metrics.blocked_requests.value(reason="resource_type") == 1
+        assert metrics.blocked_requests.value(reason="domain") == 1
+
+    @pytest.mark.asyncio
+    async def test_page_itself_is_never_blocked(self):
+        """Test that navigating to a blocklisted domain still loads the page"""
+        page = MagicMock()
+        page.route = AsyncMock()
+        profile = CrawlProfile(name="test", blocked_domains=("example.com",))
+        await _on_page_context_created(page, context=None, config=_config(profile))
+        handler = page.route.call_args[0][1]
+
+        navigation = _route("https://example.com/", "document", navigation=True)
+        await handler(navigation)
+
+        navigation.fallback.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_no_interception_without_profile(self):
+        """Test that plain runs and profiles without rules don't route requests"""
+        page = MagicMock()
+        page.route = AsyncMock()
+
+        await _on_page_context_created(page, context=None, config=CrawlerRunConfig())
+        await _on_page_context_created(page, context=None, config=_config(CrawlProfile(name="plain")))
+
+        page.route.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_network_idle_wait_is_capped(self):
+        """Test that the lean profile waits for network idle but carries on when it never comes"""
+        page = MagicMock()
+        page.wait_for_load_state = AsyncMock(side_effect=TimeoutError("not idle"))
+
+        await _after_goto(page, url="https://example.com", config=_config(PROFILES["lean"]))
+        await _after_goto(page, url="https://example.com", config=_config(PROFILES["full"]))
+
+        page.wait_for_load_state.assert_awaited_once_with(
+            "networkidle", timeout=PROFILES["lean"].network_idle_cap * 1000
+        )
+
+    def test_install_hooks(self):
+        """Test that hooks are set on Playwright crawlers and other strategies are left alone"""
+        from crawl4ai import AsyncWebCrawler
+
+        crawler = AsyncWebCrawler()
+        install_hooks(crawler)
+        assert crawler.crawler_strategy.hooks["on_page_context_created"] is _on_page_context_created
+        assert crawler.crawler_strategy.hooks["after_goto"] is _after_goto
+
+        install_hooks(MagicMock())
@@ -3,6 +3,7 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from crawl_service import perform_crawl, flatten_markdown_links
@@ -53,6 +54,27 @@ class TestFlattenMarkdownLinks:
         # Should recursively flatten
         assert "(" not in result and ")" not in result
 
+    def test_flatten_keeps_non_link_brackets(self):
+        """Test that brackets not followed by a target stay literal, including their parent"""
+        assert flatten_markdown_links("see [1] and [a](u)") == "see [1] and a"
+        assert flatten_markdown_links("[a [b] c](u)") == "[a [b] c](u)"
+
+    def test_flatten_unbalanced_brackets(self):
+        """Test that unclosed brackets and targets are left alone"""
+        assert flatten_markdown_links("[open [link](u)") == "[open link"
+        assert flatten_markdown_links("stray ] and [a](no close") == "stray ] and [a](no close"
+        assert flatten_markdown_links("[empty]()") == "[empty]()"
+
+    def test_flatten_target_with_spaces_and_brackets(self):
+        """Test that link targets run to the first closing paren"""
+        assert flatten_markdown_links('[a](url "title") tail') == "a tail"
+        assert flatten_markdown_links("[a](x [b](y) tail") == "a tail"
+
+    def test_flatten_deep_nesting(self):
+        """Test that deeply nested links collapse in one pass"""
+        depth = 5000
+        assert flatten_markdown_links("[" * depth + "x" + "](u)" * depth) == "x"
+
 
 class TestPerformCrawl:
     """Test suite for perform_crawl function"""
@@ -168,3 +190,926 @@ class TestPerformCrawl:
             call_args = mock_crawler.arun.call_args
             assert call_args[1]["url"] == "https://example.com"
             assert "config" in call_args[1]
+
+    @pytest.mark.asyncio
+    async def test_crawl_profile_selects_page_loading(self):
+        """Test that the chosen profile reaches the hooks and sets the page time budget"""
+        from crawl_profile import PROFILES
+
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "test"
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            await perform_crawl("https://example.com/lean")
+            await perform_crawl("https://example.com/full", profile="full")
+
+        lean, full = (call.kwargs["config"] for call in mock_crawler.arun.call_args_list)
+        assert lean.shared_data["crawl_profile"] is PROFILES["lean"]
+        assert lean.page_timeout == int(PROFILES["lean"].page_timeout * 1000)
+        assert full.shared_data["crawl_profile"] is PROFILES["full"]
+        assert full.page_timeout == 60000
+
+    @pytest.mark.asyncio
+    async def test_unknown_profile(self):
+        """Test that an unknown profile is reported without crawling"""
+        with patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            assert "Unknown crawl profile 'fast'" in await perform_crawl("https://example.com", profile="fast")
+            mock_cls.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_crawl_uses_browser_pool_when_started(self):
+        """Test that a running browser pool is used instead of launching a browser"""
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "pooled"
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_pool = MagicMock()
+        mock_pool.started = True
+        mock_pool.acquire.return_value.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.browser_pool', mock_pool), patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            result = await perform_crawl("https://example.com")
+
+            assert result == "pooled"
+            mock_pool.acquire.assert_called_once()
+            mock_cls.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_slow_batch_checkout_is_not_remembered_as_failure(self):
+        """Test that a batch page timing out while waiting for a browser can be crawled again"""
+        import asyncio
+        from crawl_service import crawl_pages
+
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "pooled"
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        delays = [0.25, 0]
+
+        async def acquire(*args):
+            await asyncio.sleep(delays.pop(0))
+            return mock_crawler
+
+        mock_pool = MagicMock()
+        mock_pool.started = True
+        mock_pool.acquire.return_value.__aenter__.side_effect = acquire
+
+        with patch('crawl_service.browser_pool', mock_pool), patch('crawl_service.CRAWL_URL_TIMEOUT', 0.1):
+            [page] = await crawl_pages(["https://example.com"])
+            assert "No browser available" in page["error"]
+            assert await perform_crawl("https://example.com") == "pooled"
+
+    @pytest.mark.asyncio
+    async def test_crawl_pool_timeout(self):
+        """Test that a browser pool timeout is reported as a crawl failure"""
+        mock_pool = MagicMock()
+        mock_pool.started = True
+        mock_pool.acquire.return_value.__aenter__.side_effect = TimeoutError("No browser available after 30.0s")
+
+        with patch('crawl_service.browser_pool', mock_pool):
+            result = await perform_crawl("https://example.com")
+
+            assert "Crawl failed" in result
+            assert "No browser available" in result
+
+    @pytest.mark.asyncio
+    async def test_saturated_pool_is_not_remembered_as_failure(self):
+        """Test that a local browser shortage doesn't block the next crawl of the URL"""
+        from browser_pool import BrowserUnavailable
+
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "pooled"
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_pool = MagicMock()
+        mock_pool.started = True
+        mock_pool.acquire.return_value.__aenter__.side_effect = [
+            BrowserUnavailable("No browser available after 30.0s"), mock_crawler,
+        ]
+
+        with patch('crawl_service.browser_pool', mock_pool):
+            assert "No browser available" in await perform_crawl("https://example.com")
+            assert await perform_crawl("https://example.com") == "pooled"
+
+        assert mock_pool.acquire.call_count == 2
+
+
+class TestCrawlCaching:
+    """Test suite for crawl result caching"""
+
+    @staticmethod
+    def make_crawler(markdown="# Cached page", headers=None):
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = markdown
+        mock_result.response_headers = headers or {}
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+        mock_crawler.__aexit__.return_value = None
+        return mock_crawler
+
+    @pytest.mark.asyncio
+    async def test_repeat_crawl_is_served_from_cache(self):
+        """Test that equivalent URLs are only rendered once"""
+        mock_crawler = self.make_crawler()
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            first = await perform_crawl("https://example.com/docs#intro")
+            second = await perform_crawl("https://EXAMPLE.com/docs?utm_source=agent")
+
+            assert first == second == "# Cached page"
+            mock_crawler.arun.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_crawl_is_not_cached(self):
+        """Test that failures are retried on the next call"""
+        failed = MagicMock()
+        failed.success = False
+        failed.error_message = "Connection timeout"
+        mock_crawler = self.make_crawler()
+        mock_crawler.arun.side_effect = [failed, mock_crawler.arun.return_value]
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            assert "Crawl failed" in await perform_crawl("https://example.com")
+            assert await perform_crawl("https://example.com") == "# Cached page"
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_revalidated_with_304(self):
+        """Test that a stale page with an ETag is revalidated instead of re-rendered"""
+        import crawl_service
+
+        mock_crawler = self.make_crawler(headers={"ETag": '"v1"'})
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            await perform_crawl("https://example.com")
+
+        cached = await crawl_service._crawl_cache.get("https://example.com/")
+        assert cached.etag == '"v1"'
+        cached.fetched_at -= 2 * crawl_service._crawl_cache.ttl
+
+        with patch('crawl_service._revalidate', new_callable=AsyncMock, return_value=True) as mock_revalidate, \
+                patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            result = await perform_crawl("https://example.com")
+
+            assert result == "# Cached page"
+            mock_revalidate.assert_awaited_once()
+            mock_crawler.arun.assert_called_once()
+            assert cached.is_fresh(crawl_service._crawl_cache.ttl)
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_recrawled_when_changed(self):
+        """Test that a changed page is rendered again"""
+        import crawl_service
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=self.make_crawler(headers={"ETag": '"v1"'})):
+            await perform_crawl("https://example.com")
+        cached = await crawl_service._crawl_cache.get("https://example.com/")
+        cached.fetched_at -= 2 * crawl_service._crawl_cache.ttl
+
+        updated = self.make_crawler(markdown="# New page", headers={"ETag": '"v2"'})
+        with patch('crawl_service._revalidate', new_callable=AsyncMock, return_value=False), \
+                patch('crawl_service.AsyncWebCrawler', return_value=updated):
+            result = await perform_crawl("https://example.com")
+
+            assert result == "# New page"
+            assert (await crawl_service._crawl_cache.get("https://example.com/")).etag == '"v2"'
+
+    @pytest.mark.asyncio
+    async def test_revalidate_sends_conditional_headers(self):
+        """Test that revalidation sends If-None-Match/If-Modified-Since and detects 304"""
+        import httpx
+        from crawl_cache import CachedPage
+        from crawl_service import _revalidate
+
+        seen = {}
+
+        def handler(request):
+            seen.update(request.headers)
+            return httpx.Response(304)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        page = CachedPage(url="https://example.com/", content="x", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+        with patch('fetch_client._client', client):
+            assert await _revalidate("https://example.com/", page)
+
+        assert seen["if-none-match"] == '"v1"'
+        assert seen["if-modified-since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_refreshed(self):
+        """Test that a stale page is returned immediately and re-rendered in the background"""
+        import crawl_service
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=self.make_crawler()):
+            await perform_crawl("https://example.com")
+        cached = await crawl_service._crawl_cache.get("https://example.com/")
+        cached.fetched_at -= 2 * crawl_service._crawl_cache.ttl
+
+        updated = self.make_crawler(markdown="# New page")
+        with patch('crawl_service.CRAWL_STALE_TTL', 86400), \
+                patch('crawl_service.AsyncWebCrawler', return_value=updated):
+            assert await perform_crawl("https://example.com") == "# Cached page"
+            assert await perform_crawl("https://example.com") == "# Cached page"
+            await asyncio.gather(*crawl_service._refreshing.values())
+
+            updated.arun.assert_called_once()
+            assert await perform_crawl("https://example.com") == "# New page"
+
+    @pytest.mark.asyncio
+    async def test_hard_failure_is_cached_briefly(self):
+        """Test that a timed-out page fails fast on the next call until the negative TTL passes"""
+        import crawl_service
+
+        failed = MagicMock()
+        failed.success = False
+        failed.error_message = "Page.goto: Timeout 30000ms exceeded"
+        mock_crawler = self.make_crawler()
+        mock_crawler.arun.side_effect = [failed, mock_crawler.arun.return_value]
+
+        # The full profile has no time budget of its own, so its timeouts are the site's
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler), \
+                patch('crawl_service.DEFAULT_PROFILE', 'full'), patch('crawl_profile.DEFAULT_PROFILE', 'full'):
+            first = await perform_crawl("https://example.com")
+            second = await perform_crawl("https://example.com/#top")
+
+            assert first == second
+            assert "Timeout 30000ms exceeded" in second
+            mock_crawler.arun.assert_called_once()
+
+            crawl_service._failure_cache.clear()
+            assert await perform_crawl("https://example.com") == "# Cached page"
+
+    @pytest.mark.asyncio
+    async def test_lean_timeout_is_not_cached(self):
+        """Test that running out of the lean profile's budget doesn't block a retry"""
+        failed = MagicMock()
+        failed.success = False
+        failed.error_message = "Page.goto: Timeout 15000ms exceeded"
+        mock_crawler = self.make_crawler()
+        mock_crawler.arun.side_effect = [failed, mock_crawler.arun.return_value]
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            assert "Timeout 15000ms exceeded" in await perform_crawl("https://example.com")
+            assert await perform_crawl("https://example.com", profile="full") == "# Cached page"
+
+        assert mock_crawler.arun.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_other_profile_bypasses_cache(self):
+        """Test that asking for the full profile renders again instead of returning the lean copy"""
+        mock_crawler = self.make_crawler()
+        full = self.make_crawler("# Full page").arun.return_value
+        mock_crawler.arun.side_effect = [mock_crawler.arun.return_value, full]
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            assert await perform_crawl("https://example.com") == "# Cached page"
+            assert await perform_crawl("https://example.com", profile="full") == "# Full page"
+
+        profiles = [call.kwargs["config"].shared_data["crawl_profile"].name for call in mock_crawler.arun.call_args_list]
+        assert profiles == ["lean", "full"]
+
+    @pytest.mark.asyncio
+    async def test_missing_page_is_not_rendered(self):
+        """Test that a 404 from the browser is reported and cached as a failure"""
+        mock_crawler = self.make_crawler()
+        mock_crawler.arun.return_value.status_code = 404
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            assert await perform_crawl("https://example.com/gone") == "Crawl failed: https://example.com/gone returned 404"
+            assert "returned 404" in await perform_crawl("https://example.com/gone")
+            mock_crawler.arun.assert_called_once()
+
+
+class TestPerformCrawlMany:
+    """Test suite for perform_crawl_many function"""
+
+    @staticmethod
+    def make_result(markdown=None, error=None):
+        result = MagicMock()
+        result.success = error is None
+        result.markdown = markdown
+        result.error_message = error
+        result.response_headers = {}
+        return result
+
+    @pytest.mark.asyncio
+    async def test_results_in_input_order_with_inline_failures(self):
+        """Test that results keep input order and failures are reported per URL"""
+        import json
+        from crawl_service import perform_crawl_many
+
+        pages = {
+            "https://a.com": self.make_result(markdown="Page A"),
+            "https://b.com": self.make_result(error="DNS error"),
+            "https://c.com": self.make_result(markdown="Page [C](https://c.com/x)"),
+        }
+
+        async def arun(url, config):
+            return pages[url]
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.side_effect = arun
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler) as mock_cls:
+            result = json.loads(await perform_crawl_many(["https://a.com", "https://b.com", "https://c.com"]))
+
+            assert result["results"] == [
+                {"url": "https://a.com", "content": "Page A"},
+                {"url": "https://b.com", "error": "Crawl failed: DNS error"},
+                {"url": "https://c.com", "content": "Page C"},
+            ]
+            # One shared browser for the whole batch
+            mock_cls.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_crawls_run_concurrently_within_limit(self):
+        """Test that crawls overlap but never exceed the concurrency limit"""
+        import asyncio
+        import json
+        from crawl_service import perform_crawl_many
+
+        running = 0
+        peak = 0
+
+        async def arun(url, config):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return self.make_result(markdown=url)
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.side_effect = arun
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        urls = [f"https://example.com/{i}" for i in range(6)]
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler), \
+                patch('crawl_service.CRAWL_BATCH_CONCURRENCY', 2):
+            result = json.loads(await perform_crawl_many(urls))
+
+            assert [r["content"] for r in result["results"]] == urls
+            assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_per_url_timeout(self):
+        """Test that a slow URL times out without failing the batch"""
+        import asyncio
+        import json
+        from crawl_service import perform_crawl_many
+
+        async def arun(url, config):
+            if "slow" in url:
+                await asyncio.sleep(5)
+            return self.make_result(markdown="fast page")
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.side_effect = arun
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler), \
+                patch('crawl_service.CRAWL_URL_TIMEOUT', 0.5):
+            result = json.loads(await perform_crawl_many(["https://slow.com", "https://fast.com"]))
+
+            assert "Timed out" in result["results"][0]["error"]
+            assert result["results"][1]["content"] == "fast page"
+
+    @pytest.mark.asyncio
+    async def test_cached_urls_skip_browser(self):
+        """Test that fully cached batches don't launch a browser"""
+        import json
+        from crawl_service import perform_crawl_many
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = self.make_result(markdown="cached")
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler) as mock_cls:
+            await perform_crawl("https://example.com")
+            result = json.loads(await perform_crawl_many(["https://example.com", "https://example.com"]))
+
+            assert [r["content"] for r in result["results"]] == ["cached", "cached"]
+            mock_cls.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_stale_pages_revalidated_concurrently(self):
+        """Test that a batch of expired cached pages costs the slowest revalidation, not their sum"""
+        import asyncio
+        import time
+        import crawl_service
+        from crawl_cache import CachedPage
+
+        urls = [f"https://example.com/{i}" for i in range(4)]
+        for url in urls:
+            await crawl_service._crawl_cache.put(CachedPage(url=url, content=f"cached {url}", etag='"v1"', fetched_at=0))
+
+        async def revalidate(url, page):
+            await asyncio.sleep(0.2)
+            return True
+
+        start = time.perf_counter()
+        with patch('crawl_service._revalidate', side_effect=revalidate):
+            pages = await crawl_service.crawl_pages(urls)
+
+        assert [page["content"] for page in pages] == [f"cached {url}" for url in urls]
+        assert time.perf_counter() - start < 0.6
+
+    @pytest.mark.asyncio
+    async def test_too_many_urls(self):
+        """Test that oversized batches are rejected"""
+        import json
+        from crawl_service import perform_crawl_many
+
+        with patch('crawl_service.CRAWL_BATCH_MAX_URLS', 2):
+            result = json.loads(await perform_crawl_many(["a", "b", "c"]))
+
+            assert "error" in result
+
+
+class TestOutputBudget:
+    """Test suite for output budget handling"""
+
+    def test_output_budget_defaults_and_limits(self):
+        """Test budget resolution from characters and tokens"""
+        from crawl_service import output_budget, DEFAULT_MAX_CHARS, MAX_OUTPUT_CHARS, CHARS_PER_TOKEN
+
+        assert output_budget() == DEFAULT_MAX_CHARS
+        assert output_budget(max_chars=500) == 500
+        assert output_budget(max_tokens=100) == 100 * CHARS_PER_TOKEN
+        assert output_budget(max_chars=300, max_tokens=100) == 300
+        assert output_budget(max_chars=10 ** 9) == MAX_OUTPUT_CHARS
+
+    def test_fit_to_budget_snaps_to_block_boundary(self):
+        """Test that truncation ends at a paragraph or heading boundary"""
+        from crawl_service import fit_to_budget
+
+        text = "# Title\n\nFirst paragraph.\n## Section\n" + "word " * 50
+        result = fit_to_budget(text, 40)
+
+        assert result == "# Title\n\nFirst paragraph."
+
+    def test_fit_to_budget_snaps_inside_large_block(self):
+        """Test that a single oversized block is cut at a word break"""
+        from crawl_service import fit_to_budget
+
+        result = fit_to_budget("alpha beta gamma delta", 13)
+
+        assert result == "alpha beta"
+
+    def test_flattening_happens_before_truncation(self):
+        """Test that links are flattened first so the budget holds clean text"""
+        from crawl_service import fit_to_budget
+
+        paragraph = "[word](https://example.com/a/very/long/url/that/eats/the/budget) " * 20
+        result = fit_to_budget(paragraph + "\n\n" + paragraph, 200, flatten=True)
+
+        # Slicing the raw markdown at 200 characters would keep about three words
+        assert "https://" not in result
+        assert result == ("word " * 20).rstrip()
+
+    @pytest.mark.asyncio
+    async def test_per_call_budget_served_from_cache(self):
+        """Test that one render serves different budgets"""
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "\n\n".join(f"Paragraph {i} " + "text " * 40 for i in range(20))
+        mock_result.response_headers = {}
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            short = await perform_crawl("https://example.com", max_chars=500)
+            longer = await perform_crawl("https://example.com", max_tokens=500)
+
+            assert len(short) <= 500
+            assert 500 < len(longer) <= 2000
+            assert longer.startswith(short)
+            mock_crawler.arun.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_query_returns_relevant_passages(self):
+        """Test that a query selects matching sections from anywhere on the page within the budget"""
+        import crawl_service
+        sections = [f"## Topic {i}\n\n" + "filler text " * 30 for i in range(30)]
+        sections[25] = "## Pricing\n\nThe enterprise plan costs 40 dollars per seat."
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "\n\n".join(sections)
+        mock_result.response_headers = {}
+
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler), \
+                patch('crawl_service.PageIndex.build', wraps=crawl_service.PageIndex.build) as mock_build:
+            result = await perform_crawl("https://example.com", max_chars=1000, query="enterprise pricing")
+            again = await perform_crawl("https://example.com", max_chars=1000, query="seat cost")
+            unmatched = await perform_crawl("https://example.com", max_chars=1000, query="kubernetes")
+
+            assert result == "[...]\n\n## Pricing\n\nThe enterprise plan costs 40 dollars per seat.\n\n[...]"
+            assert "The enterprise plan" in again
+            assert unmatched.startswith("## Topic 0")
+            # Term statistics are built once per page
+            mock_build.assert_called_once()
+
+
+class TestStaticFastPath:
+    """Test suite for the browser-less HTTP fast path"""
+
+    ARTICLE = (
+        "<html><head><title>Docs</title></head><body><main><h1>Guide</h1>"
+        + "<p>This guide explains the configuration options in detail, see the [reference](/ref) "
+        "and <a href='/api'>API docs</a> for more.</p>" * 8
+        + "</main></body></html>"
+    )
+
+    @staticmethod
+    def client(html, headers=None):
+        import httpx
+        return httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, html=html, headers=headers or {})
+        ))
+
+    @pytest.mark.asyncio
+    async def test_static_page_skips_browser(self):
+        """Test that static HTML is converted without launching a browser"""
+        client = self.client(self.ARTICLE, headers={"ETag": '"v1"'})
+
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client), \
+                patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            result = await perform_crawl("https://example.com/guide")
+
+            mock_cls.assert_not_called()
+            assert "This guide explains the configuration options" in result
+            assert "API docs" in result
+            assert "](" not in result
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_js_page_escalates_to_browser(self):
+        """Test that a client-rendered shell is rendered in the browser"""
+        client = self.client('<html><body><div id="root"></div><script src="app.js"></script></body></html>')
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "Rendered by the browser"
+        mock_result.response_headers = {}
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client), \
+                patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            result = await perform_crawl("https://example.com/app")
+
+            assert result == "Rendered by the browser"
+            mock_crawler.arun.assert_called_once()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_documents_skip_browser(self, make_pdf):
+        """Test that PDF and JSON responses are read by their extractors without a browser"""
+        import httpx
+        import metrics
+
+        responses = {
+            "/paper.pdf": httpx.Response(200, content=make_pdf(["Abstract of the paper", "Results"]),
+                                         headers={"Content-Type": "application/pdf"}),
+            "/api": httpx.Response(200, json={"name": "thing"}),
+        }
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses[request.url.path]))
+
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client), \
+                patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            paper = await perform_crawl("https://example.com/paper.pdf")
+            api = await perform_crawl("https://example.com/api")
+
+            mock_cls.assert_not_called()
+            assert "## Page 1\n\nAbstract of the paper" in paper
+            assert "## Page 2\n\nResults" in paper
+            assert api == '```json\n{\n  "name": "thing"\n}\n```'
+            assert metrics.crawl_sources.value(source="pdf") == 1
+            assert metrics.crawl_sources.value(source="json") == 1
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unreadable_document_fails_without_browser(self):
+        """Test that a document without extractable text is reported instead of rendered"""
+        import httpx
+        client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=b"%PDF-1.4 broken", headers={"Content-Type": "application/pdf"})
+        ))
+
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client), \
+                patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            result = await perform_crawl("https://example.com/broken.pdf")
+
+            assert result.startswith("Crawl failed: Failed to read pdf document https://example.com/broken.pdf")
+            mock_cls.assert_not_called()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_http_only_mode_never_launches_browser(self):
+        """Test that CRAWL_FETCH_MODE=http reports pages that need JS as failures"""
+        client = self.client('<html><body><div id="app"></div></body></html>')
+
+        import crawl_service
+
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'http'), patch('fetch_client._client', client), \
+                patch.object(crawl_service.browser_pool, 'size', 2), \
+                patch.object(crawl_service.browser_pool, 'start', new_callable=AsyncMock) as mock_start, \
+                patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            result = await perform_crawl("https://example.com/app")
+            await crawl_service.start_warm_up()
+
+            assert "Crawl failed" in result
+            mock_cls.assert_not_called()
+            mock_start.assert_not_called()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_batch_uses_fast_path_per_url(self):
+        """Test that a batch only checks out a browser for pages that need one"""
+        import json
+        import httpx
+        from crawl_service import perform_crawl_many
+
+        def handler(request):
+            if request.url.path == "/app":
+                return httpx.Response(200, html='<html><body><div id="root"></div></body></html>')
+            return httpx.Response(200, html=self.ARTICLE)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "Rendered app"
+        mock_result.response_headers = {}
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client), \
+                patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler) as mock_cls:
+            result = json.loads(await perform_crawl_many(["https://example.com/guide", "https://example.com/app"]))
+
+            assert "This guide explains" in result["results"][0]["content"]
+            assert result["results"][1]["content"] == "Rendered app"
+            mock_cls.assert_called_once()
+            mock_crawler.arun.assert_called_once()
+        await client.aclose()
+
+
+    @pytest.mark.asyncio
+    async def test_missing_page_skips_browser(self):
+        """Test that a 404 on the fast path fails without a browser render"""
+        import httpx
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client), \
+                patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            result = await perform_crawl("https://example.com/missing")
+
+            assert result == "Crawl failed: https://example.com/missing returned 404"
+            mock_cls.assert_not_called()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_robots_disallowed_page_is_not_fetched(self):
+        """Test that in obey mode a page robots.txt disallows is refused without fetching it"""
+        import httpx
+        from politeness import scheduler
+        requested = []
+
+        def handler(request):
+            requested.append(request.url.path)
+            return httpx.Response(200, text="User-agent: *\nDisallow: /private\n")
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch.object(scheduler, 'robots_mode', 'obey'), patch('fetch_client._client', client), \
+                patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            result = await perform_crawl("https://example.com/private/page")
+
+            assert result.startswith("Crawl failed: robots.txt of https://example.com disallows")
+            assert requested == ["/robots.txt"]
+            mock_cls.assert_not_called()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unknown_host_skips_browser(self):
+        """Test that a DNS failure is a hard failure that is remembered"""
+        import socket
+        import httpx
+        import crawl_service
+
+        def handler(request):
+            try:
+                raise socket.gaierror(-2, "Name or service not known")
+            except socket.gaierror as e:
+                raise httpx.ConnectError("[Errno -2] Name or service not known") from e
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client), \
+                patch('crawl_service.fetch_html', wraps=crawl_service.fetch_html) as mock_fetch, \
+                patch('crawl_service.AsyncWebCrawler') as mock_cls:
+            assert "Could not resolve" in await perform_crawl("https://nowhere.invalid/")
+            assert "Could not resolve" in await perform_crawl("https://nowhere.invalid/")
+
+            mock_cls.assert_not_called()
+            mock_fetch.assert_awaited_once()
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_remembered_failures(self):
+        """Test that a batch doesn't crawl URLs that failed hard moments ago"""
+        import json
+        import httpx
+        from crawl_service import perform_crawl_many
+
+        requests = []
+
+        def handler(request):
+            requests.append(request.url.path)
+            if request.url.path == "/missing":
+                return httpx.Response(404)
+            return httpx.Response(200, html=self.ARTICLE)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch('crawl_service.CRAWL_FETCH_MODE', 'auto'), patch('fetch_client._client', client):
+            urls = ["https://example.com/guide", "https://example.com/missing"]
+            await perform_crawl_many(urls)
+            result = json.loads(await perform_crawl_many(urls))
+
+            assert "This guide explains" in result["results"][0]["content"]
+            assert result["results"][1]["error"] == "Crawl failed: https://example.com/missing returned 404"
+            assert requests == ["/guide", "/missing"]
+        await client.aclose()
+
+
+class TestCrawlMetrics:
+    """Test suite for crawl pipeline instrumentation"""
+
+    @staticmethod
+    def crawler(success=True, markdown="", error_message=None):
+        mock_result = MagicMock()
+        mock_result.success = success
+        mock_result.markdown = markdown
+        mock_result.error_message = error_message
+        mock_result.response_headers = {}
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+        return mock_crawler
+
+    @pytest.mark.asyncio
+    async def test_stages_and_truncation_recorded(self):
+        """Test that a browser crawl records acquire, render and flatten timings"""
+        import metrics
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=self.crawler(markdown="a" * 15000)):
+            await perform_crawl("https://example.com")
+            await perform_crawl("https://example.com", max_chars=20000)
+
+        assert metrics.browser_acquire_seconds.count() == 1
+        assert metrics.render_seconds.count() == 1
+        assert metrics.flatten_seconds.count() == 1
+        assert metrics.truncations.value() == 1
+        assert metrics.crawl_sources.value(source="browser") == 1
+        assert metrics.crawl_sources.value(source="cache") == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_counted_by_stage(self):
+        """Test that a failed render counts as both a render and a crawl failure"""
+        import metrics
+
+        with patch('crawl_service.AsyncWebCrawler', return_value=self.crawler(success=False, error_message="boom")):
+            await perform_crawl("https://example.com")
+
+        assert metrics.failures.value(stage="render") == 1
+        assert metrics.failures.value(stage="crawl") == 1
+
+
+class TestPostprocessOffload:
+    """Test suite for converting rendered HTML in the post-processing pool"""
+
+    @pytest.mark.asyncio
+    async def test_browser_html_converted_in_pool(self):
+        """Test that with the pool running crawl4ai only renders and the pool converts"""
+        import threading
+        import crawl_service
+        from postprocess import PostprocessPool
+
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.html = TestStaticFastPath.ARTICLE
+        mock_result.response_headers = {}
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        pool = PostprocessPool(workers=1, mode="thread")
+        await pool.start()
+        threads = []
+        convert = crawl_service.html_to_clean_text
+
+        def tracking_convert(html, url):
+            threads.append(threading.get_ident())
+            return convert(html, url)
+
+        try:
+            with patch('crawl_service.postprocess_pool', pool), \
+                    patch('crawl_service.html_to_clean_text', tracking_convert), \
+                    patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+                result = await perform_crawl("https://example.com/guide")
+        finally:
+            await pool.close()
+
+        assert mock_crawler.arun.call_args.kwargs["config"].prefetch is True
+        assert "This guide explains the configuration options" in result
+        assert "](" not in result
+        assert threads and threads[0] != threading.get_ident()
+
+
+class TestWarmUp:
+    """Test suite for starting the pools on the first crawl"""
+
+    @staticmethod
+    def pool(started: bool = False) -> MagicMock:
+        pool = MagicMock()
+        pool.started = started
+
+        async def start():
+            pool.started = True
+
+        pool.start = AsyncMock(side_effect=start)
+        return pool
+
+    @pytest.mark.asyncio
+    async def test_first_crawl_starts_pools_once(self):
+        """Test that the first crawl starts both pools and later crawls reuse them"""
+        from postprocess import PostprocessPool
+
+        browsers = self.pool()
+        postprocess = PostprocessPool(workers=1, mode="thread")
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.html = TestStaticFastPath.ARTICLE
+        mock_result.response_headers = {}
+        browsers.acquire.return_value.__aenter__.return_value = AsyncMock(arun=AsyncMock(return_value=mock_result))
+
+        try:
+            with patch('crawl_service.browser_pool', browsers), patch('crawl_service.postprocess_pool', postprocess):
+                assert "configuration options" in await perform_crawl("https://example.com/a")
+                assert "configuration options" in await perform_crawl("https://example.com/b")
+                assert postprocess.started
+        finally:
+            await postprocess.close()
+
+        browsers.start.assert_awaited_once()
+        assert browsers.acquire.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_started_pools_are_skipped(self):
+        """Test that warm-up leaves pools that are already running alone"""
+        import crawl_service
+
+        browsers = self.pool(started=True)
+        postprocess = self.pool()
+
+        with patch('crawl_service.browser_pool', browsers), patch('crawl_service.postprocess_pool', postprocess):
+            await crawl_service.start_warm_up()
+
+        browsers.start.assert_not_called()
+        postprocess.start.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_one_off_crawler(self):
+        """Test that a pool that can't start doesn't stop the crawl"""
+        browsers = MagicMock()
+        browsers.started = False
+        browsers.start = AsyncMock()
+        mock_result = MagicMock()
+        mock_result.success = True
+        mock_result.markdown = "one-off"
+        mock_crawler = AsyncMock()
+        mock_crawler.arun.return_value = mock_result
+        mock_crawler.__aenter__.return_value = mock_crawler
+
+        with patch('crawl_service.browser_pool', browsers), \
+                patch('crawl_service.AsyncWebCrawler', return_value=mock_crawler):
+            assert await perform_crawl("https://example.com") == "one-off"
+
+        browsers.acquire.assert_not_called()
@@ -0,0 +1,86 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from extractors import extract_document, feed_to_text, json_to_text, pdf_to_text, plain_text
+
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel>
+  <title>Example Blog</title>
+  <description>&lt;p&gt;Posts about &lt;b&gt;things&lt;/b&gt;&lt;/p&gt;</description>
+  <item><title>First post</title><link>https://example.com/1</link>
+    <pubDate>Mon, 05 Oct 2026 10:00:00 GMT</pubDate><description>Hello &lt;i&gt;world&lt;/i&gt;</description></item>
+  <item><title>Second post</title><link>https://example.com/2</link></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Release notes</title>
+  <entry><title>v2.0</title><link rel="alternate" href="https://example.com/v2"/>
+    <updated>2026-10-01T00:00:00Z</updated><summary>Big release</summary></entry>
+</feed>"""
+
+
+class TestPdfToText:
+    """Test suite for pdf_to_text"""
+
+    def test_extracts_pages_with_title(self, make_pdf):
+        """Test that every page's text is returned under a page heading"""
+        text = pdf_to_text(make_pdf(["Hello first page", "Second page text"], title="A Paper"), None, "u", 10000)
+
+        assert text.startswith("# A Paper")
+        assert "## Page 1\n\nHello first page" in text
+        assert "## Page 2\n\nSecond page text" in text
+
+    def test_stops_at_limit(self, make_pdf):
+        """Test that pages after the limit is reached are not parsed"""
+        pages = [f"Page number {i} text" for i in range(5)]
+        text = pdf_to_text(make_pdf(pages), None, "u", 30)
+
+        assert "Page number 1" in text
+        assert "Page number 2" not in text
+
+    def test_single_page_has_no_heading(self, make_pdf):
+        """Test that a one-page PDF is returned as plain text"""
+        assert pdf_to_text(make_pdf(["Just one page"]), None, "u", 10000) == "Just one page"
+
+
+class TestOtherExtractors:
+    """Test suite for the text, JSON and feed extractors"""
+
+    def test_plain_text_decodes_and_limits(self):
+        """Test charset handling and the character limit"""
+        assert plain_text("héllo wörld".encode("latin-1"), "latin-1", "u", 5) == "héllo"
+        assert plain_text("﻿utf8".encode("utf-8"), None, "u", 100) == "utf8"
+
+    def test_json_is_pretty_printed(self):
+        """Test that JSON is indented in a code block and invalid JSON is kept as is"""
+        assert json_to_text(b'{"a": [1, 2]}', None, "u", 1000) == '```json\n{\n  "a": [\n    1,\n    2\n  ]\n}\n```'
+        assert json_to_text(b'{"a": [1,', None, "u", 1000) == '```json\n{"a": [1,\n```'
+
+    def test_rss_feed(self):
+        """Test that RSS items are listed with link, date and tag-free summary"""
+        text = feed_to_text(RSS, None, "u", 10000)
+
+        assert text.startswith("# Example Blog\n\nPosts about things")
+        assert ("## First post\nhttps://example.com/1\nMon, 05 Oct 2026 10:00:00 GMT\n\nHello world") in text
+        assert "## Second post\nhttps://example.com/2" in text
+
+    def test_atom_feed(self):
+        """Test that Atom entries use the alternate link's href"""
+        text = feed_to_text(ATOM, None, "u", 10000)
+
+        assert text == "# Release notes\n\n## v2.0\nhttps://example.com/v2\n2026-10-01T00:00:00Z\n\nBig release"
+
+    def test_feed_stops_at_limit(self):
+        """Test that entries after the limit are skipped"""
+        assert "Second post" not in feed_to_text(RSS, None, "u", 10)
+
+    def test_dispatch(self):
+        """Test that extract_document picks the extractor by kind"""
+        assert extract_document("text", b"raw", None, "u", 100) == "raw"
+        with pytest.raises(Exception):
+            extract_document("pdf", b"not a pdf", None, "u", 100)
@@ -0,0 +1,137 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from metrics import Counter, Histogram, render
+
+
+class TestCounter:
+    """Test suite for Counter"""
+
+    def test_counts_per_label(self):
+        """Test that increments are tracked per label set"""
+        counter = Counter("test_failures", "Failures.", labelnames=("stage",))
+        counter.inc(stage="search")
+        counter.inc(2, stage="search")
+        counter.inc(stage="render")
+
+        assert counter.value(stage="search") == 3
+        assert counter.value(stage="render") == 1
+        assert counter.value(stage="other") == 0
+
+    def test_rejects_wrong_labels(self):
+        """Test that a missing or unknown label is an error"""
+        counter = Counter("test_labels", "Labels.", labelnames=("stage",))
+
+        with pytest.raises(ValueError):
+            counter.inc()
+        with pytest.raises(ValueError):
+            counter.inc(tool="x")
+
+    def test_render(self):
+        """Test the text exposition of a counter"""
+        counter = Counter("test_rendered", "Rendered counter.", labelnames=("stage",))
+        counter.inc(stage='a "quoted" stage')
+
+        lines = counter.render()
+
+        assert lines[0] == "# HELP test_rendered Rendered counter."
+        assert lines[1] == "# TYPE test_rendered counter"
+        assert lines[2] == 'test_rendered_total{stage="a \\"quoted\\" stage"} 1'
+
+
+class TestHistogram:
+    """Test suite for Histogram"""
+
+    def test_buckets_are_cumulative(self):
+        """Test bucket, sum and count samples"""
+        histogram = Histogram("test_latency", "Latency.", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        lines = histogram.render()
+
+        assert 'test_latency_bucket{le="0.1"} 2' in lines
+        assert 'test_latency_bucket{le="1"} 3' in lines
+        assert 'test_latency_bucket{le="+Inf"} 4' in lines
+        assert "test_latency_sum 5.65" in lines
+        assert "test_latency_count 4" in lines
+
+    def test_labels_and_le_are_combined(self):
+        """Test that bucket samples carry both the metric labels and le"""
+        histogram = Histogram("test_tool", "Tool.", labelnames=("tool",), buckets=(1,))
+        histogram.observe(0.5, tool="crawl_url")
+
+        assert 'test_tool_bucket{tool="crawl_url",le="1"} 1' in histogram.render()
+
+    def test_time_records_even_on_error(self):
+        """Test that the timer observes blocks that raise"""
+        histogram = Histogram("test_timer", "Timer.")
+
+        with pytest.raises(RuntimeError):
+            with histogram.time():
+                raise RuntimeError("boom")
+
+        assert histogram.count() == 1
+
+    def test_registry_render_includes_builtin_metrics(self):
+        """Test that the module-level render lists the service metrics"""
+        text = render()
+
+        assert "# TYPE web_search_mcp_search_seconds histogram" in text
+        assert "# TYPE web_search_mcp_failures counter" in text
+        assert text.endswith("\n")
+
+
+class TestMultiprocess:
+    """Test suite for adding up metrics across worker processes"""
+
+    def test_render_sums_worker_snapshots(self, tmp_path, monkeypatch):
+        """Test that /metrics reports the totals of every worker, not just the one that answered"""
+        import json
+        import metrics
+
+        monkeypatch.setattr(metrics, "MULTIPROCESS_DIR", str(tmp_path))
+        metrics.failures.inc(stage="search")
+        metrics.tool_seconds.observe(0.5, tool="web_search")
+        # Another worker's last flushed values
+        other = {
+            "web_search_mcp_failures": [[["search"], 2], [["crawl"], 1]],
+            "web_search_mcp_tool_seconds": [[["web_search"], [[0] * 7 + [1] + [0] * 6, 0.75]]],
+        }
+        (tmp_path / "99999.json").write_text(json.dumps(other))
+
+        lines = metrics.render().splitlines()
+
+        assert 'web_search_mcp_failures_total{stage="search"} 3' in lines
+        assert 'web_search_mcp_failures_total{stage="crawl"} 1' in lines
+        assert 'web_search_mcp_tool_seconds_count{tool="web_search"} 2' in lines
+        assert 'web_search_mcp_tool_seconds_sum{tool="web_search"} 1.25' in lines
+        assert (tmp_path / f"{os.getpid()}.json").exists()
+
+    def test_single_process_renders_local_values(self):
+        """Test that without a shared directory nothing is written"""
+        import metrics
+
+        metrics.failures.inc(stage="search")
+
+        assert 'web_search_mcp_failures_total{stage="search"} 1' in metrics.render().splitlines()
+        assert metrics.MULTIPROCESS_DIR == ""
+
+    def test_metric_without_merge_cannot_be_created(self):
+        """Test that a metric type that can't be added up across workers fails at construction"""
+        from metrics import _Metric, _registry
+
+        class Gauge(_Metric):
+            type = "gauge"
+
+            def _samples(self, key, value):
+                return []
+
+        with pytest.raises(TypeError):
+            Gauge("test_gauge", "Gauge.")
+        assert all(metric.name != "test_gauge" for metric in _registry)
@@ -0,0 +1,150 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from politeness import HostThrottle, PolitenessScheduler, RobotsDisallowed, host_key
+
+
+def robots_client(body: str, calls: list | None = None, status: int = 200):
+    def handler(request):
+        if calls is not None:
+            calls.append(str(request.url))
+        return httpx.Response(status, text=body)
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestHostKey:
+    """Test suite for host_key"""
+
+    def test_ignores_path_and_case(self):
+        """Test that pages of one site share a key and other ports don't"""
+        assert host_key("https://Example.com/a?b=1") == host_key("https://example.com/c")
+        assert host_key("https://example.com:8443/") != host_key("https://example.com/")
+
+
+class TestHostThrottle:
+    """Test suite for HostThrottle"""
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_paces_after_burst(self):
+        """Test that requests beyond the burst wait for the rate"""
+        throttle = HostThrottle(concurrency=10, rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            async with throttle.hold():
+                pass
+        # Two requests from the burst, two more at 20/s
+        assert time.monotonic() - start >= 0.09
+
+    def test_slow_down_only_lowers_rate(self):
+        """Test that a Crawl-delay can lower but never raise the rate"""
+        throttle = HostThrottle(concurrency=2, rate=2, burst=5)
+        throttle.slow_down(10)
+        assert throttle.rate == pytest.approx(0.1)
+        assert throttle.burst == 1
+        throttle.slow_down(0.01)
+        assert throttle.rate == pytest.approx(0.1)
+
+
+class TestPolitenessScheduler:
+    """Test suite for PolitenessScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_caps_concurrency_per_host(self):
+        """Test that at most `concurrency` requests run per host, while other hosts proceed"""
+        scheduler = PolitenessScheduler(concurrency=2, rate=0, robots_mode="off")
+        running = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+
+        async def crawl(site):
+            async with scheduler.slot(f"https://{site}.example/page"):
+                running[site] += 1
+                peak[site] = max(peak[site], running[site])
+                await asyncio.sleep(0.01)
+                running[site] -= 1
+
+        await asyncio.gather(*(crawl("a") for _ in range(6)), crawl("b"))
+
+        assert peak == {"a": 2, "b": 1}
+        assert scheduler.stats() == {"hosts": 2, "active": 0, "waiting": 0, "robots_cached": 0}
+
+    @pytest.mark.asyncio
+    async def test_crawl_delay_lowers_host_rate(self):
+        """Test that a robots.txt Crawl-delay is applied, capped at max_crawl_delay"""
+        scheduler = PolitenessScheduler(rate=5, burst=5, robots_mode="delay", max_crawl_delay=0.5)
+        client = robots_client("User-agent: *\nCrawl-delay: 30\n")
+
+        with patch('fetch_client._client', client):
+            async with scheduler.slot("https://slow.example/a"):
+                pass
+
+        throttle = scheduler._hosts["https://slow.example"]
+        assert throttle.rate == pytest.approx(2.0)
+        assert throttle.burst == 1
+
+    @pytest.mark.asyncio
+    async def test_obey_mode_refuses_disallowed_pages(self):
+        """Test that obey mode raises for disallowed paths and allows others"""
+        scheduler = PolitenessScheduler(rate=0, robots_mode="obey")
+        client = robots_client("User-agent: *\nDisallow: /private\n")
+
+        with patch('fetch_client._client', client):
+            with pytest.raises(RobotsDisallowed):
+                async with scheduler.slot("https://site.example/private/page"):
+                    pass
+            async with scheduler.slot("https://site.example/public"):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_delay_mode_ignores_disallow(self):
+        """Test that the default mode only honours Crawl-delay"""
+        scheduler = PolitenessScheduler(rate=0, robots_mode="delay")
+        client = robots_client("User-agent: *\nDisallow: /\n")
+
+        with patch('fetch_client._client', client):
+            async with scheduler.slot("https://site.example/page"):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_robots_fetched_once_per_host(self):
+        """Test that robots.txt is cached and concurrent first requests share one fetch"""
+        scheduler = PolitenessScheduler(rate=0, robots_mode="obey")
+        calls = []
+        client = robots_client("", calls=calls, status=404)
+
+        async def crawl(path):
+            async with scheduler.slot(f"https://site.example/{path}"):
+                pass
+
+        with patch('fetch_client._client', client):
+            await asyncio.gather(*(crawl(i) for i in range(5)))
+            await crawl("later")
+
+        assert calls == ["https://site.example/robots.txt"]
+
+    @pytest.mark.asyncio
+    async def test_unreachable_robots_allows_everything(self):
+        """Test that a robots.txt fetch error doesn't block the crawl"""
+        scheduler = PolitenessScheduler(rate=0, robots_mode="obey")
+
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch('fetch_client._client', client):
+            async with scheduler.slot("https://down.example/page"):
+                pass
+
+    def test_idle_hosts_are_evicted(self):
+        """Test that the host table stays bounded"""
+        scheduler = PolitenessScheduler(robots_mode="off", max_hosts=2)
+        for site in ("a", "b", "c"):
+            scheduler._throttle(f"https://{site}.example")
+
+        assert list(scheduler._hosts) == ["https://b.example", "https://c.example"]
@@ -0,0 +1,105 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import threading
+import pytest
+from unittest.mock import patch
+from concurrent.futures.process import BrokenProcessPool
+from postprocess import PostprocessPool
+
+
+class TestPostprocessPool:
+    """Test suite for PostprocessPool"""
+
+    @pytest.mark.asyncio
+    async def test_runs_inline_until_started(self):
+        """Test that tasks run on the calling thread when the pool isn't running"""
+        pool = PostprocessPool(workers=2, mode="thread")
+
+        assert await pool.run(threading.get_ident) == threading.get_ident()
+        assert pool.stats()["mode"] == "inline"
+
+    @pytest.mark.asyncio
+    async def test_inline_mode_never_starts(self):
+        """Test that mode=inline keeps processing on the event loop"""
+        pool = PostprocessPool(workers=2, mode="inline")
+        await pool.start()
+
+        assert not pool.started
+
+    @pytest.mark.asyncio
+    async def test_thread_pool_runs_off_the_loop(self):
+        """Test that a started thread pool runs tasks on a worker thread"""
+        pool = PostprocessPool(workers=2, mode="thread")
+        await pool.start()
+        try:
+            assert await pool.run(threading.get_ident) != threading.get_ident()
+            assert pool.stats() == {"mode": "thread", "workers": 2, "pending": 0, "tasks": 1, "restarts": 0}
+        finally:
+            await pool.close()
+        assert not pool.started
+
+    @pytest.mark.asyncio
+    async def test_process_pool_runs_in_other_process(self):
+        """Test that process workers run tasks in a separate process whose PID the pool reports"""
+        pool = PostprocessPool(workers=1, mode="process", preload=("json",))
+        assert pool.pids() == set()
+        await pool.start()
+        try:
+            worker = await pool.run(os.getpid)
+            assert worker != os.getpid()
+            assert pool.pids() == {worker}
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_restarts_pool(self):
+        """Test that a crashed worker fails its task and the pool recovers for the next one"""
+        pool = PostprocessPool(workers=1, mode="process")
+        await pool.start()
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(os._exit, 1)
+            assert pool.restarts == 1
+            assert await pool.run(pow, 2, 10) == 1024
+        finally:
+            await pool.close()
+
+
+class TestAvailableCpus:
+    """Test suite for available_cpus"""
+
+    @staticmethod
+    def files(contents: dict):
+        def fake_open(path, *args, **kwargs):
+            if path not in contents:
+                raise FileNotFoundError(path)
+            return io.StringIO(contents[path])
+        return fake_open
+
+    def test_cgroup_v2_quota(self):
+        """Test that a container CPU limit caps the count below the host's CPUs"""
+        from postprocess import available_cpus
+
+        with patch('os.sched_getaffinity', return_value=set(range(16))), \
+                patch('builtins.open', self.files({"/sys/fs/cgroup/cpu.max": "200000 100000\n"})):
+            assert available_cpus() == 2
+
+    def test_cgroup_v1_quota(self):
+        """Test that the cgroup v1 quota and period are used when there is no cpu.max"""
+        from postprocess import available_cpus
+
+        files = {"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "150000\n", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n"}
+        with patch('os.sched_getaffinity', return_value=set(range(16))), patch('builtins.open', self.files(files)):
+            assert available_cpus() == 1
+
+    def test_unlimited(self):
+        """Test that without a quota the allowed CPUs are counted"""
+        from postprocess import available_cpus
+
+        with patch('os.sched_getaffinity', return_value={0, 1, 2}), \
+                patch('builtins.open', self.files({"/sys/fs/cgroup/cpu.max": "max 100000\n"})):
+            assert available_cpus() == 3
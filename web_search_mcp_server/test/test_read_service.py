@@ -0,0 +1,66 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from read_service import perform_search_and_read
+
+
+class TestPerformSearchAndRead:
+    """Test suite for perform_search_and_read function"""
+
+    @pytest.mark.asyncio
+    async def test_merges_search_results_with_pages(self):
+        """Test that pages are returned in rank order with their titles"""
+        results = [
+            {"title": "First", "url": "https://a.com"},
+            {"title": "No URL", "url": ""},
+            {"title": "Second", "url": "https://b.com"},
+        ]
+        pages = [
+            {"url": "https://a.com", "content": "Page A"},
+            {"url": "https://b.com", "error": "Crawl failed: timeout"},
+        ]
+
+        with patch('read_service.search', new_callable=AsyncMock, return_value=results), \
+                patch('read_service.crawl_pages', new_callable=AsyncMock, return_value=pages) as mock_crawl:
+            result = json.loads(await perform_search_and_read("query"))
+
+            mock_crawl.assert_awaited_once()
+            assert mock_crawl.call_args[0][0] == ["https://a.com", "https://b.com"]
+            assert result["results"] == [
+                {"title": "First", "url": "https://a.com", "content": "Page A"},
+                {"title": "Second", "url": "https://b.com", "error": "Crawl failed: timeout"},
+            ]
+
+    @pytest.mark.asyncio
+    async def test_pages_are_reported_as_they_finish(self):
+        """Test that on_page receives progress counts for each finished page"""
+        results = [{"title": "A", "url": "https://a.com"}, {"title": "B", "url": "https://b.com"}]
+
+        async def fake_crawl(urls, on_page, max_chars, max_tokens, profile):
+            # Finish out of rank order
+            await on_page({"url": "https://b.com", "content": "B"})
+            await on_page({"url": "https://a.com", "content": "A"})
+            return [{"url": "https://a.com", "content": "A"}, {"url": "https://b.com", "content": "B"}]
+
+        on_page = AsyncMock()
+        with patch('read_service.search', new_callable=AsyncMock, return_value=results), \
+                patch('read_service.crawl_pages', side_effect=fake_crawl):
+            await perform_search_and_read("query", on_page=on_page)
+
+            assert on_page.await_args_list[0].args == (1, 2, {"title": "B", "url": "https://b.com", "content": "B"})
+            assert on_page.await_args_list[1].args == (2, 2, {"title": "A", "url": "https://a.com", "content": "A"})
+
+    @pytest.mark.asyncio
+    async def test_search_failure(self):
+        """Test that search errors are returned as JSON without crawling"""
+        with patch('read_service.search', new_callable=AsyncMock, side_effect=Exception("SearXNG down")), \
+                patch('read_service.crawl_pages', new_callable=AsyncMock) as mock_crawl:
+            result = json.loads(await perform_search_and_read("query"))
+
+            assert "SearXNG down" in result["error"]
+            mock_crawl.assert_not_called()
@@ -0,0 +1,65 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from relevance import PageIndex, tokenize
+
+BLOCKS = [
+    "# Product guide\n\n",
+    "Welcome to the guide. It covers installation and general usage.\n\n",
+    "## Installation\n\n",
+    "Download the package and run the installer on your machine.\n\n",
+    "## Rate limits\n\n",
+    "Each API key may send 100 requests per minute.\n\n",
+    "Exceeding the limit returns HTTP 429 until the window resets.\n\n",
+    "## Changelog\n\n",
+    "Version 2 added dark mode.",
+]
+
+
+class TestTokenize:
+    """Test suite for tokenize"""
+
+    def test_drops_stopwords_and_plurals(self):
+        """Test normalization of query and page terms"""
+        assert tokenize("What are the Rate Limits of APIs?") == ["rate", "limit", "api"]
+        assert tokenize("class access") == ["class", "access"]
+
+
+class TestPageIndex:
+    """Test suite for PageIndex"""
+
+    def test_scores_rank_matching_blocks(self):
+        """Test that blocks mentioning rarer query terms score highest"""
+        index = PageIndex.build(BLOCKS)
+        scores = index.scores("how many requests per minute")
+
+        assert max(range(len(BLOCKS)), key=scores.__getitem__) == 5
+        assert scores[3] == 0
+
+    def test_heading_terms_count_for_section(self):
+        """Test that paragraphs are found through their section heading"""
+        index = PageIndex.build(BLOCKS)
+        scores = index.scores("rate limits")
+
+        assert scores[6] > 0
+        assert scores[3] == 0
+
+    def test_select_includes_heading_and_keeps_page_order(self):
+        """Test that selected blocks come with their heading, in page order"""
+        index = PageIndex.build(BLOCKS)
+
+        assert index.select("HTTP 429", budget=120) == [4, 6]
+        assert index.select("rate limits", budget=1000) == [4, 5, 6]
+
+    def test_select_respects_budget(self):
+        """Test that lower-ranked passages are dropped when the budget is full"""
+        index = PageIndex.build(BLOCKS)
+        chosen = index.select("requests installer", budget=90)
+
+        assert len(chosen) == 2
+
+    def test_no_match(self):
+        """Test that a query without known terms selects nothing"""
+        assert PageIndex.build(BLOCKS).select("kubernetes", budget=1000) == []
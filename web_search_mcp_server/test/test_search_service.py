@@ -67,6 +67,27 @@ class TestPerformWebSearch:
             result_data = json.loads(result)
             assert len(result_data["results"]) == 3
 
+    @pytest.mark.asyncio
+    async def test_default_result_count_is_configurable(self):
+        """Test that SEARCH_DEFAULT_RESULTS applies when max_results isn't given"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "results": [
+                {"title": f"Result {i}", "url": f"https://example{i}.com"}
+                for i in range(10)
+            ]
+        }
+
+        with patch('search_service.httpx.AsyncClient') as mock_client, patch('search_service.DEFAULT_RESULTS', 7):
+            mock_instance = AsyncMock()
+            mock_instance.__aenter__.return_value = mock_instance
+            mock_instance.get.return_value = mock_response
+            mock_client.return_value = mock_instance
+
+            result = await perform_web_search("test query", max_results=None)
+
+            assert len(json.loads(result)["results"]) == 7
+
     @pytest.mark.asyncio
     async def test_search_with_no_results(self):
         """Test search that returns no results"""
@@ -161,6 +182,10 @@ class TestPerformWebSearch:
             result_data = json.loads(result)
             assert "error" in result_data
 
+        import metrics
+        assert metrics.failures.value(stage="search") == 1
+        assert metrics.search_seconds.count() == 1
+
     @pytest.mark.asyncio
     async def test_search_generic_exception(self):
         """Test handling of generic exceptions"""
@@ -198,3 +223,325 @@ class TestPerformWebSearch:
 
             call_args = mock_instance.get.call_args
             assert "http://custom:9090/search" in call_args[0][0]
+
+
+class TestSharedClient:
+    """Test suite for the shared SearXNG client"""
+
+    @pytest.mark.asyncio
+    async def test_start_client_configures_pool_and_timeouts(self):
+        """Test that the shared client gets pool limits and split timeouts"""
+        import search_service
+
+        with patch('search_service.httpx.AsyncClient') as mock_client:
+            await search_service.start_client()
+            await search_service.start_client()
+
+            mock_client.assert_called_once()
+            kwargs = mock_client.call_args[1]
+            assert kwargs["timeout"].connect == search_service.CONNECT_TIMEOUT
+            assert kwargs["timeout"].read == search_service.READ_TIMEOUT
+            assert isinstance(kwargs["limits"], httpx.Limits)
+            assert kwargs["http2"] == search_service.HTTP2
+
+            mock_client.return_value.aclose = AsyncMock()
+            await search_service.close_client()
+            mock_client.return_value.aclose.assert_awaited_once()
+            assert search_service._client is None
+
+    @pytest.mark.asyncio
+    async def test_search_reuses_shared_client(self):
+        """Test that searches go through the shared client instead of creating new ones"""
+        import search_service
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"results": [{"title": "T", "url": "https://t.com"}]}
+        shared = AsyncMock()
+        shared.get.return_value = mock_response
+
+        with patch('search_service._client', shared), patch('search_service.httpx.AsyncClient') as mock_client:
+            await search_service.perform_web_search("first")
+            await search_service.perform_web_search("second")
+
+            mock_client.assert_not_called()
+            assert shared.get.call_count == 2
+
+
+class TestSearchCache:
+    """Test suite for the web_search result cache"""
+
+    @pytest.mark.asyncio
+    async def test_normalized_queries_share_cache_entry(self):
+        """Test that case and whitespace differences hit the same entry"""
+        import search_service
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"results": [{"title": "T", "url": "https://t.com"}]}
+        shared = AsyncMock()
+        shared.get.return_value = mock_response
+
+        with patch('search_service._client', shared):
+            first = await search_service.perform_web_search("Python  asyncio")
+            second = await search_service.perform_web_search("python asyncio")
+
+            assert first == second
+            shared.get.assert_called_once()
+            assert search_service.search_cache_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_queries_coalesce(self):
+        """Test that concurrent identical queries cause one SearXNG request"""
+        import asyncio
+        import search_service
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"results": [{"title": "T", "url": "https://t.com"}]}
+
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return mock_response
+
+        shared = AsyncMock()
+        shared.get.side_effect = slow_get
+
+        with patch('search_service._client', shared):
+            results = await asyncio.gather(*(search_service.perform_web_search("same") for _ in range(4)))
+
+            assert len(set(results)) == 1
+            assert shared.get.call_count == 1
+            assert search_service.search_cache_stats()["coalesced"] == 3
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self):
+        """Test that a failed search is retried on the next call"""
+        import search_service
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"results": []}
+        shared = AsyncMock()
+        shared.get.side_effect = [httpx.TimeoutException("Timeout"), mock_response]
+
+        with patch('search_service._client', shared):
+            first = json.loads(await search_service.perform_web_search("retry"))
+            second = json.loads(await search_service.perform_web_search("retry"))
+
+            assert "error" in first
+            assert second == {"results": []}
+
+
+class TestSearchOptions:
+    """Test suite for result count, pagination, filters and snippets"""
+
+    RESULTS = {
+        "results": [
+            {
+                "title": f"Result {i}",
+                "url": f"https://example{i}.com",
+                "content": f"Snippet {i}",
+                "engines": ["duckduckgo", "brave"],
+                "score": 2.0 - i / 10,
+                "publishedDate": "2024-05-01T00:00:00" if i == 0 else None,
+            }
+            for i in range(12)
+        ]
+    }
+
+    def client(self):
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.RESULTS
+        shared = AsyncMock()
+        shared.get.return_value = mock_response
+        return shared
+
+    @pytest.mark.asyncio
+    async def test_max_results_and_snippets(self):
+        """Test that max_results and include_snippets shape the output"""
+        shared = self.client()
+
+        with patch('search_service._client', shared):
+            plain = json.loads(await perform_web_search("query", max_results=5))
+            detailed = json.loads(await perform_web_search("query", max_results=10, include_snippets=True))
+
+        assert len(plain["results"]) == 5
+        assert set(plain["results"][0]) == {"title", "url"}
+        assert len(detailed["results"]) == 10
+        assert detailed["results"][0] == {
+            "title": "Result 0",
+            "url": "https://example0.com",
+            "snippet": "Snippet 0",
+            "engines": ["duckduckgo", "brave"],
+            "score": 2.0,
+            "published_date": "2024-05-01T00:00:00",
+        }
+        assert "published_date" not in detailed["results"][1]
+        # Result count and snippets are served from the same cached response
+        shared.get.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_filters_sent_to_searxng(self):
+        """Test that page, categories, language and time_range become SearXNG parameters"""
+        shared = self.client()
+
+        with patch('search_service._client', shared):
+            await perform_web_search("query", page=2, categories=["News", "science"], language="de",
+                                     time_range="week")
+
+        params = shared.get.call_args[1]["params"]
+        assert params["pageno"] == 2
+        assert params["categories"] == "news,science"
+        assert params["language"] == "de"
+        assert params["time_range"] == "week"
+
+    @pytest.mark.asyncio
+    async def test_filters_are_part_of_cache_key(self):
+        """Test that different pages and filters are cached separately"""
+        shared = self.client()
+
+        with patch('search_service._client', shared):
+            await perform_web_search("query")
+            await perform_web_search("query", page=2)
+            await perform_web_search("query", time_range="day")
+            await perform_web_search("query", page=2)
+
+        assert shared.get.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_default_request_has_no_extra_params(self):
+        """Test that the default search sends only the query"""
+        shared = self.client()
+
+        with patch('search_service._client', shared):
+            await perform_web_search("query")
+
+        assert shared.get.call_args[1]["params"] == {"format": "json", "q": "query"}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("options", [
+        {"max_results": 0},
+        {"max_results": 21},
+        {"page": 0},
+        {"time_range": "decade"},
+    ])
+    async def test_invalid_options(self, options):
+        """Test that invalid options are reported without calling SearXNG"""
+        shared = self.client()
+
+        with patch('search_service._client', shared):
+            result = json.loads(await perform_web_search("query", **options))
+
+        assert "error" in result
+        shared.get.assert_not_called()
+
+
+class TestWebSearchBatch:
+    """Test suite for multi-query search with reciprocal-rank fusion"""
+
+    RESPONSES = {
+        "python async": [
+            {"title": "Asyncio docs", "url": "https://docs.python.org/3/library/asyncio.html?utm_source=x"},
+            {"title": "Real Python", "url": "https://realpython.com/async-io-python/"},
+            {"title": "Blog", "url": "https://blog.example.com/async"},
+        ],
+        "python asyncio tutorial": [
+            {"title": "Real Python", "url": "https://realpython.com/async-io-python/"},
+            {"title": "Asyncio docs", "url": "https://docs.python.org/3/library/asyncio.html"},
+            {"title": "Video", "url": "https://video.example.com/asyncio"},
+        ],
+        "asyncio guide": [
+            {"title": "Real Python", "url": "https://REALPYTHON.com/async-io-python/#intro"},
+            {"title": "Guide", "url": "https://guide.example.com/asyncio"},
+        ],
+    }
+
+    def client(self, failing=()):
+        async def get(url, params):
+            if params["q"] in failing:
+                raise httpx.ConnectError("SearXNG unavailable")
+            response = MagicMock()
+            response.json.return_value = {"results": self.RESPONSES[params["q"]]}
+            return response
+
+        shared = AsyncMock()
+        shared.get.side_effect = get
+        return shared
+
+    @pytest.mark.asyncio
+    async def test_results_fused_and_deduplicated(self):
+        """Test that results found by several queries are merged and ranked first"""
+        from search_service import perform_web_search_batch
+
+        with patch('search_service._client', self.client()):
+            result = json.loads(await perform_web_search_batch(list(self.RESPONSES), max_results=10))
+
+        urls = [item["url"] for item in result["results"]]
+        assert urls[0] == "https://realpython.com/async-io-python/"
+        assert urls[1] == "https://docs.python.org/3/library/asyncio.html?utm_source=x"
+        assert len(urls) == 5
+        assert result["results"][0]["queries"] == list(self.RESPONSES)
+        assert "errors" not in result
+
+    @pytest.mark.asyncio
+    async def test_queries_run_concurrently_and_once(self):
+        """Test that duplicate queries are searched once and all run over the shared client"""
+        from search_service import perform_web_search_batch
+        shared = self.client()
+
+        with patch('search_service._client', shared):
+            await perform_web_search_batch(["python async", "python async", "asyncio guide"])
+
+        assert shared.get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_normalized_duplicates_fused_once(self):
+        """Test that phrasings differing only in case or spacing count as one query"""
+        from search_service import perform_web_search_batch
+        shared = self.client()
+
+        with patch('search_service._client', shared):
+            result = json.loads(await perform_web_search_batch(["python async", "asyncio guide", "Python  ASYNC"]))
+
+        assert shared.get.call_count == 2
+        assert result["results"][0]["queries"] == ["python async", "asyncio guide"]
+        assert all("Python  ASYNC" not in item["queries"] for item in result["results"])
+
+    @pytest.mark.asyncio
+    async def test_partial_failure_reported_inline(self):
+        """Test that a failed query doesn't fail the batch"""
+        from search_service import perform_web_search_batch
+
+        with patch('search_service._client', self.client(failing={"asyncio guide"})):
+            result = json.loads(await perform_web_search_batch(list(self.RESPONSES)))
+
+        assert len(result["results"]) == 4
+        assert result["errors"][0]["query"] == "asyncio guide"
+
+    @pytest.mark.asyncio
+    async def test_all_failed(self):
+        """Test that a batch where every query fails returns an error"""
+        from search_service import perform_web_search_batch
+
+        with patch('search_service._client', self.client(failing=set(self.RESPONSES))):
+            result = json.loads(await perform_web_search_batch(list(self.RESPONSES)))
+
+        assert "error" in result
+
+    @pytest.mark.asyncio
+    async def test_too_many_queries(self):
+        """Test the per-call query limit"""
+        from search_service import perform_web_search_batch
+
+        result = json.loads(await perform_web_search_batch([f"query {i}" for i in range(6)]))
+
+        assert "At most 5" in result["error"]
+
+    def test_fuse_results_prefers_agreement(self):
+        """Test that a result ranked second by two lists beats one ranked first by one list"""
+        from search_service import fuse_results
+
+        fused = fuse_results([
+            [{"title": "A", "url": "https://a.com"}, {"title": "B", "url": "https://b.com"}],
+            [{"title": "C", "url": "https://c.com"}, {"title": "B", "url": "https://b.com/?utm_medium=x"}],
+        ])
+
+        assert [item["title"] for item in fused] == ["B", "A", "C"]
+        assert fused[0]["queries"] == [0, 1]
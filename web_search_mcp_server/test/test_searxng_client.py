@@ -0,0 +1,291 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+import metrics
+from searxng_client import SearchUnavailable, SearxngBackends, is_transient
+
+
+def _response(data: dict | None = None, status: int = 200) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status
+    response.json.return_value = data if data is not None else {"results": []}
+    if status >= 400:
+        request = httpx.Request("GET", "http://searxng/search")
+        response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "error", request=request, response=httpx.Response(status, request=request)
+        )
+    return response
+
+
+def _backends(urls=("http://a", "http://b"), **kwargs) -> SearxngBackends:
+    options = {"retries": 0, "backoff": 0, "breaker_threshold": 2, "breaker_cooldown": 60, "hedge": False}
+    options.update(kwargs)
+    return SearxngBackends(list(urls), **options)
+
+
+def _called_urls(client: MagicMock) -> list[str]:
+    return [call.args[0] for call in client.get.call_args_list]
+
+
+class TestIsTransient:
+    """Test suite for is_transient"""
+
+    def test_transient_errors(self):
+        """Test that timeouts, connection errors, 429 and 5xx are retried"""
+        assert is_transient(httpx.ReadTimeout("timeout"))
+        assert is_transient(httpx.ConnectError("refused"))
+        assert is_transient(_response(status=503).raise_for_status.side_effect)
+        assert is_transient(_response(status=429).raise_for_status.side_effect)
+
+    def test_permanent_errors(self):
+        """Test that client errors and unexpected exceptions are not retried"""
+        assert not is_transient(_response(status=403).raise_for_status.side_effect)
+        assert not is_transient(ValueError("bad json"))
+
+
+class TestSearxngBackends:
+    """Test suite for SearxngBackends"""
+
+    @pytest.mark.asyncio
+    async def test_round_robin(self):
+        """Test that requests alternate between healthy backends"""
+        backends = _backends()
+        client = MagicMock()
+        client.get = AsyncMock(return_value=_response({"results": [1]}))
+
+        for _ in range(4):
+            assert await backends.search(client, {"q": "x"}) == {"results": [1]}
+
+        assert _called_urls(client) == ["http://a/search", "http://b/search"] * 2
+
+    @pytest.mark.asyncio
+    async def test_retry_fails_over_to_other_backend(self):
+        """Test that a transient error is retried on a backend that wasn't tried yet"""
+        backends = _backends(retries=2)
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[httpx.ConnectError("refused"), _response({"results": [1]})])
+
+        assert await backends.search(client, {"q": "x"}) == {"results": [1]}
+        assert _called_urls(client) == ["http://a/search", "http://b/search"]
+        assert metrics.searxng_events.value(event="retry") == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_are_bounded(self):
+        """Test that the last error is raised once retries are exhausted"""
+        backends = _backends(urls=("http://a",), retries=2, breaker_threshold=10)
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
+
+        with pytest.raises(httpx.ConnectError):
+            await backends.search(client, {"q": "x"})
+        assert client.get.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_read_timeout_not_retried_on_same_backend(self):
+        """Test that a hung instance isn't waited on again when there is no other one"""
+        backends = _backends(urls=("http://a",), retries=2, breaker_threshold=10)
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=httpx.ReadTimeout("timeout"))
+
+        with pytest.raises(httpx.ReadTimeout):
+            await backends.search(client, {"q": "x"})
+        assert client.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_read_timeout_retried_on_other_backend(self):
+        """Test that a read timeout still fails over to an instance not tried yet"""
+        backends = _backends(retries=2, breaker_threshold=10)
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[httpx.ReadTimeout("timeout"), _response({"results": [1]})])
+
+        assert await backends.search(client, {"q": "x"}) == {"results": [1]}
+        assert _called_urls(client) == ["http://a/search", "http://b/search"]
+
+    @pytest.mark.asyncio
+    async def test_search_deadline(self):
+        """Test that retries and slow answers together can't exceed the search deadline"""
+        backends = _backends(retries=5, deadline=0.2)
+        client = MagicMock()
+
+        async def get(url, params):
+            await asyncio.sleep(0.15)
+            raise httpx.ConnectError("refused")
+
+        client.get = AsyncMock(side_effect=get)
+
+        with pytest.raises(SearchUnavailable, match="within 0.2s"):
+            await asyncio.wait_for(backends.search(client, {"q": "x"}), 1)
+        assert client.get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        """Test that a 4xx fails straight away and doesn't count against the backend"""
+        backends = _backends(retries=2)
+        client = MagicMock()
+        client.get = AsyncMock(return_value=_response(status=400))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await backends.search(client, {"q": "x"})
+        assert client.get.call_count == 1
+        assert backends.stats()[0]["consecutive_failures"] == 0
+
+    @pytest.mark.asyncio
+    async def test_breaker_opens_and_skips_backend(self):
+        """Test that a failing backend is skipped once its circuit opens"""
+        backends = _backends()
+        client = MagicMock()
+
+        async def get(url, params):
+            if url.startswith("http://a"):
+                raise httpx.ConnectError("refused")
+            return _response({"results": [1]})
+
+        client.get = AsyncMock(side_effect=get)
+        for _ in range(4):
+            try:
+                await backends.search(client, {"q": "x"})
+            except httpx.ConnectError:
+                pass
+        client.get.reset_mock()
+
+        for _ in range(3):
+            await backends.search(client, {"q": "x"})
+
+        assert _called_urls(client) == ["http://b/search"] * 3
+        assert backends.stats()[0]["state"] == "open"
+        assert metrics.searxng_events.value(event="breaker_open") == 1
+
+    @pytest.mark.asyncio
+    async def test_half_open_trial_closes_circuit(self):
+        """Test that a backend gets a trial request after the cooldown and recovers on success"""
+        backends = _backends(urls=("http://a",), breaker_threshold=1, breaker_cooldown=0)
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[httpx.ConnectError("refused"), _response({"results": [1]})])
+
+        with pytest.raises(httpx.ConnectError):
+            await backends.search(client, {"q": "x"})
+        assert backends.stats()[0]["state"] == "half-open"
+
+        assert await backends.search(client, {"q": "x"}) == {"results": [1]}
+        assert backends.stats()[0]["state"] == "closed"
+
+    @pytest.mark.asyncio
+    async def test_all_circuits_open(self):
+        """Test that a clear error is raised when no backend is available"""
+        backends = _backends(urls=("http://a",), breaker_threshold=1)
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
+
+        with pytest.raises(httpx.ConnectError):
+            await backends.search(client, {"q": "x"})
+        with pytest.raises(SearchUnavailable):
+            await backends.search(client, {"q": "x"})
+        assert client.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_hedge_takes_faster_backend(self):
+        """Test that a slow request is hedged to another backend and the first answer wins"""
+        backends = _backends(hedge=True, hedge_delay=0.01, hedge_min_delay=0.01)
+        client = MagicMock()
+        slow_cancelled = asyncio.Event()
+
+        async def get(url, params):
+            if url.startswith("http://a"):
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    slow_cancelled.set()
+                    raise
+            return _response({"results": [url]})
+
+        client.get = AsyncMock(side_effect=get)
+
+        assert await backends.search(client, {"q": "x"}) == {"results": ["http://b/search"]}
+        await asyncio.wait_for(slow_cancelled.wait(), 1)
+        assert metrics.searxng_events.value(event="hedge") == 1
+        assert metrics.searxng_events.value(event="hedge_won") == 1
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_primary_is_fast(self):
+        """Test that fast requests are not duplicated"""
+        backends = _backends(hedge=True, hedge_delay=1, hedge_min_delay=1)
+        client = MagicMock()
+        client.get = AsyncMock(return_value=_response({"results": [1]}))
+
+        await backends.search(client, {"q": "x"})
+
+        assert client.get.call_count == 1
+        assert metrics.searxng_events.value(event="hedge") == 0
+
+    @pytest.mark.asyncio
+    async def test_hedged_away_request_counts_towards_p95(self):
+        """Test that a cancelled slow request still leaves a latency sample"""
+        backends = _backends(hedge=True, hedge_delay=0.05, hedge_min_delay=0.05)
+        client = MagicMock()
+
+        async def get(url, params):
+            if url.startswith("http://a"):
+                await asyncio.sleep(5)
+            return _response({"results": [url]})
+
+        client.get = AsyncMock(side_effect=get)
+
+        await backends.search(client, {"q": "x"})
+        await asyncio.sleep(0.01)
+
+        slow, fast = backends.backends
+        assert len(slow.latencies) == 1
+        assert slow.latencies[0] >= 0.05
+        assert slow.consecutive_failures == 0
+        assert len(fast.latencies) == 1
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_follows_p95(self):
+        """Test that the hedge delay tracks the backend's recent p95 latency"""
+        backends = _backends(hedge_delay=1, hedge_min_delay=0.01)
+        backend = backends.backends[0]
+        assert backends._hedge_after(backend) == 1
+
+        backend.latencies.extend([0.1] * 19 + [0.2])
+        assert backends._hedge_after(backend) == pytest.approx(0.1)
+
+
+class TestProbe:
+    """Test suite for the SearXNG readiness probe"""
+
+    @pytest.mark.asyncio
+    async def test_probe_reports_each_backend(self):
+        """Test that answering instances are reachable and failing ones are not"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.url.path == "/healthz"
+            if request.url.host == "b":
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, text="OK")
+
+        backends = _backends()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            result = await backends.probe(client, timeout=1)
+
+        assert result == [
+            {"url": "http://a", "reachable": True, "state": "closed"},
+            {"url": "http://b", "reachable": False, "state": "closed"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_probe_accepts_missing_healthz(self):
+        """Test that instances without /healthz count as reachable but server errors don't"""
+        statuses = {"a": 404, "b": 502}
+        transport = httpx.MockTransport(lambda request: httpx.Response(statuses[request.url.host]))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            backends = _backends()
+            result = await backends.probe(client, timeout=1)
+
+        assert [backend["reachable"] for backend in result] == [True, False]
+        assert all(backend["failures"] == 0 for backend in backends.stats())
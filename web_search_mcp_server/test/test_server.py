@@ -5,7 +5,16 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from server import web_search, crawl_url
+from server import web_search, crawl_url, crawl_urls, read_page_chunk, search_and_read
+
+SEARCH_DEFAULTS = {
+    "max_results": None,
+    "page": 1,
+    "categories": None,
+    "language": None,
+    "time_range": None,
+    "include_snippets": False,
+}
 
 
 class TestWebSearch:
@@ -22,7 +31,7 @@ class TestWebSearch:
             result = await web_search("test query")
 
             assert result == expected_result
-            mock_search.assert_called_once_with("test query")
+            mock_search.assert_called_once_with("test query", **SEARCH_DEFAULTS)
 
     @pytest.mark.asyncio
     async def test_web_search_with_empty_query(self):
@@ -32,7 +41,7 @@ class TestWebSearch:
 
             result = await web_search("")
 
-            mock_search.assert_called_once_with("")
+            mock_search.assert_called_once_with("", **SEARCH_DEFAULTS)
 
     @pytest.mark.asyncio
     async def test_web_search_with_special_characters(self):
@@ -44,7 +53,21 @@ class TestWebSearch:
 
             result = await web_search(query)
 
-            mock_search.assert_called_once_with(query)
+            mock_search.assert_called_once_with(query, **SEARCH_DEFAULTS)
+
+    @pytest.mark.asyncio
+    async def test_web_search_passes_options(self):
+        """Test that search options are forwarded"""
+        with patch('server.perform_web_search', new_callable=AsyncMock) as mock_search:
+            mock_search.return_value = '{"results": []}'
+
+            await web_search("query", max_results=10, page=2, categories=["news"], language="en",
+                             time_range="week", include_snippets=True)
+
+            mock_search.assert_called_once_with(
+                "query", max_results=10, page=2, categories=["news"], language="en",
+                time_range="week", include_snippets=True,
+            )
 
 
 class TestCrawlUrl:
@@ -61,7 +84,7 @@ class TestCrawlUrl:
             result = await crawl_url("https://example.com")
 
             assert result == expected_result
-            mock_crawl.assert_called_once_with("https://example.com")
+            mock_crawl.assert_called_once_with("https://example.com", max_chars=None, max_tokens=None, profile=None, query=None)
 
     @pytest.mark.asyncio
     async def test_crawl_url_with_http(self):
@@ -71,7 +94,7 @@ class TestCrawlUrl:
 
             result = await crawl_url("http://example.com")
 
-            mock_crawl.assert_called_once_with("http://example.com")
+            mock_crawl.assert_called_once_with("http://example.com", max_chars=None, max_tokens=None, profile=None, query=None)
 
     @pytest.mark.asyncio
     async def test_crawl_url_with_https(self):
@@ -81,7 +104,7 @@ class TestCrawlUrl:
 
             result = await crawl_url("https://example.com")
 
-            mock_crawl.assert_called_once_with("https://example.com")
+            mock_crawl.assert_called_once_with("https://example.com", max_chars=None, max_tokens=None, profile=None, query=None)
 
     @pytest.mark.asyncio
     async def test_crawl_url_with_complex_url(self):
@@ -93,4 +116,306 @@ class TestCrawlUrl:
 
             result = await crawl_url(url)
 
-            mock_crawl.assert_called_once_with(url)
+            mock_crawl.assert_called_once_with(url, max_chars=None, max_tokens=None, profile=None, query=None)
+
+
+    @pytest.mark.asyncio
+    async def test_crawl_url_passes_budget(self):
+        """Test crawl_url forwards the output budget"""
+        with patch('server.perform_crawl', new_callable=AsyncMock) as mock_crawl:
+            mock_crawl.return_value = "content"
+
+            await crawl_url("https://example.com", max_tokens=500)
+
+            mock_crawl.assert_called_once_with("https://example.com", max_chars=None, max_tokens=500, profile=None, query=None)
+
+
+    @pytest.mark.asyncio
+    async def test_crawl_url_passes_profile(self):
+        """Test crawl_url forwards the crawl profile"""
+        with patch('server.perform_crawl', new_callable=AsyncMock) as mock_crawl:
+            mock_crawl.return_value = "content"
+
+            await crawl_url("https://example.com", profile="full")
+
+            mock_crawl.assert_called_once_with("https://example.com", max_chars=None, max_tokens=None, profile="full", query=None)
+
+    @pytest.mark.asyncio
+    async def test_crawl_url_passes_query(self):
+        """Test crawl_url forwards the relevance query"""
+        with patch('server.perform_crawl', new_callable=AsyncMock) as mock_crawl:
+            mock_crawl.return_value = "content"
+
+            await crawl_url("https://example.com", query="rate limits")
+
+            mock_crawl.assert_called_once_with(
+                "https://example.com", max_chars=None, max_tokens=None, profile=None, query="rate limits"
+            )
+
+    @pytest.mark.asyncio
+    async def test_crawl_url_chunked(self):
+        """Test that chunked=True returns the chunked JSON result instead of plain text"""
+        with patch('server.perform_crawl', new_callable=AsyncMock) as mock_crawl, \
+                patch('server.perform_crawl_chunked', new_callable=AsyncMock) as mock_chunked:
+            mock_chunked.return_value = '{"handle": "abc"}'
+
+            result = await crawl_url("https://example.com", max_chars=2000, chunked=True)
+
+            assert result == '{"handle": "abc"}'
+            mock_chunked.assert_called_once_with("https://example.com", max_chars=2000, max_tokens=None, profile=None)
+            mock_crawl.assert_not_called()
+
+class TestReadPageChunk:
+    """Test suite for read_page_chunk tool"""
+
+    @pytest.mark.asyncio
+    async def test_read_page_chunk_calls_service(self):
+        """Test that read_page_chunk forwards the handle, position and budget"""
+        with patch('server.perform_read_page_chunk', new_callable=AsyncMock) as mock_read:
+            mock_read.return_value = '{"content": "more"}'
+
+            result = await read_page_chunk("abc", section="Install", max_tokens=100)
+
+            assert result == '{"content": "more"}'
+            mock_read.assert_called_once_with("abc", offset=None, section="Install", max_chars=None, max_tokens=100)
+
+class TestCrawlUrls:
+    """Test suite for crawl_urls tool"""
+
+    @pytest.mark.asyncio
+    async def test_crawl_urls_calls_perform_crawl_many(self):
+        """Test that crawl_urls passes the URL list through"""
+        urls = ["https://a.com", "https://b.com"]
+
+        with patch('server.perform_crawl_many', new_callable=AsyncMock) as mock_crawl:
+            mock_crawl.return_value = '{"results": []}'
+
+            result = await crawl_urls(urls)
+
+            assert result == '{"results": []}'
+            mock_crawl.assert_called_once_with(urls, max_chars=None, max_tokens=None, profile=None)
+
+
+class TestSearchAndRead:
+    """Test suite for search_and_read tool"""
+
+    @pytest.mark.asyncio
+    async def test_pages_streamed_as_progress(self):
+        """Test that each finished page is sent as a progress notification"""
+        import json
+
+        async def fake_read(query, on_page, max_chars, max_tokens, profile):
+            await on_page(1, 2, {"title": "A", "url": "https://a.com", "content": "A"})
+            return '{"results": []}'
+
+        ctx = MagicMock()
+        ctx.report_progress = AsyncMock()
+
+        with patch('server.perform_search_and_read', side_effect=fake_read):
+            result = await search_and_read("query", ctx)
+
+            assert result == '{"results": []}'
+            ctx.report_progress.assert_awaited_once()
+            args, kwargs = ctx.report_progress.call_args
+            assert args == (1, 2)
+            assert json.loads(kwargs["message"])["url"] == "https://a.com"
+
+
+class TestStats:
+    """Test suite for the /stats route"""
+
+    @pytest.mark.asyncio
+    async def test_stats_reports_cache_and_pool(self):
+        """Test that /stats returns search cache and browser pool counters"""
+        import json
+        from server import stats
+
+        response = await stats(MagicMock())
+        body = json.loads(response.body)
+
+        assert set(body["search_cache"]) == {"size", "hits", "misses", "coalesced", "stale_hits"}
+        assert "idle" in body["browser_pool"]
+        assert body["searxng"][0]["state"] == "closed"
+        assert body["politeness"]["hosts"] == 0
+
+
+class TestMetrics:
+    """Test suite for tool instrumentation and the /metrics route"""
+
+    @pytest.mark.asyncio
+    async def test_tool_latency_and_output_size_recorded(self):
+        """Test that tool calls show up in the metrics"""
+        import metrics
+        from server import prometheus_metrics
+
+        with patch('server.perform_crawl', new_callable=AsyncMock) as mock_crawl:
+            mock_crawl.return_value = "x" * 700
+            await crawl_url("https://example.com")
+
+        assert metrics.tool_seconds.count(tool="crawl_url") == 1
+        assert metrics.output_chars.count(tool="crawl_url") == 1
+
+        response = await prometheus_metrics(MagicMock())
+        body = response.body.decode()
+
+        assert response.media_type.startswith("text/plain")
+        assert 'web_search_mcp_tool_seconds_count{tool="crawl_url"} 1' in body
+        assert 'web_search_mcp_output_chars_bucket{tool="crawl_url",le="500"} 0' in body
+        assert 'web_search_mcp_output_chars_bucket{tool="crawl_url",le="1000"} 1' in body
+
+
+class TestAdmission:
+    """Test suite for admission control in the tools"""
+
+    @pytest.mark.asyncio
+    async def test_saturated_tool_returns_error_in_tool_format(self):
+        """Test that rejected calls return the tool's usual error format"""
+        import json
+        from admission import AdmissionGate
+
+        full = AdmissionGate("crawl_url", limit=1, max_queue=0)
+        full.active = 1
+        full_search = AdmissionGate("web_search", limit=1, max_queue=0)
+        full_search.active = 1
+
+        with patch.dict('server.gates', {"crawl_url": full, "web_search": full_search}), \
+                patch('server.perform_crawl', new_callable=AsyncMock) as mock_crawl, \
+                patch('server.perform_web_search', new_callable=AsyncMock) as mock_search:
+            crawl_result = await crawl_url("https://example.com")
+            search_result = await web_search("query")
+
+            assert crawl_result.startswith("Crawl failed: crawl_url is busy")
+            assert "busy" in json.loads(search_result)["error"]
+            mock_crawl.assert_not_called()
+            mock_search.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stats_include_admission(self):
+        """Test that /stats reports queue depth per tool"""
+        import json
+        from server import stats
+
+        body = json.loads((await stats(MagicMock())).body)
+
+        assert body["admission"]["crawl_url"]["queued"] == 0
+
+    def test_stateless_clients_keyed_by_id_or_address(self):
+        """Test that streamable HTTP clients keep one fairness key across requests"""
+        from server import _client_key
+
+        def context(headers, host="10.0.0.1"):
+            ctx = MagicMock()
+            ctx.client_id = None
+            ctx.request_context.request.headers = headers
+            ctx.request_context.request.client.host = host
+            return ctx
+
+        with patch('server.MCP_TRANSPORT', "streamable-http"):
+            assert _client_key(context({})) == _client_key(context({})) == "10.0.0.1"
+            assert _client_key(context({"x-client-id": "agent-a"})) == "agent-a"
+
+        sse = context({})
+        with patch('server.MCP_TRANSPORT', "sse"):
+            assert _client_key(sse) == id(sse.session)
+
+
+class TestHealth:
+    """Test suite for the /healthz and /readyz routes"""
+
+    @pytest.mark.asyncio
+    async def test_healthz_makes_no_requests(self):
+        """Test that liveness reports circuit states without probing SearXNG"""
+        import json
+        from server import healthz
+
+        with patch('server.check_searxng', new_callable=AsyncMock) as mock_check:
+            response = await healthz(MagicMock())
+
+        body = json.loads(response.body)
+        assert response.status_code == 200
+        assert body["warm_up"] == "lazy"
+        assert body["searxng"][0]["state"] == "closed"
+        assert "started" in body["browser_pool"]
+        mock_check.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_readyz_needs_a_reachable_searxng(self):
+        """Test that readiness follows the SearXNG probe"""
+        import json
+        from server import readyz
+
+        with patch('server.check_searxng', new_callable=AsyncMock) as mock_check:
+            mock_check.return_value = [{"url": "http://a", "reachable": False, "state": "open"}]
+            down = await readyz(MagicMock())
+            mock_check.return_value = [{"url": "http://a", "reachable": True, "state": "closed"}]
+            up = await readyz(MagicMock())
+
+        assert down.status_code == 503
+        assert json.loads(down.body)["ready"] is False
+        assert up.status_code == 200
+        assert json.loads(up.body)["ready"] is True
+
+    @pytest.mark.asyncio
+    async def test_readyz_waits_for_warm_up(self):
+        """Test that a running startup warm-up keeps the server unready"""
+        import asyncio
+        from server import readyz
+
+        warm_up = asyncio.get_running_loop().create_future()
+        with patch('server._warm_up', warm_up), patch('server.check_searxng', new_callable=AsyncMock) as mock_check:
+            mock_check.return_value = [{"url": "http://a", "reachable": True, "state": "closed"}]
+            assert (await readyz(MagicMock())).status_code == 503
+            warm_up.set_result(None)
+            assert (await readyz(MagicMock())).status_code == 200
+
+    def test_import_leaves_crawl_stack_unloaded(self):
+        """Test that starting the server doesn't import crawl4ai until the first crawl"""
+        import subprocess
+
+        code = "import sys, server; print('crawl4ai' in sys.modules, 'crawl_service' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True,
+        ).stdout
+
+        assert output.split() == ["False", "False"]
+
+
+class TestTransport:
+    """Test suite for the ASGI app factory"""
+
+    def test_sse_app_serves_custom_routes(self):
+        """Test that the SSE app keeps the /stats, /metrics and health routes"""
+        from server import create_app
+
+        with patch('server.MCP_TRANSPORT', 'sse'):
+            app = create_app()
+
+        paths = {route.path for route in app.routes}
+        assert {"/sse", "/stats", "/metrics", "/healthz", "/readyz"} <= paths
+
+    def test_streamable_http_is_stateless(self):
+        """Test that streamable HTTP requests don't depend on a per-worker session"""
+        from server import mcp
+
+        assert mcp.settings.stateless_http is True
+
+
+class TestWebSearchBatch:
+    """Test suite for web_search_batch tool"""
+
+    @pytest.mark.asyncio
+    async def test_calls_perform_web_search_batch(self):
+        """Test that web_search_batch forwards its arguments"""
+        from server import web_search_batch
+
+        with patch('server.perform_web_search_batch', new_callable=AsyncMock) as mock_batch:
+            mock_batch.return_value = '{"results": []}'
+
+            result = await web_search_batch(["a", "b"], time_range="month")
+
+            assert result == '{"results": []}'
+            mock_batch.assert_called_once_with(
+                ["a", "b"], max_results=None, categories=None, language=None, time_range="month",
+                include_snippets=False,
+            )
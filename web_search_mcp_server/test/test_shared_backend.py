@@ -0,0 +1,55 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import patch
+from shared_backend import MemoryBackend, RedisBackend, SharedBackend, create_backend
+
+
+class TestCreateBackend:
+    """Test suite for create_backend"""
+
+    def test_empty_url_keeps_caches_in_process(self):
+        """Test that no backend is used by default"""
+        assert create_backend("") is None
+
+    def test_memory_backend(self):
+        """Test the in-process backend URL"""
+        assert isinstance(create_backend("memory://"), MemoryBackend)
+
+    def test_unsupported_url(self):
+        """Test that an unknown scheme is a configuration error"""
+        with pytest.raises(ValueError):
+            create_backend("memcached://localhost")
+
+    def test_redis_without_package(self):
+        """Test that a Redis URL without the redis package fails with a clear error"""
+        with patch.dict(sys.modules, {"redis": None, "redis.asyncio": None}):
+            with pytest.raises(RuntimeError, match="redis"):
+                RedisBackend("redis://localhost:6379/0")
+
+    def test_incomplete_backend_cannot_be_created(self):
+        """Test that a backend missing part of the interface fails at construction"""
+        class GetOnly(SharedBackend):
+            async def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnly()
+
+
+class TestMemoryBackend:
+    """Test suite for MemoryBackend"""
+
+    @pytest.mark.asyncio
+    async def test_get_set_and_expiry(self):
+        """Test that values expire after their TTL"""
+        backend = MemoryBackend()
+        with patch('shared_backend.time.monotonic', return_value=1000.0):
+            await backend.set("key", "value", ttl=10)
+            assert await backend.get("key") == "value"
+        with patch('shared_backend.time.monotonic', return_value=1011.0):
+            assert await backend.get("key") is None
+        assert await backend.get("missing") is None
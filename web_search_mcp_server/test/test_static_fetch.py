@@ -0,0 +1,165 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+from unittest.mock import patch
+from static_fetch import DocumentTooLarge, PageNotFound, fetch_html, needs_browser, sniff_kind, visible_text
+
+ARTICLE = "<p>" + "Static documentation pages render fine without JavaScript. " * 10 + "</p>"
+
+
+def page(body, head=""):
+    return f"<html><head>{head}</head><body>{body}</body></html>"
+
+
+class TestNeedsBrowser:
+    """Test suite for needs_browser heuristics"""
+
+    def test_static_article_does_not_need_browser(self):
+        """Test that a page with real text is served statically"""
+        assert needs_browser(page(ARTICLE, head="<script>var analytics = 1;</script>")) is None
+
+    def test_empty_body(self):
+        """Test that a page without visible text needs the browser"""
+        assert needs_browser(page("<div></div><script>" + "x" * 5000 + "</script>")) == "empty body"
+
+    def test_spa_root(self):
+        """Test that an empty client-side app mount point needs the browser"""
+        assert needs_browser(page('<div id="root"></div>' + ARTICLE)) == "empty SPA root"
+        assert needs_browser(page("<app-root></app-root>" + ARTICLE)) == "empty SPA root"
+
+    def test_noscript_shell(self):
+        """Test that a short page telling users to enable JavaScript needs the browser"""
+        body = "<noscript>You need to enable JavaScript to run this app.</noscript><p>" + "Loading content. " * 20 + "</p>"
+        assert needs_browser(page(body)) == "noscript shell"
+
+    def test_noscript_on_long_page_is_ignored(self):
+        """Test that a noscript notice on a content-rich page doesn't force the browser"""
+        body = "<noscript>Please enable JavaScript to view the comments.</noscript>" + ARTICLE * 3
+        assert needs_browser(page(body)) is None
+
+    def test_bot_challenge(self):
+        """Test that anti-bot interstitials are handed to the browser"""
+        assert needs_browser(page(ARTICLE, head="<title>Just a moment...</title>")) == "bot challenge"
+
+    def test_visible_text_strips_scripts_and_tags(self):
+        """Test visible text extraction"""
+        assert visible_text(page("<style>p {}</style><p>Hello <b>world</b></p><script>x()</script>")) == "Hello world"
+
+
+class TestSniffKind:
+    """Test suite for sniff_kind function"""
+
+    @pytest.mark.parametrize("content_type,url,head,kind", [
+        ("text/html; charset=utf-8", "https://a.com/", b"<!doctype html>", "html"),
+        ("application/xhtml+xml", "https://a.com/", b"<html>", "html"),
+        ("application/pdf", "https://arxiv.org/pdf/1", b"%PDF-1.7", "pdf"),
+        ("application/octet-stream", "https://a.com/file", b"%PDF-1.5", "pdf"),
+        ("", "https://a.com/doc.PDF", b"", "pdf"),
+        ("application/rss+xml", "https://a.com/feed", b"<?xml", "feed"),
+        ("text/xml", "https://a.com/feed", b'<?xml version="1.0"?><rss version="2.0">', "feed"),
+        ("application/xml", "https://a.com/atom", b'<feed xmlns="http://www.w3.org/2005/Atom">', "feed"),
+        ("application/json", "https://api.a.com/", b"{", "json"),
+        ("application/vnd.github+json", "https://api.github.com/", b"[", "json"),
+        ("text/plain", "https://raw.githubusercontent.com/a/b/main/x.py", b"import os", "text"),
+        ("text/xml", "https://a.com/sitemap.xml", b"<urlset>", "text"),
+        ("image/png", "https://a.com/x.png", b"\x89PNG", None),
+        ("application/zip", "https://a.com/x.zip", b"PK", None),
+    ])
+    def test_kinds(self, content_type, url, head, kind):
+        """Test classification by content type, URL and leading bytes"""
+        assert sniff_kind(content_type, url, head) == kind
+
+
+class TestFetchHtml:
+    """Test suite for fetch_html function"""
+
+    @staticmethod
+    def client(handler):
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    @pytest.mark.asyncio
+    async def test_returns_html_and_headers(self):
+        """Test a successful HTML fetch"""
+        client = self.client(lambda request: httpx.Response(
+            200, html=page(ARTICLE), headers={"ETag": '"v1"'}
+        ))
+
+        with patch('fetch_client._client', client):
+            result = await fetch_html("https://example.com/docs")
+
+        assert "Static documentation" in result.html
+        assert result.headers["etag"] == '"v1"'
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unsupported_types_and_errors_return_none(self):
+        """Test that unsupported responses and HTTP errors are left to the browser"""
+        responses = {
+            "/image": httpx.Response(200, content=b"\x89PNG", headers={"Content-Type": "image/png"}),
+            "/error": httpx.Response(503, html="unavailable"),
+        }
+        client = self.client(lambda request: responses[request.url.path])
+
+        with patch('fetch_client._client', client):
+            assert await fetch_html("https://example.com/image") is None
+            assert await fetch_html("https://example.com/error") is None
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_documents_are_returned_for_extraction(self):
+        """Test that PDF, JSON, text and feed responses come back as documents"""
+        responses = {
+            "/data": httpx.Response(200, json={"a": 1}),
+            "/paper": httpx.Response(200, content=b"%PDF-1.4 ...", headers={"Content-Type": "application/octet-stream"}),
+            "/README.md": httpx.Response(200, text="# Readme", headers={"Content-Type": "text/plain; charset=latin-1"}),
+        }
+        client = self.client(lambda request: responses[request.url.path])
+
+        with patch('fetch_client._client', client):
+            data = await fetch_html("https://example.com/data")
+            paper = await fetch_html("https://example.com/paper")
+            readme = await fetch_html("https://example.com/README.md")
+
+        assert (data.kind, data.body) == ("json", b'{"a":1}')
+        assert paper.kind == "pdf"
+        assert (readme.kind, readme.encoding) == ("text", "latin-1")
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_large_pdf_is_refused(self):
+        """Test that a PDF over FETCH_MAX_PDF_BYTES raises instead of being cut off"""
+        client = self.client(lambda request: httpx.Response(
+            200, content=b"%PDF-1.4" + b"x" * 5000, headers={"Content-Type": "application/pdf"}
+        ))
+
+        with patch('fetch_client._client', client), patch('static_fetch.FETCH_MAX_PDF_BYTES', 1000):
+            with pytest.raises(DocumentTooLarge):
+                await fetch_html("https://example.com/big.pdf")
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_missing_page_raises(self):
+        """Test that a 404 or 410 is reported instead of being left to the browser"""
+        client = self.client(lambda request: httpx.Response(404 if request.url.path == "/missing" else 410))
+
+        with patch('fetch_client._client', client):
+            with pytest.raises(PageNotFound, match="404"):
+                await fetch_html("https://example.com/missing")
+            with pytest.raises(PageNotFound, match="410"):
+                await fetch_html("https://example.com/gone")
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_large_bodies_are_truncated(self):
+        """Test that the body is capped at FETCH_MAX_BYTES"""
+        client = self.client(lambda request: httpx.Response(200, html="x" * 5000))
+
+        with patch('fetch_client._client', client), patch('static_fetch.FETCH_MAX_BYTES', 1000):
+            result = await fetch_html("https://example.com/")
+
+        assert len(result.html) == 1000
+        await client.aclose()
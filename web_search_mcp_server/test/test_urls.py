@@ -0,0 +1,28 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from urls import canonicalize_url
+
+
+class TestCanonicalizeUrl:
+    """Test suite for canonicalize_url function"""
+
+    def test_lowercases_scheme_and_host(self):
+        """Test that scheme and host are case-insensitive"""
+        assert canonicalize_url("HTTPS://Example.COM/Path") == "https://example.com/Path"
+
+    def test_drops_fragment_and_default_port(self):
+        """Test that fragments and default ports are removed"""
+        assert canonicalize_url("https://example.com:443/docs#intro") == "https://example.com/docs"
+        assert canonicalize_url("http://example.com:8080/") == "http://example.com:8080/"
+
+    def test_strips_tracking_params_and_sorts_query(self):
+        """Test that tracking parameters are dropped and the rest sorted"""
+        url = "https://example.com/a?utm_source=x&b=2&fbclid=abc&a=1"
+        assert canonicalize_url(url) == "https://example.com/a?a=1&b=2"
+
+    def test_empty_path_becomes_root(self):
+        """Test that a bare host gets a root path"""
+        assert canonicalize_url("https://example.com") == "https://example.com/"